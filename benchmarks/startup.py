@@ -0,0 +1,72 @@
+"""
+Startup benchmark: measures import times (with python -X importtime) and time-to-first-frame of the game.
+Run from the repository root:  python benchmarks/startup.py [--runs 5] [--top 15] [--headless]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def child_env(headless):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    env['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+    if headless:
+        env['SDL_VIDEODRIVER'] = 'dummy'
+        env['SDL_AUDIODRIVER'] = 'dummy'
+    return env
+
+
+def measure_imports(headless):
+    """
+    Runs the game for a single frame with -X importtime
+    :return: list of (cumulative us, self us, module name) for all imported modules
+    """
+    env = child_env(headless)
+    env['TURTLE_BENCHMARK_STARTUP'] = '1'
+    result = subprocess.run([sys.executable, '-X', 'importtime', 'main.py'], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative_us), int(self_us), name[1:].rstrip()))  # nesting is kept as indentation of the name
+    return imports
+
+
+def measure_first_frame(headless):
+    """
+    Measures wall time from starting the interpreter to the end of the first frame (main.py quits right after it)
+    :return: time, in seconds
+    """
+    env = child_env(headless)
+    env['TURTLE_BENCHMARK_STARTUP'] = '1'
+    start = time.perf_counter()
+    subprocess.run([sys.executable, 'main.py'], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", help="number of time-to-first-frame measurements", type=int, default=5)
+    parser.add_argument("--top", help="number of slowest top-level imports to show", type=int, default=15)
+    parser.add_argument("--headless", help="flag | use dummy video driver", action="store_true")
+    args = parser.parse_args()
+
+    imports = measure_imports(args.headless)
+    top_level = [item for item in imports if not item[2].startswith(' ')]
+    print("Slowest top-level imports (cumulative ms):")
+    for cumulative_us, _, name in sorted(top_level, reverse=True)[:args.top]:
+        print("  {:9.1f}  {}".format(cumulative_us / 1000, name.strip()))
+    print("Total import time: {:.1f} ms".format(sum(item[0] for item in top_level) / 1000))
+    print("OpenCV imported: {}".format(any(item[2].strip() == 'cv2' for item in imports)))
+
+    times = [measure_first_frame(args.headless) for _ in range(args.runs)]
+    print("Time to first frame: median {:.3f} s, min {:.3f} s, max {:.3f} s ({} runs)".format(statistics.median(times), min(times),
+                                                                                           max(times), args.runs))
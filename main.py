@@ -1,111 +1,169 @@
+import os
+import time
+
 import pygame
 
-from source.turtles.turtle_hero import TurtleHero, JumpStates
+from source.effects.particles import BlockEmitter, ParticleSystem
+from source.entities.entity_manager import EntityManager
+from source.game.controls import InputSystem, control_hero
+from source.game.session import GameSession, spawn_keep_out, WORLD_PATH, ASSETS_PATH
+from source.game.telemetry import Telemetry
+from source.rendering.canvas import ScaledCanvas
+from source.rendering.capture import FrameCapture
+from source.rendering.quality import QualityGovernor, QUALITY_LEVELS
+from source.rendering.renderer import Renderer, BACKGROUND, BLOCKS, ENTITIES, EFFECTS, SPRITES
+from source.rendering.surfaces import SurfaceFormatDiagnostic
+from source.turtles import physics
+from source.turtles.turtle_hero import TurtleHero
 from source.worlds.world import World
 
 SCREENWIDTH = 1200
 SCREENHEIGHT = 750
 GREEN = (20, 255, 140)
+RENDER_SCALE = 1  # internal resolution as a fraction of the window one, for eg. 0.5 on fill rate bound machines
+TICK = physics.TICK  # time step of effects, matches turtle physics
+ENEMY_COUNT = 20
+ADAPTIVE_QUALITY = True  # lowers quality (render scale, particles, background layers, far enemy updates) when frames take too long
+SHOW_MINIMAP = True  # overview of the level with the visible area, in the top right corner
+CAPTURE = True  # F12 takes a screenshot, F9 starts / stops recording a video (into the captures folder)
+DIAGNOSE_BLITS = False  # reports surfaces drawn in a slow (not display) format
+BENCHMARK_STARTUP = 'TURTLE_BENCHMARK_STARTUP' in os.environ  # quits right after the first frame, see benchmarks/startup.py
+# frame statistics, loading times and quality changes of the session are saved into the telemetry folder on exit (not for
+# startup benchmark runs, whose single frame sessions would skew the aggregated statistics)
+TELEMETRY = not BENCHMARK_STARTUP
 
 size = (SCREENWIDTH, SCREENHEIGHT)
 screen = pygame.display.set_mode(size)
 pygame.display.set_caption("Turtle Game")
+canvas = ScaledCanvas(screen, RENDER_SCALE)
 
 # create turtle
 playerTurtle = TurtleHero("normal", 0.5, "Karol1", (100, 600))
+playerTurtle.set_render_scale(RENDER_SCALE)
 
 # create world
-world = World('source/worlds/world_instances/world_1/grid_info.p', 'source/worlds/assets', SCREENWIDTH, SCREENHEIGHT)
-world_sprites = world.get_sprites()
-world.update(screen)
+world = World(WORLD_PATH, ASSETS_PATH, SCREENWIDTH, SCREENHEIGHT, render_scale=RENDER_SCALE)
+telemetry = Telemetry(level=os.path.basename(os.path.dirname(WORLD_PATH))) if TELEMETRY else None
+if telemetry is not None:
+    telemetry.record_phases(world.load_times, 'world.')
+minimap = world.make_minimap() if SHOW_MINIMAP else None
+# particle effects emitted by environment blocks
+particles = ParticleSystem(capacity=5000)
+emitters = [BlockEmitter(particles, world, ['LAVA'], 'lava', 60),
+            BlockEmitter(particles, world, ['WATER'], 'water', 10)]
+
+# enemies walking on the ground, updated only near the camera
+entities = EntityManager(world, pool_size=ENEMY_COUNT)
+entities.spawn_random(ENEMY_COUNT, seed=0, keep_out=spawn_keep_out(world, playerTurtle))
+
+# game logic of a tick; dying restores the last checkpoint, standing on a checkpoint ground saves it
+session = GameSession(world, playerTurtle, entities)
+
+
+def set_render_scale(scale):
+    canvas.set_scale(scale)
+    world.set_render_scale(scale)
+    playerTurtle.set_render_scale(scale)
+
+
+def set_background_layers(layers):
+    world.background_layers = layers
+
+
+def set_entity_throttle(throttle):
+    entities.throttle = throttle
+
+
+governor = None
+if ADAPTIVE_QUALITY:
+    governor = QualityGovernor(60, [dict(level, render_scale=level['render_scale'] * RENDER_SCALE) for level in QUALITY_LEVELS])
+    governor.add_hook('render_scale', set_render_scale)
+    governor.add_hook('particle_budget', particles.set_budget)
+    governor.add_hook('parallax_layers', set_background_layers)
+    governor.add_hook('entity_throttle', set_entity_throttle)
+
+renderer = Renderer()  # counts draws and blitted pixels of every frame (renderer.draws, renderer.pixels)
+
+diagnostic = SurfaceFormatDiagnostic() if DIAGNOSE_BLITS else None
+world.diagnostic = diagnostic
+world.update(canvas.surface)
 
 # Allowing the user to close the window...
 carryOn = True
 clock = pygame.time.Clock()
 
+controls = InputSystem()
+capture = FrameCapture(screen) if CAPTURE else None
+
 all_sprites_list = pygame.sprite.Group()
 all_sprites_list.add(playerTurtle)
 
-# current turtle position
-turtle_x = playerTurtle.x
-turtle_y = playerTurtle.y
-# difference between current and previous turtle position
-delta_x = 0
-delta_y = 0
-# minimal increment
-min_delta = 0.1
-
 while carryOn:
-    for event in pygame.event.get():
-        keys2 = pygame.key.get_pressed()
-        if event.type == pygame.QUIT:
-            carryOn = False
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE and playerTurtle.is_jumping == JumpStates.IDLE:
-                playerTurtle.init_jump(400, 800)
-            if event.key == pygame.K_RIGHT and not keys2[pygame.K_RCTRL]:
-                # print("init right !!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-                playerTurtle.init_move_right()
-            elif event.key == pygame.K_RIGHT and keys2[pygame.K_RCTRL]:
-                # print("init fast right!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-                playerTurtle.init_move_fast_right()
-            elif event.key == pygame.K_LEFT and keys2[pygame.K_RCTRL]:
-                playerTurtle.init_move_fast_left()
-            elif event.key == pygame.K_LEFT and not keys2[pygame.K_RCTRL]:
-                playerTurtle.init_move_left()
-            elif event.key == pygame.K_RCTRL and keys2[pygame.K_RIGHT]:
-                playerTurtle.init_move_fast_right()
-            elif event.key == pygame.K_RCTRL and keys2[pygame.K_LEFT]:
-                playerTurtle.init_move_fast_left()
-            elif event.key == pygame.K_z:
-                playerTurtle.update_hide_anim()
-            elif event.key == pygame.K_x:
-                playerTurtle.update_die_anim()
-        elif event.type == pygame.KEYUP:
-            if event.key == pygame.K_RCTRL and keys2[pygame.K_RIGHT]:
-                playerTurtle.init_move_right()
-            elif event.key == pygame.K_RCTRL and keys2[pygame.K_LEFT]:
-                playerTurtle.init_move_left()
-
-    keys = pygame.key.get_pressed()
-    # if keys[pygame.K_LEFT]:
-    #    playerTurtle.moveLeft(5)
-    # if keys[pygame.K_RIGHT]:
-    # playerTurtle.moveRight(5)
-    if keys[pygame.K_UP]:
-        playerTurtle.move_up(5)
-    if keys[pygame.K_DOWN]:
-        playerTurtle.move_down(5)
-    if not keys[pygame.K_RIGHT] and not keys[pygame.KMOD_CTRL] and not keys[pygame.K_LEFT]:
-        playerTurtle.stop_move()
+    frame_started = time.perf_counter()
+    events = pygame.event.get()
+    controls.update(events)
+    if capture is not None:
+        capture.handle_events(events)
+    if controls.quit:
+        carryOn = False
 
     all_sprites_list.update()
 
-    if playerTurtle.speed_act != 0 or playerTurtle.speed_target != 0:
-        new_x = playerTurtle.move()
-        delta_x = -int(new_x - turtle_x) if abs(new_x - turtle_x) >= min_delta else 0
-        turtle_x = new_x
-
-    if playerTurtle.is_jumping != JumpStates.IDLE:
-        new_y = playerTurtle.jump(400, 800)
-        delta_y = -int(new_y - turtle_y) if abs(new_y - turtle_y) >= min_delta else 0
-        turtle_y = new_y
-    else:
-        delta_y = 0
-
-
-    # Drawing on Screen
-    world.move_world(delta_x, delta_y)
-    world.update(screen)
-    world.find_collisions(playerTurtle)
+    controls.consume(control_hero(playerTurtle, controls.get_bits()))
+    # burst of particles when the turtle dies, touching something deadly (terrain or an enemy)
+    if session.tick():
+        move_result = session.move_result
+        particles.burst(move_result.x + playerTurtle.hitbox[2] / 2, move_result.y + playerTurtle.hitbox[3] / 2)
+    for row, col in session.opened:  # loot crates opened with the head
+        particles.burst((col + 0.5) * session.cell_w, (row + 0.5) * session.cell_h)
+
+    for emitter in emitters:
+        emitter.update(TICK, world.get_view())
+    particles.update(TICK)
+
+    # Drawing on Screen: draw commands of the whole frame are collected and submitted at once, layer by layer
+    offset = world.get_offset()
+    renderer.add(BACKGROUND, world.get_background_blits())
+    renderer.add(BLOCKS, world.get_block_blits())
+    renderer.add(ENTITIES, entities.get_blits(canvas.surface.get_size(), offset, canvas.scale))
+    renderer.add_callback(EFFECTS, lambda surface: particles.draw(surface, offset, canvas.scale))
+    colliding_blocks, colliding_objects = world.find_collisions(playerTurtle)
 
     # Now let's draw all the sprites in one go. (For now we only have 1 sprite!)
-    all_sprites_list.draw(screen)
+    if diagnostic is not None:
+        for sprite in all_sprites_list:
+            diagnostic.check(sprite.image, sprite.__class__.__name__)
+    renderer.add(SPRITES, canvas.get_sprite_blits(all_sprites_list))
+    renderer.flush(canvas.surface)
 
     # Refresh Screen
+    canvas.present()
+    if minimap is not None:
+        minimap.draw(screen, world.get_view())  # onto the display, so it stays sharp at any render scale
     pygame.display.flip()
+    if capture is not None:
+        capture.capture()  # copies the frame only; encoding happens on the capture thread
+    if telemetry is not None:
+        telemetry.record('frame_us', (time.perf_counter() - frame_started) * 1e6)
+        telemetry.record('collisions', len(colliding_blocks) + len(colliding_objects))
+        telemetry.record('draws', renderer.draws)
+        telemetry.record('enemy_updates', entities.updated)
+    if BENCHMARK_STARTUP:
+        carryOn = False
 
     # Number of frames per secong e.g. 60
     clock.tick(60)
+    if governor is not None:
+        governor.record(clock.get_rawtime() / 1000)  # work time of the frame, without waiting
+
+if diagnostic is not None:
+    diagnostic.report()
+if capture is not None:
+    capture.close()
+if telemetry is not None:
+    telemetry_path = telemetry.save()
+    print("Telemetry saved to {}".format(telemetry_path))
+    if governor is not None:  # quality changes go next to the session file they belong to
+        governor.save_log(telemetry_path[:-len('.json.gz')] + '_quality.csv')
 
 pygame.quit()
@@ -0,0 +1,115 @@
+import pygame
+
+from source.rendering.canvas import scale_surface
+from source.turtles.turtle_hero import Turtle
+
+
+class Enemy(Turtle):
+    """
+    Enemy turtle patrolling the ground: walks in one direction and turns around on walls, edges of platforms and other enemies.
+    Animation frames are cut from the sprite sheet once and shared by all enemies, and positions are kept in world coordinates,
+    so enemies (unlike the hero) don't have to be moved with the camera.
+    """
+    SHEET_PATH = 'source/turtles/sv_turtle_sheet.png'
+    shared_frames = {}  # render scale: frames dict (see Turtle.prepare_frames), shared by all enemies
+    shared_hitbox = None
+
+    def __init__(self, type='walker', speed=60, gravity=800):
+        """
+        :param type: enemy type (only "walker" for now)
+        :param speed: walking speed, in pixels / s
+        :param gravity: gravity acceleration, in pixels / s^2
+        """
+        self.base_frames = self.load_frames(1)
+        self.frames = self.base_frames
+        super().__init__(type, 1, 'enemy', (0, 0))
+        self.walk = [(6, 0), (7, 0), (8, 0)]  # icons of walk right column and row
+        if Enemy.shared_hitbox is None:
+            Enemy.shared_hitbox = self.find_hitbox(self.walk)
+        self.hitbox = Enemy.shared_hitbox  # collision box (x, y, w, h), relative to the frame
+        self.speed = speed
+        self.gravity = gravity
+        self.active = False  # managed by EntityPool
+        self.uid = 0
+        self.reset(0, 0)
+
+    @classmethod
+    def load_frames(cls, scale=1):
+        """
+        Returns frames shared by all enemies, pre-scaled to given render scale. The sheet is loaded (and recolored, so enemies
+        differ from the hero) only once.
+        :param scale: render scale
+        :return: dict {(column, row, flipped): surface}
+        """
+        if 1 not in cls.shared_frames:
+            sheet = pygame.image.load(cls.SHEET_PATH)
+            if sheet.get_palette() is not None:  # green shells become red by swapping red and green channels of the palette
+                sheet.set_palette([(color[1], color[0], color[2]) for color in sheet.get_palette()])
+            cls.shared_frames[1] = cls.prepare_frames(sheet, 64, 64)
+        if scale not in cls.shared_frames:
+            cls.shared_frames[scale] = {key: scale_surface(frame, scale) for key, frame in cls.shared_frames[1].items()}
+        return cls.shared_frames[scale]
+
+    def get_image(self, x, y, w, h):
+        return self.frames[(x // w, y // h, False)]
+
+    def reset(self, x, y, direction=1):
+        """
+        Places enemy in the world, as its bottom-center point (for eg. the top edge of the ground it stands on)
+        :params x, y: world coordinates, in pixels
+        :param direction: initial walking direction (1 - right, -1 - left)
+        """
+        hx, hy, hw, hh = self.hitbox
+        self.box_x = x - hw / 2
+        self.box_y = y - hh
+        self.vy = 0.0
+        self.direction = direction
+        self.on_ground = False
+        self.anim_time = 0.0
+        self.dead = False
+        self.sync_rect()
+
+    def get_box(self):
+        """Returns collision box (x, y, w, h), in world coordinates"""
+        return self.box_x, self.box_y, self.hitbox[2], self.hitbox[3]
+
+    def get_frame_key(self):
+        """Returns key of the current animation frame"""
+        column, row = self.walk[int(self.anim_time * 6) % len(self.walk)]
+        return column, row, self.direction < 0
+
+    def sync_rect(self):
+        """Updates frame rect (and x, y of the Turtle base) in world coordinates, and the image, for sprite based code"""
+        self.x = self.box_x - self.hitbox[0]
+        self.y = self.box_y - self.hitbox[1]
+        self.rect.x = int(self.x)
+        self.rect.y = int(self.y)
+        self.image = self.frames[self.get_frame_key()]
+
+    def update(self, dt, collider, neighbours=()):
+        """
+        Walks and falls for dt seconds, resolving movement against terrain
+        :param dt: time step, in seconds (bigger for throttled enemies)
+        :param collider: TileCollider of the world
+        :param neighbours: other enemies near this one, which it turns away from
+        """
+        x, y, w, h = self.get_box()
+        dy = self.vy * dt + self.gravity * dt ** 2 / 2
+        result = collider.move(x, y, w, h, self.direction * self.speed * dt, dy)
+        self.box_x, self.box_y = result.x, result.y
+        self.on_ground = result.on_ground
+        self.vy = 0.0 if result.on_ground or result.hit_y else self.vy + self.gravity * dt
+
+        # turns around on walls, in front of edges (only when standing) and when walking into another enemy
+        front = self.box_x + w if self.direction > 0 else self.box_x - 1
+        if result.hit_x or (self.on_ground and not collider.is_on_ground(front, self.box_y, 1, h)):
+            self.direction = -self.direction
+        else:
+            for other in neighbours:
+                if (other.box_x - self.box_x) * self.direction > 0:
+                    self.direction = -self.direction
+                    break
+
+        self.dead = result.deadly or result.fell_out
+        self.anim_time += dt
+        self.sync_rect()
@@ -0,0 +1,181 @@
+import numpy as np
+
+from source.entities.enemy import Enemy
+from source.entities.pool import EntityPool
+from source.entities.spatial_hash import SpatialHash
+from source.worlds.navigation import find_walkable_cells
+
+
+class EntityManager:
+    """
+    Keeps enemies of a world: spawns them from a pool, schedules their updates and answers area queries through a spatial hash.
+    Only enemies close to the camera are updated every tick; enemies further away are updated in turns, every few ticks (with
+    a proportionally longer time step), and enemies far away sleep. Finding enemies in each zone is a spatial hash query, so the cost
+    of a frame depends on the number of enemies near the camera rather than on all enemies in the level.
+    """
+
+    def __init__(self, world, active_margin=256, throttle_margin=1200, throttle=4, pool_size=0, cell_size=256):
+        """
+        :param world: World the enemies live in (its collider is used for terrain queries)
+        :param active_margin: enemies closer to the visible area than this (in pixels) are updated every tick
+        :param throttle_margin: enemies closer to the visible area than this are updated every throttle ticks; the rest sleep
+        :param throttle: update interval of throttled enemies, in ticks
+        :param pool_size: number of enemies created up front
+        :param cell_size: bucket size of the spatial hash, in pixels
+        """
+        self.world = world
+        self.collider = world.collider
+        self.active_margin = active_margin
+        self.throttle_margin = throttle_margin
+        self.throttle = throttle
+        self.pool = EntityPool(Enemy, pool_size)
+        self.hash = SpatialHash(cell_size)
+        self.tick = 0
+        self.__next_uid = 0
+        self.updated = 0  # number of enemy updates made in the last tick
+
+    def __len__(self):
+        return len(self.hash)
+
+    def __iter__(self):
+        return iter(list(self.hash.boxes))
+
+    def spawn(self, x, y, direction=1):
+        """
+        Spawns enemy standing at given point
+        :params x, y: bottom-center point of the enemy, in world pixels
+        :param direction: initial walking direction (1 - right, -1 - left)
+        :return: enemy
+        """
+        enemy = self.pool.acquire(x, y, direction)
+        enemy.uid = self.__next_uid
+        self.__next_uid += 1
+        self.hash.insert(enemy, enemy.get_box())
+        return enemy
+
+    def despawn(self, enemy):
+        """Removes enemy from the world and returns it to the pool"""
+        self.hash.remove(enemy)
+        self.pool.release(enemy)
+
+    def get_state(self):
+        """
+        Returns state of all enemies, see set_state
+        :return: (tick, next uid, list of (box x, box y, vertical speed, animation time, direction, uid) of enemies)
+        """
+        enemies = [(enemy.box_x, enemy.box_y, enemy.vy, enemy.anim_time, enemy.direction, enemy.uid) for enemy in self]
+        return self.tick, self.__next_uid, enemies
+
+    def set_state(self, state):
+        """Restores state returned by get_state; enemies are taken from the pool, so nothing new is created if it's big enough"""
+        tick, next_uid, enemies = state
+        for enemy in self:
+            self.despawn(enemy)
+        for box_x, box_y, vy, anim_time, direction, uid in enemies:
+            enemy = self.pool.acquire(0, 0, direction)
+            enemy.box_x, enemy.box_y, enemy.vy, enemy.anim_time, enemy.uid = box_x, box_y, vy, anim_time, uid
+            enemy.sync_rect()
+            self.hash.insert(enemy, enemy.get_box())
+        self.tick, self.__next_uid = tick, next_uid
+
+    def find_spawn_points(self):
+        """
+        Finds points an enemy can stand on: centers of walkable cells (see find_walkable_cells)
+        :return: arrays (x, y) of bottom-center points of walkable cells, in world pixels
+        """
+        cells = find_walkable_cells(self.collider).astype(np.float64)
+        return (cells[:, 0] + 0.5) * self.collider.cell_w, (cells[:, 1] + 1) * self.collider.cell_h
+
+    def spawn_random(self, n, seed=None, keep_out=None):
+        """
+        Spawns enemies on random spawn points (see find_spawn_points)
+        :param n: number of enemies
+        :param seed: seed of the random generator
+        :param keep_out: area (x, y, w, h) in world pixels without spawn points, for eg. around the hero start
+        :return: number of spawned enemies
+        """
+        xs, ys = self.find_spawn_points()
+        if keep_out is not None:
+            x, y, w, h = keep_out
+            outside = (xs < x) | (xs > x + w) | (ys < y) | (ys > y + h)
+            xs, ys = xs[outside], ys[outside]
+        if len(xs) == 0:
+            return 0
+        rng = np.random.default_rng(seed)
+        points = rng.choice(len(xs), n, replace=n > len(xs))  # different points, as long as there are enough of them
+        shifts = rng.uniform(-0.25, 0.25, n) * self.collider.cell_w
+        for i, shift in zip(points, shifts):
+            self.spawn(float(xs[i] + shift), float(ys[i]), int(rng.choice((-1, 1))))
+        return n
+
+    def query(self, x, y, w, h, exclude=None):
+        """Returns enemies whose boxes overlap the area (x, y, w, h), in world pixels"""
+        return self.hash.overlapping(x, y, w, h, exclude)
+
+    def find_contacts(self, box):
+        """
+        Finds enemies touching given box (for eg. the hero's one)
+        :param box: (x, y, w, h), in world coordinates
+        :return: list of enemies
+        """
+        return self.hash.overlapping(*box)
+
+    def update(self, dt, view):
+        """
+        Updates enemies near the visible area
+        :param dt: time step, in seconds
+        :param view: visible area (xmin, ymin, xmax, ymax), in world coordinates
+        """
+        self.tick += 1
+        active = self.hash.query(*self.expand(view, self.active_margin))
+        throttled = self.hash.query(*self.expand(view, self.throttle_margin)) - active
+
+        # enemies are updated in the order of their uids: sets are ordered by object ids, which differ between runs, and seeded runs
+        # (training sessions, restored snapshots) must be repeatable
+        scheduled = [(enemy, dt, True) for enemy in sorted(active, key=self.uid_of)]
+        # throttled enemies are updated in turns, so the work is spread evenly over ticks; being off screen, they ignore each other
+        scheduled += [(enemy, dt * self.throttle, False) for enemy in sorted(throttled, key=self.uid_of)
+                      if (enemy.uid + self.tick) % self.throttle == 0]
+
+        for enemy, step, interact in scheduled:
+            if not enemy.active:
+                continue
+            neighbours = self.hash.overlapping(*enemy.get_box(), exclude=enemy) if interact else ()
+            enemy.update(step, self.collider, neighbours)
+            if enemy.dead:
+                self.despawn(enemy)
+            else:
+                self.hash.move(enemy, enemy.get_box())
+        self.updated = len(scheduled)
+
+    def draw(self, surface, offset, scale=1):
+        """
+        Draws enemies overlapping the visible area
+        :param surface: target surface (canvas)
+        :param offset: camera offset (x, y); world coordinates + offset = screen coordinates
+        :param scale: render scale of the canvas
+        """
+        surface.blits(self.get_blits(surface.get_size(), offset, scale), doreturn=False)
+
+    def get_blits(self, size, offset, scale=1):
+        """
+        Returns blits (surface, destination) of enemies overlapping the visible area, see draw
+        :param size: size (w, h) of the target surface
+        """
+        ox, oy = offset
+        w, h = size
+        frames = Enemy.load_frames(scale)
+        margin = 64  # frames stick out of collision boxes by less than their size
+        visible = self.hash.query(-ox - margin, -oy - margin, w / scale + 2 * margin, h / scale + 2 * margin)
+        return [(frames[enemy.get_frame_key()], (int(round((enemy.x + ox) * scale)), int(round((enemy.y + oy) * scale))))
+                for enemy in visible]
+
+    @staticmethod
+    def uid_of(enemy):
+        return enemy.uid
+
+    @staticmethod
+    def expand(view, margin):
+        """Converts (xmin, ymin, xmax, ymax) view, expanded by margin on each side, into (x, y, w, h) area"""
+        xmin, ymin, xmax, ymax = view
+        return xmin - margin, ymin - margin, xmax - xmin + 2 * margin, ymax - ymin + 2 * margin
@@ -0,0 +1,39 @@
+class EntityPool:
+    """
+    Pool of reusable entities. Despawned entities are kept and reset on the next spawn, so spawning doesn't create new sprites
+    (and doesn't cut their images again) during gameplay.
+    """
+
+    def __init__(self, factory, size=0):
+        """
+        :param factory: callable creating a new entity; entities must implement reset(*args) and have an "active" attribute
+        :param size: number of entities created up front
+        """
+        self.factory = factory
+        self.__free = [factory() for _ in range(size)]
+        self.created = size  # number of entities ever created by the pool
+
+    def __len__(self):
+        """Returns number of free entities"""
+        return len(self.__free)
+
+    def acquire(self, *args):
+        """
+        Takes a free entity (or creates a new one, if there are none) and resets it
+        :param args: arguments passed to entity reset
+        :return: entity
+        """
+        if self.__free:
+            entity = self.__free.pop()
+        else:
+            entity = self.factory()
+            self.created += 1
+        entity.reset(*args)
+        entity.active = True
+        return entity
+
+    def release(self, entity):
+        """Returns entity to the pool"""
+        if entity.active:
+            entity.active = False
+            self.__free.append(entity)
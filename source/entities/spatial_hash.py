@@ -0,0 +1,114 @@
+import math
+
+
+class SpatialHash:
+    """
+    Dynamic spatial hash of moving entities. The world is divided into square buckets, and each entity is registered in every bucket its
+    box overlaps, so area queries only visit entities near the queried area instead of all of them. Entities are re-bucketed only when
+    they cross a bucket boundary, which makes moving an entity O(1) in the common case.
+    """
+
+    def __init__(self, cell_size=256):
+        """
+        :param cell_size: size of a bucket, in pixels; should be a few times bigger than a typical entity
+        """
+        self.cell_size = cell_size
+        self.__buckets = {}  # (column, row): set of entities
+        self.__cells = {}  # entity: (col0, row0, col1, row1) range of buckets it is registered in
+        self.boxes = {}  # entity: (x, y, w, h) box in world pixels
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __contains__(self, entity):
+        return entity in self.boxes
+
+    def cell_range(self, x, y, w, h):
+        """Returns (inclusive) range of buckets covered by box: (col0, row0, col1, row1)"""
+        size = self.cell_size
+        return (int(math.floor(x / size)), int(math.floor(y / size)),
+                int(math.floor((x + w) / size)), int(math.floor((y + h) / size)))
+
+    def insert(self, entity, box):
+        """
+        Registers entity
+        :param entity: any hashable object
+        :param box: (x, y, w, h), in world pixels
+        """
+        cells = self.cell_range(*box)
+        self.boxes[entity] = box
+        self.__cells[entity] = cells
+        self.__add(entity, cells)
+
+    def remove(self, entity):
+        """Unregisters entity; unknown entities are ignored"""
+        if entity not in self.boxes:
+            return
+        self.__discard(entity, self.__cells.pop(entity))
+        del self.boxes[entity]
+
+    def move(self, entity, box):
+        """
+        Updates box of already registered entity, moving it between buckets only if needed
+        :param entity: registered entity
+        :param box: new (x, y, w, h)
+        """
+        cells = self.cell_range(*box)
+        self.boxes[entity] = box
+        old_cells = self.__cells[entity]
+        if cells != old_cells:
+            self.__discard(entity, old_cells)
+            self.__add(entity, cells)
+            self.__cells[entity] = cells
+
+    def query(self, x, y, w, h):
+        """
+        Finds entities that may overlap the area (all entities from buckets it covers)
+        :params x, y, w, h: area, in world pixels
+        :return: set of entities
+        """
+        col0, row0, col1, row1 = self.cell_range(x, y, w, h)
+        buckets = self.__buckets
+        found = set()
+        for column in range(col0, col1 + 1):
+            for row in range(row0, row1 + 1):
+                bucket = buckets.get((column, row))
+                if bucket:
+                    found.update(bucket)
+        return found
+
+    def overlapping(self, x, y, w, h, exclude=None):
+        """
+        Finds entities whose boxes actually overlap the area
+        :params x, y, w, h: area, in world pixels
+        :param exclude: entity to be skipped (for eg. the one asking)
+        :return: list of entities
+        """
+        result = []
+        for entity in self.query(x, y, w, h):
+            if entity is exclude:
+                continue
+            ex, ey, ew, eh = self.boxes[entity]
+            if ex < x + w and x < ex + ew and ey < y + h and y < ey + eh:
+                result.append(entity)
+        return result
+
+    def __add(self, entity, cells):
+        col0, row0, col1, row1 = cells
+        buckets = self.__buckets
+        for column in range(col0, col1 + 1):
+            for row in range(row0, row1 + 1):
+                bucket = buckets.get((column, row))
+                if bucket is None:
+                    buckets[(column, row)] = bucket = set()
+                bucket.add(entity)
+
+    def __discard(self, entity, cells):
+        col0, row0, col1, row1 = cells
+        buckets = self.__buckets
+        for column in range(col0, col1 + 1):
+            for row in range(row0, row1 + 1):
+                bucket = buckets[(column, row)]
+                bucket.discard(entity)
+                if not bucket:
+                    del buckets[(column, row)]
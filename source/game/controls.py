@@ -0,0 +1,126 @@
+import pygame
+
+from source.turtles import physics
+from source.turtles.turtle_hero import JumpStates
+
+# actions, as bits of the controls bitmask (the same bits are sent over the network, see source.net.protocol)
+LEFT = 1
+RIGHT = 2
+FAST = 4
+JUMP = 8
+UP = 16
+DOWN = 32
+HIDE = 64
+DIE = 128
+
+ACTION_NAMES = {'LEFT': LEFT, 'RIGHT': RIGHT, 'FAST': FAST, 'JUMP': JUMP, 'UP': UP, 'DOWN': DOWN, 'HIDE': HIDE, 'DIE': DIE}
+
+DEFAULT_KEYMAP = {pygame.K_LEFT: LEFT, pygame.K_RIGHT: RIGHT, pygame.K_RCTRL: FAST, pygame.K_LCTRL: FAST, pygame.K_SPACE: JUMP,
+                  pygame.K_UP: UP, pygame.K_DOWN: DOWN, pygame.K_z: HIDE, pygame.K_x: DIE}
+
+PRESS_ACTIONS = JUMP | HIDE | DIE  # actions triggered by pressing a key (rather than by holding it)
+
+
+def make_keymap(bindings):
+    """
+    Makes keymap from key names, for eg. from a config file
+    :param bindings: dict {action name: list of key names}, for eg. {'JUMP': ['space', 'w']}
+    :return: dict {key: action bit}
+    """
+    return {pygame.key.key_code(key_name): ACTION_NAMES[action] for action, key_names in bindings.items() for key_name in key_names}
+
+
+class InputSystem:
+    """
+    Turns keyboard into actions once per tick. Held actions are a bitmask read from the keyboard state with a single call, through
+    a lookup table of bindings. Pressed actions come from key down events (so even a tap shorter than a frame counts) and are
+    buffered for a few ticks, so for eg. jump pressed shortly before landing still happens on landing.
+    """
+
+    def __init__(self, keymap=None, buffer_ticks=6):
+        """
+        :param keymap: dict {key: action bit}, by default DEFAULT_KEYMAP
+        :param buffer_ticks: number of ticks a pressed action waits to be consumed
+        """
+        self.keymap = DEFAULT_KEYMAP if keymap is None else keymap
+        self.buffer_ticks = buffer_ticks
+        self.__bindings = list(self.keymap.items())
+        self.held = 0  # bitmask of held actions
+        self.__buffered = {}  # action bit: remaining ticks
+        self.quit = False
+
+    def update(self, events):
+        """
+        Reads input of a tick; call once per tick, right before the physics step
+        :param events: pygame events of the tick
+        """
+        for action in list(self.__buffered):
+            self.__buffered[action] -= 1
+            if self.__buffered[action] <= 0:
+                del self.__buffered[action]
+        for event in events:
+            if event.type == pygame.QUIT:
+                self.quit = True
+            elif event.type == pygame.KEYDOWN:
+                action = self.keymap.get(event.key, 0) & PRESS_ACTIONS
+                if action:
+                    self.__buffered[action] = self.buffer_ticks
+
+        pressed = pygame.key.get_pressed()
+        held = 0
+        for key, action in self.__bindings:
+            if pressed[key]:
+                held |= action
+        self.held = held & ~PRESS_ACTIONS  # holding a key down doesn't repeat its press action
+
+    def is_buffered(self, action):
+        return action in self.__buffered
+
+    def consume(self, actions):
+        """Takes buffered pressed actions (a bitmask), for eg. the ones control_hero used"""
+        for action in list(self.__buffered):
+            if action & actions:
+                del self.__buffered[action]
+
+    def get_bits(self):
+        """Returns bitmask of held actions and buffered pressed ones"""
+        bits = self.held
+        for action in self.__buffered:
+            bits |= action
+        return bits
+
+
+def control_hero(hero, bits):
+    """
+    Applies actions to the hero at the start of the physics step
+    :param hero: TurtleHero
+    :param bits: bitmask of actions (held ones and pressed ones)
+    :return: bitmask of pressed actions that were used (the rest may wait, see InputSystem.consume)
+    """
+    used = 0
+    direction = (1 if bits & RIGHT else 0) - (1 if bits & LEFT else 0)
+    speed = direction * (physics.SPEED_FAST if bits & FAST else physics.SPEED_SLOW)
+    if hero.swimming:
+        speed *= physics.SWIM_SPEED_FACTOR
+    if speed == 0:
+        hero.stop_move()
+    elif speed != hero.speed_target:
+        hero.i_count = 0
+        hero.speed_target = speed
+    if bits & JUMP and hero.swimming:
+        hero.init_stroke(*hero.get_physics())  # strokes can follow each other, even without touching anything
+        used |= JUMP
+    elif bits & JUMP and hero.is_jumping == JumpStates.IDLE:
+        hero.init_jump(*hero.get_physics())
+        used |= JUMP
+    if bits & UP:
+        hero.move_up(5)
+    if bits & DOWN:
+        hero.move_down(5)
+    if bits & HIDE:
+        hero.update_hide_anim()
+        used |= HIDE
+    if bits & DIE:
+        hero.update_die_anim()
+        used |= DIE
+    return used
@@ -0,0 +1,215 @@
+import os
+
+import numpy as np
+import pygame
+
+from source.entities.entity_manager import EntityManager
+from source.game.controls import LEFT, RIGHT, FAST, JUMP, control_hero
+from source.game.snapshot import save_snapshot, restore_snapshot
+from source.turtles import physics
+from source.turtles.turtle_hero import TurtleHero, JumpStates
+from source.worlds.world import World
+
+# actions of the agent, as bitmasks of controls
+ACTIONS = [0, LEFT, RIGHT, LEFT | FAST, RIGHT | FAST, JUMP, LEFT | FAST | JUMP, RIGHT | FAST | JUMP]
+
+OUTSIDE = -1  # cell value of the observation window outside of the world
+
+WORLD_PATH = 'source/worlds/world_instances/world_1/grid_info.p'
+ASSETS_PATH = 'source/worlds/assets'
+
+
+class GameSession:
+    """
+    Game logic of a single tick (hero physics, terrain, enemies, deaths and checkpoints), independent of input handling and drawing.
+    The game loop drives it with keyboard input and draws the result; agents drive it with a Gym-style API (reset, step), headless,
+    observing a window of the objects matrix around the hero instead of the screen.
+    """
+
+    def __init__(self, world, hero, entities=None, window=(9, 15), max_steps=3000, death_penalty=1.0):
+        """
+        :param world: World
+        :param hero: TurtleHero
+        :param entities: EntityManager, or None for a world without enemies
+        :param window: size (rows, cols) of the observed part of the objects matrix, centered on the hero
+        :param max_steps: number of steps after which an episode is cut
+        :param death_penalty: reward for dying
+        """
+        self.world = world
+        self.hero = hero
+        self.entities = entities
+        self.window = window
+        self.max_steps = max_steps
+        self.death_penalty = death_penalty
+        self.cell_w, self.cell_h = world.collider.cell_w, world.collider.cell_h
+
+        # objects matrix padded by half of the window, so windows are plain slices even at the borders of the world
+        matrix = world.get_objects_matrix()
+        pad_y, pad_x = window[0] // 2, window[1] // 2
+        self.__padded = np.full((matrix.shape[0] + 2 * pad_y, matrix.shape[1] + 2 * pad_x), OUTSIDE, np.int8)
+        self.__padded[pad_y:pad_y + matrix.shape[0], pad_x:pad_x + matrix.shape[1]] = matrix
+        self.observation_size = window[0] * window[1] + 4
+        world.dynamic.add_hook(self.update_cell)
+
+        self.initial = save_snapshot(world, hero, entities)
+        self.checkpoint = self.initial
+        self.__last_x, self.__last_y = hero.x, hero.y
+        self.move_result = None
+        self.opened = []  # (row, col) of dynamic objects opened in the last tick
+        self.steps = 0
+
+    def update_cell(self, row, col, type_id):
+        """Updates a changed cell (for eg. an opened crate) in the padded objects matrix"""
+        self.__padded[row + self.window[0] // 2, col + self.window[1] // 2] = type_id
+
+    def reset(self):
+        """
+        Restores the initial state of the game
+        :return: observation
+        """
+        self.restore(self.initial)
+        self.checkpoint = self.initial
+        self.steps = 0
+        return self.observe()
+
+    def restore(self, snapshot):
+        """Restores game state from a snapshot (see save_snapshot)"""
+        restore_snapshot(snapshot, self.world, self.hero, self.entities)
+        self.__last_x, self.__last_y = self.hero.x, self.hero.y
+
+    def apply_action(self, action):
+        """
+        Controls the hero like a player would
+        :param action: index in ACTIONS
+        """
+        control_hero(self.hero, ACTIONS[action])
+
+    def tick(self):
+        """
+        Simulates a single tick: moves the hero (resolving its movement against terrain) and enemies. Hitting a loot crate with the
+        head opens it, water switches the hero to swimming. The hero dies on anything deadly (terrain, a volume or an enemy) and when
+        it falls out of the world, which restores the last checkpoint; standing on a checkpoint ground saves it.
+        :return: True if the hero died
+        """
+        hero = self.hero
+        if hero.speed_act != 0 or hero.speed_target != 0:
+            hero.move()
+        jump_speed, gravity = hero.get_physics()
+        if hero.is_jumping != JumpStates.IDLE:
+            hero.jump(jump_speed, gravity)
+
+        # the world moves instead of the hero
+        delta_x = hero.x - self.__last_x
+        delta_y = hero.y - self.__last_y
+        self.move_result = self.world.move_player(hero, delta_x, delta_y)
+        hero.apply_move_result(self.move_result, delta_x, delta_y, gravity)
+        self.__last_x, self.__last_y = hero.x, hero.y
+
+        box = self.world.get_player_box(hero)
+        self.opened = self.world.open_above(box) if self.move_result.hit_y < 0 else []
+        died = self.update_environment(box) or self.move_result.deadly or self.move_result.fell_out
+        if self.entities is not None:
+            self.entities.update(physics.TICK, self.world.get_view())
+            died = died or bool(self.entities.find_contacts(box))
+
+        if died:
+            self.restore(self.checkpoint)
+        elif hero.is_jumping == JumpStates.IDLE and self.world.stands_on(box, 'CHECKPOINT_GROUND'):
+            self.checkpoint = save_snapshot(self.world, hero, self.entities)
+        return died
+
+    def update_environment(self, box):
+        """
+        Looks up the volume (water, lava) the center of the hero is in; entering or leaving water switches its physics. A jump (or
+        a stroke) goes on with its current speed under the gravity of the new medium, a fall starts over in the new medium.
+        :param box: (x, y, w, h) of the hero, in world coordinates
+        :return: True if the volume is deadly
+        """
+        hero = self.hero
+        x, y, w, h = box
+        volume, depth = self.world.environment_at(x + w / 2, y + h / 2)
+        in_water = volume == 'WATER'
+        if in_water != hero.swimming:
+            speed = -self.vertical_speed()  # upwards, in the old medium
+            hero.swimming = in_water
+            gravity = hero.get_physics()[1]
+            if hero.is_jumping == JumpStates.UP and speed > 0:
+                hero.init_stroke(speed, gravity)
+            elif hero.is_jumping != JumpStates.IDLE:
+                hero.init_fall(gravity)
+        return volume is not None and self.world.assets[volume]['deadly']
+
+    def step(self, action):
+        """
+        Applies action and simulates a tick. The reward is the horizontal progress of the hero (in cells), or the death penalty.
+        :param action: index in ACTIONS
+        :return: (observation, reward, done, info)
+        """
+        x = self.world.get_player_box(self.hero)[0]
+        self.apply_action(action)
+        died = self.tick()
+        self.steps += 1
+        reward = -self.death_penalty if died else (self.world.get_player_box(self.hero)[0] - x) / self.cell_w
+        truncated = self.steps >= self.max_steps
+        return self.observe(), reward, died or truncated, {'died': died, 'truncated': truncated}
+
+    def observe(self, out=None):
+        """
+        Makes observation: cell type indices of the window of the objects matrix centered on the hero (OUTSIDE beyond the world),
+        followed by the hero velocity (in pixels / s) and its position within its cell (as fractions of the cell size)
+        :param out: float32 array of observation_size to write the observation to (for eg. a shared memory buffer)
+        :return: observation
+        """
+        if out is None:
+            out = np.empty(self.observation_size, np.float32)
+        x, y, w, h = self.world.get_player_box(self.hero)
+        column, row = int((x + w / 2) // self.cell_w), int((y + h / 2) // self.cell_h)
+        rows, cols = self.window
+        # in the padded matrix, the window centered on the cell starts at its indices
+        column = min(max(column, 0), self.__padded.shape[1] - cols)
+        row = min(max(row, 0), self.__padded.shape[0] - rows)
+        out[:-4].reshape(rows, cols)[:] = self.__padded[row:row + rows, column:column + cols]
+        out[-4] = self.hero.speed_act
+        out[-3] = self.vertical_speed()
+        out[-2] = (x + w / 2) / self.cell_w % 1
+        out[-1] = (y + h / 2) / self.cell_h % 1
+        return out
+
+    def vertical_speed(self):
+        """Returns vertical speed of the hero, in pixels / s (positive downwards), derived from its jump state"""
+        hero = self.hero
+        jump_speed, gravity = hero.get_physics()
+        if hero.is_jumping == JumpStates.UP:
+            return -jump_speed + gravity * hero.jump_counter * physics.TICK
+        if hero.is_jumping == JumpStates.DOWN:
+            return gravity * hero.jump_counter * physics.TICK
+        return 0.0
+
+
+def make_session(grid_file_path=WORLD_PATH, assets_path=ASSETS_PATH, enemies=0, seed=0, screen_size=(1200, 750), **kwargs):
+    """
+    Makes headless game session: no window is opened and nothing is ever drawn, so without a display the world makes no block
+    surfaces nor background layers (only collision masks). Paths are relative to the root of the repository.
+    :param grid_file_path: the pickle file, describing world
+    :param assets_path: path to the folder with assets
+    :param enemies: number of enemies, spawned at random
+    :param seed: seed of enemy spawning
+    :param screen_size: size of the (virtual) screen; enemies are updated only near it
+    :param kwargs: other GameSession parameters
+    :return: GameSession
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    hero = TurtleHero("normal", 0.5, "agent", (100, 600))
+    world = World(grid_file_path, assets_path, *screen_size, headless=pygame.display.get_surface() is None)
+    entities = None
+    if enemies:
+        entities = EntityManager(world, pool_size=enemies)
+        entities.spawn_random(enemies, seed=seed, keep_out=spawn_keep_out(world, hero))
+    return GameSession(world, hero, entities, **kwargs)
+
+
+def spawn_keep_out(world, hero, margin=256):
+    """Returns area around the hero (with margin, in pixels) where enemies must not spawn, so the hero doesn't die right at start"""
+    x, y, w, h = world.get_player_box(hero)
+    return EntityManager.expand((x, y, x + w, y + h), margin)
@@ -0,0 +1,64 @@
+import struct
+
+# Binary snapshot of the game state: the camera offset, states of dynamic objects (loot crates), the hero physics and animation
+# state and (optionally) enemies. Assets, frames and static terrain are immutable, so they are not part of it and restoring never
+# loads anything; the cost of both saving and restoring is proportional to the size of the state itself (a few dozen bytes, plus
+# a byte per dynamic object and 40 bytes per enemy).
+# Particles are cosmetic and are not saved.
+
+MAGIC = b'TSNP'
+VERSION = 3
+HAS_ENTITIES = 1
+
+HEADER = struct.Struct('<4sBB')  # magic, version, flags
+WORLD = struct.Struct('<dd')  # camera offset
+OBJECTS = struct.Struct('<I')  # number of dynamic objects, followed by a byte per object (see DynamicObjects.get_state)
+HERO = struct.Struct('<ddiiddddiBddiBB?iB?')  # see TurtleHero.get_state
+ENTITIES = struct.Struct('<III')  # tick, next uid, number of enemies
+ENEMY = struct.Struct('<ddddbI')  # see EntityManager.get_state
+
+
+def save_snapshot(world, hero, entities=None):
+    """
+    Saves state of the game as a small binary blob
+    :param world: World
+    :param hero: TurtleHero
+    :param entities: EntityManager, or None if enemies are not saved
+    :return: bytes
+    """
+    parts = [HEADER.pack(MAGIC, VERSION, HAS_ENTITIES if entities is not None else 0),
+             WORLD.pack(*world.get_state()),
+             OBJECTS.pack(len(world.dynamic)),
+             world.dynamic.get_state(),
+             HERO.pack(*hero.get_state())]
+    if entities is not None:
+        tick, next_uid, enemies = entities.get_state()
+        parts.append(ENTITIES.pack(tick, next_uid, len(enemies)))
+        parts.extend(ENEMY.pack(*enemy) for enemy in enemies)
+    return b''.join(parts)
+
+
+def restore_snapshot(data, world, hero, entities=None):
+    """
+    Restores state of the game saved with save_snapshot
+    :param data: bytes
+    :param world: World the snapshot was taken in
+    :param hero: TurtleHero
+    :param entities: EntityManager; enemies are restored only if both this is given and the snapshot contains them
+    """
+    magic, version, flags = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a snapshot of version {}".format(VERSION))
+    offset = HEADER.size
+    world.set_state(WORLD.unpack_from(data, offset))
+    offset += WORLD.size
+    count, = OBJECTS.unpack_from(data, offset)
+    offset += OBJECTS.size
+    world.dynamic.set_state(data[offset:offset + count])
+    offset += count
+    hero.set_state(HERO.unpack_from(data, offset))
+    offset += HERO.size
+    if entities is not None and flags & HAS_ENTITIES:
+        tick, next_uid, count = ENTITIES.unpack_from(data, offset)
+        offset += ENTITIES.size
+        entities.set_state((tick, next_uid, [ENEMY.unpack_from(data, offset + i * ENEMY.size) for i in range(count)]))
@@ -0,0 +1,219 @@
+import argparse
+import atexit
+import glob
+import gzip
+import json
+import os
+import platform
+import time
+from collections import defaultdict
+
+import pygame
+
+TELEMETRY_VERSION = 1
+
+
+class Histogram:
+    """
+    Histogram of non-negative integers with buckets of bounded relative size (like HDR histograms): values below 2 ** (bits + 1)
+    have buckets of their own, larger ones share a bucket with those having the same bits + 1 highest bits. So any value from
+    1 to billions is kept with relative error below 2 ** -bits, in a few hundred buckets at most; only used buckets are stored.
+    """
+
+    def __init__(self, bits=5):
+        """
+        :param bits: precision, values are kept with relative error below 2 ** -bits
+        """
+        self.bits = bits
+        self.counts = {}  # bucket: count
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def bucket(self, value):
+        shift = max(value.bit_length() - self.bits - 1, 0)
+        return (shift << self.bits) + (value >> shift)
+
+    def bucket_value(self, bucket):
+        """Returns the highest value of bucket"""
+        if bucket < 2 << self.bits:
+            return bucket
+        shift = (bucket >> self.bits) - 1
+        return ((bucket - (shift << self.bits) + 1) << shift) - 1
+
+    def record(self, value):
+        value = max(int(value), 0)
+        bucket = self.bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Adds counts of other histogram (of the same precision)"""
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        """
+        Returns value at percentile, as the highest value of its bucket (but never more than the maximum)
+        :param p: percentile, 0 - 100
+        """
+        if self.count == 0:
+            return 0
+        rank = max(int(p / 100 * self.count + 0.5), 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self.bucket_value(bucket), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self):
+        return {'bits': self.bits, 'count': self.count, 'total': self.total, 'max': self.max,
+                'counts': [[bucket, count] for bucket, count in sorted(self.counts.items())]}
+
+    @staticmethod
+    def from_dict(data):
+        histogram = Histogram(data['bits'])
+        histogram.counts = {bucket: count for bucket, count in data['counts']}
+        histogram.count, histogram.total, histogram.max = data['count'], data['total'], data['max']
+        return histogram
+
+
+def hardware_profile():
+    """Returns dict describing the machine (coarsely, so that sessions on similar machines share a profile)"""
+    info = pygame.display.Info() if pygame.display.get_init() else None
+    return {'system': platform.system(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'video_driver': pygame.display.get_driver() if pygame.display.get_init() else None,
+            'display': [info.current_w, info.current_h] if info is not None else None}
+
+
+def profile_name(profile):
+    return "{} {} {} cpus".format(profile['system'], profile['machine'], profile['cpus'])
+
+
+class Telemetry:
+    """
+    Records statistics of a game session in memory (histograms of frame times, collision and sprite counts and so on, and
+    durations of level loading phases) and writes them to a small gzipped JSON file when the session ends. Recording a value
+    is a dictionary update, cheap enough for every frame. Files of many sessions are aggregated with the CLI of this module.
+    """
+
+    def __init__(self, directory='telemetry', level=None, save_at_exit=True):
+        """
+        :param directory: folder for session files
+        :param level: name of the played level
+        :param save_at_exit: if True, the session is saved when the interpreter exits (unless it was saved before)
+        """
+        self.directory = directory
+        self.level = level
+        self.started = time.time()
+        self.profile = hardware_profile()  # taken right away, at exit the display may be closed already
+        self.histograms = defaultdict(Histogram)  # metric: Histogram
+        self.phases = {}  # loading phase: duration, in seconds
+        self.__saved = False
+        if save_at_exit:
+            atexit.register(self.save)
+
+    def record(self, metric, value):
+        """
+        Records a value of metric
+        :param metric: name of the metric, for eg. 'frame_us'
+        :param value: non-negative integer (times should be recorded in microseconds)
+        """
+        self.histograms[metric].record(value)
+
+    def record_phases(self, durations, prefix=''):
+        """
+        Records durations of loading phases
+        :param durations: dict {phase: duration in seconds}, for eg. World.load_times
+        :param prefix: prefix of phase names, for eg. 'world.'
+        """
+        for phase, duration in durations.items():
+            self.phases[prefix + phase] = duration
+
+    def save(self, path=None):
+        """
+        Writes the session to a file (only once; later calls do nothing)
+        :param path: path of the file, by default a new file in the telemetry folder
+        :return: path of the written file, None if it was saved already
+        """
+        if self.__saved:
+            return None
+        self.__saved = True
+        if path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, "session_{}_{}.json.gz".format(time.strftime("%Y%m%d_%H%M%S"), os.getpid()))
+        session = {'version': TELEMETRY_VERSION,
+                   'level': self.level,
+                   'profile': self.profile,
+                   'started': self.started,
+                   'duration': time.time() - self.started,
+                   'phases': self.phases,
+                   'histograms': {metric: histogram.to_dict() for metric, histogram in self.histograms.items()}}
+        with gzip.open(path, 'wt') as file:
+            json.dump(session, file, separators=(',', ':'))
+        return path
+
+
+def load_session(path):
+    with gzip.open(path, 'rt') as file:
+        session = json.load(file)
+    if session.get('version') != TELEMETRY_VERSION:
+        raise ValueError("Unsupported telemetry version {} of {}".format(session.get('version'), path))
+    return session
+
+
+def aggregate(sessions, by=('level', 'profile')):
+    """
+    Merges sessions into groups
+    :param sessions: list of sessions, as returned by load_session
+    :param by: what sessions are grouped by, any of 'level', 'profile'
+    :return: dict {group (tuple): {'sessions': n, 'histograms': {metric: Histogram}, 'phases': {phase: Histogram of microseconds}}}
+    """
+    groups = {}
+    for session in sessions:
+        key = tuple(profile_name(session['profile']) if field == 'profile' else str(session[field]) for field in by)
+        group = groups.setdefault(key, {'sessions': 0, 'histograms': {}, 'phases': {}})
+        group['sessions'] += 1
+        for metric, data in session['histograms'].items():
+            histogram = Histogram.from_dict(data)
+            if metric in group['histograms']:
+                group['histograms'][metric].merge(histogram)
+            else:
+                group['histograms'][metric] = histogram
+        for phase, duration in session['phases'].items():
+            group['phases'].setdefault(phase, Histogram()).record(duration * 1e6)
+    return groups
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", help="session files (or glob patterns)", nargs='+')
+    parser.add_argument("--by", help="grouping of sessions", choices=['level', 'profile', 'both'], default='both')
+    args = parser.parse_args()
+
+    paths = sorted(path for pattern in args.files for path in glob.glob(pattern))
+    by = ('level', 'profile') if args.by == 'both' else (args.by,)
+    groups = aggregate([load_session(path) for path in paths], by)
+    print("{} sessions in {} groups".format(len(paths), len(groups)))
+    for key, group in sorted(groups.items()):
+        print("\n{} ({} sessions)".format(" / ".join(key), group['sessions']))
+        print("  {:<24}{:>10}{:>10}{:>10}{:>10}{:>10}{:>12}".format("metric", "mean", "p50", "p90", "p99", "max", "samples"))
+        for name, histogram in sorted(group['histograms'].items()) + sorted(("load us: " + phase, histogram)
+                                                                           for phase, histogram in group['phases'].items()):
+            print("  {:<24}{:>10.1f}{:>10}{:>10}{:>10}{:>10}{:>12}".format(
+                name, histogram.mean(), histogram.percentile(50), histogram.percentile(90), histogram.percentile(99),
+                histogram.max, histogram.count))
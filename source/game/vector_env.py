@@ -0,0 +1,159 @@
+import argparse
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from source.game.session import ACTIONS, make_session
+
+
+def worker(connection, buffer_name, n_envs, first, observation_size, session_kwargs):
+    """
+    Steps a slice of environments, reading actions from and writing observations, rewards and dones to the shared buffer. Pipe
+    messages are only the commands, so stepping the whole slice costs a single round trip. Finished episodes are reset right away
+    (the observation of the new episode is returned).
+    :param connection: end of the pipe to the VectorEnv
+    :param buffer_name: name of the shared memory with buffers, see VectorEnv.make_buffers
+    :param n_envs: number of all environments
+    :param first: index of the first environment of the slice
+    :param session_kwargs: list of make_session keyword arguments, one per environment of the slice
+    """
+    sessions = [make_session(**kwargs) for kwargs in session_kwargs]
+    memory = shared_memory.SharedMemory(name=buffer_name)
+    observations, actions, rewards, dones = VectorEnv.make_buffers(memory.buf, n_envs, observation_size)
+    connection.send('ready')
+    try:
+        while True:
+            command = connection.recv()
+            if command == 'step':
+                for i, session in enumerate(sessions, first):
+                    _, rewards[i], dones[i], _ = session.step(int(actions[i]))
+                    if dones[i]:
+                        session.reset()
+                    session.observe(observations[i])
+            elif command == 'reset':
+                for i, session in enumerate(sessions, first):
+                    session.reset()
+                    session.observe(observations[i])
+            elif command == 'close':
+                break
+            connection.send(command)
+    finally:
+        del observations, actions, rewards, dones
+        memory.close()
+
+
+class VectorEnv:
+    """
+    Steps many headless game sessions (see GameSession) in subprocesses. Each process steps a slice of environments, and all
+    observations, actions, rewards and dones live in a single shared memory buffer, so nothing but short commands goes through pipes.
+    Arrays returned by reset and step are views of the shared buffer: they are overwritten by the next call.
+    """
+
+    def __init__(self, n_envs, n_workers=None, seeds=None, **session_kwargs):
+        """
+        :param n_envs: number of environments
+        :param n_workers: number of processes, by default the number of CPUs (but not more than environments)
+        :param seeds: seeds of enemy spawning, one per environment (by default 0, 1, 2...)
+        :param session_kwargs: make_session keyword arguments, common to all environments
+        """
+        self.n_envs = n_envs
+        self.n_workers = min(n_workers or mp.cpu_count(), n_envs)
+        self.n_actions = len(ACTIONS)
+        seeds = range(n_envs) if seeds is None else seeds
+        window = session_kwargs.get('window', (9, 15))
+        self.observation_size = window[0] * window[1] + 4
+
+        self.__memory = shared_memory.SharedMemory(create=True, size=self.buffer_size(n_envs, self.observation_size))
+        self.observations, self.actions, self.rewards, self.dones = self.make_buffers(self.__memory.buf, n_envs, self.observation_size)
+
+        context = mp.get_context('spawn')  # every worker starts clean, without pygame state of this process
+        bounds = np.linspace(0, n_envs, self.n_workers + 1).astype(int)
+        self.__connections = []
+        self.__processes = []
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            connection, child = context.Pipe()
+            kwargs = [dict(session_kwargs, seed=int(seed)) for seed in seeds[first:last]]
+            process = context.Process(target=worker, args=(child, self.__memory.name, n_envs, int(first), self.observation_size, kwargs),
+                                      daemon=True)
+            process.start()
+            self.__connections.append(connection)
+            self.__processes.append(process)
+        for connection in self.__connections:
+            connection.recv()
+
+    @staticmethod
+    def buffer_size(n_envs, observation_size):
+        """Returns size of the shared buffer, in bytes"""
+        return n_envs * (observation_size * 4 + 4 + 4 + 1)
+
+    @staticmethod
+    def make_buffers(buffer, n_envs, observation_size):
+        """
+        Makes arrays over the shared buffer
+        :return: observations (n_envs, observation_size) float32, actions (n_envs,) int32, rewards (n_envs,) float32, dones (n_envs,) bool
+        """
+        observations = np.ndarray((n_envs, observation_size), np.float32, buffer)
+        offset = observations.nbytes
+        actions = np.ndarray(n_envs, np.int32, buffer, offset)
+        rewards = np.ndarray(n_envs, np.float32, buffer, offset + actions.nbytes)
+        dones = np.ndarray(n_envs, np.bool_, buffer, offset + actions.nbytes + rewards.nbytes)
+        return observations, actions, rewards, dones
+
+    def command(self, command):
+        """Sends command to all workers and waits until they are done"""
+        for connection in self.__connections:
+            connection.send(command)
+        for connection in self.__connections:
+            connection.recv()
+
+    def reset(self):
+        """
+        Resets all environments
+        :return: observations
+        """
+        self.command('reset')
+        return self.observations
+
+    def step(self, actions):
+        """
+        Steps all environments; finished ones are reset automatically
+        :param actions: array of action indices (see ACTIONS), one per environment
+        :return: (observations, rewards, dones)
+        """
+        self.actions[:] = actions
+        self.command('step')
+        return self.observations, self.rewards, self.dones
+
+    def close(self):
+        """Stops workers and frees the shared buffer"""
+        for connection in self.__connections:
+            connection.send('close')
+        for process in self.__processes:
+            process.join()
+        del self.observations, self.actions, self.rewards, self.dones
+        self.__memory.close()
+        self.__memory.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--envs", help="number of environments", type=int, default=32)
+    parser.add_argument("--workers", help="number of processes", type=int, default=None)
+    parser.add_argument("--enemies", help="number of enemies in each environment", type=int, default=0)
+    parser.add_argument("--steps", help="number of steps of all environments", type=int, default=1000)
+    args = parser.parse_args()
+
+    env = VectorEnv(args.envs, args.workers, enemies=args.enemies)
+    env.reset()
+    rng = np.random.default_rng(0)
+    started = time.perf_counter()
+    episodes = 0
+    for _ in range(args.steps):
+        _, _, dones = env.step(rng.integers(env.n_actions, size=args.envs))
+        episodes += int(dones.sum())
+    elapsed = time.perf_counter() - started
+    print("{} environments in {} processes: {:.0f} steps/s ({} finished episodes)".format(
+        args.envs, env.n_workers, args.envs * args.steps / elapsed, episodes))
+    env.close()
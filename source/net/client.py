@@ -0,0 +1,102 @@
+import socket
+from collections import OrderedDict, deque
+
+from source.net.player import NetPlayer, find_spawn
+from source.net.protocol import HELLO, WELCOME, SNAPSHOT, BYE, NO_BASELINE, INPUT_REDUNDANCY, WELCOME_PACKET, SNAPSHOT_HEADER, \
+    MALFORMED, decode_players, pack_input
+from source.turtles import physics
+
+
+class GameClient:
+    """
+    Client of the multiplayer game. Its own player is predicted: every input is applied locally right away and sent to the server.
+    When a snapshot arrives, the player is reset to the authoritative state and inputs the server hasn't processed yet are applied
+    again (reconciliation), so the player reacts immediately and still ends up where the server says. Other players are shown as
+    the latest snapshot has them.
+    """
+
+    def __init__(self, server_address, collider, history=64, max_pending=120):
+        """
+        :param server_address: (host, port) of the server
+        :param collider: TileCollider of the world (the same one the server uses), for prediction
+        :param history: number of kept snapshots, baselines of delta encoded ones
+        :param max_pending: maximum number of inputs kept for reconciliation
+        """
+        self.server_address = server_address
+        self.collider = collider
+        self.history_size = history
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+        self.player_id = None
+        self.tick_rate = None
+        self.player = NetPlayer(find_spawn(collider))  # own player, predicted
+        self.players = {}  # player id: quantized state, as in the latest snapshot
+        self.ack_tick = NO_BASELINE
+        self.seq = 0
+        self.__pending = deque(maxlen=max_pending)  # (sequence number, bits) of inputs not processed by the server yet
+        self.__snapshots = OrderedDict()  # tick: players
+        self.corrections = 0  # number of snapshots that moved the predicted player
+        self.bytes_received = 0
+        self.malformed = 0  # number of dropped empty or truncated packets
+
+    def connect(self):
+        """Asks the server to join the game; repeated until the WELCOME arrives (see poll)"""
+        self.socket.sendto(bytes([HELLO]), self.server_address)
+
+    def disconnect(self):
+        self.socket.sendto(bytes([BYE]), self.server_address)
+        self.socket.close()
+
+    def send_input(self, bits):
+        """
+        Applies input to the own player and sends it (with a few previous ones, in case packets get lost) to the server
+        :param bits: input bits (see protocol)
+        """
+        if self.player_id is None:
+            self.connect()
+            return
+        self.seq += 1
+        self.__pending.append((self.seq, bits))
+        self.player.step(bits, self.collider, physics.TICK)
+        inputs = list(self.__pending)[-INPUT_REDUNDANCY:]
+        self.socket.sendto(pack_input(self.ack_tick, inputs), self.server_address)
+
+    def poll(self):
+        """Handles all pending datagrams from the server"""
+        while True:
+            try:
+                data, address = self.socket.recvfrom(65536)
+            except (BlockingIOError, ConnectionResetError):
+                return
+            self.bytes_received += len(data)
+            try:
+                if data[0] == WELCOME:
+                    self.player_id, self.tick_rate = WELCOME_PACKET.unpack(data)[1:]
+                elif data[0] == SNAPSHOT:
+                    self.apply_snapshot(data)
+            except MALFORMED:  # empty or truncated packets are dropped; a snapshot is applied only once it's decoded entirely
+                self.malformed += 1
+
+    def apply_snapshot(self, data):
+        _, tick, baseline, input_ack = SNAPSHOT_HEADER.unpack_from(data, 0)
+        if self.ack_tick != NO_BASELINE and tick <= self.ack_tick:
+            return  # out of order
+        if baseline != NO_BASELINE and baseline not in self.__snapshots:
+            return  # the baseline is already forgotten, the next snapshot will be encoded against a newer one
+        players = decode_players(data, SNAPSHOT_HEADER.size, self.__snapshots.get(baseline))
+        self.__snapshots[tick] = players
+        while len(self.__snapshots) > self.history_size:
+            self.__snapshots.popitem(last=False)
+        self.ack_tick = tick
+        self.players = players
+
+        if self.player_id in players:
+            predicted = self.player.get_state()
+            self.player.set_state(players[self.player_id])
+            while self.__pending and self.__pending[0][0] <= input_ack:
+                self.__pending.popleft()
+            for seq, bits in self.__pending:
+                self.player.step(bits, self.collider, physics.TICK)
+            if self.player.get_state() != predicted:
+                self.corrections += 1
@@ -0,0 +1,149 @@
+import argparse
+import multiprocessing as mp
+import socket
+import time
+from collections import deque
+
+import numpy as np
+
+from source.net.client import GameClient
+from source.net.player import load_collider
+from source.net.protocol import HELLO, WELCOME, SNAPSHOT, BYE, LEFT, RIGHT, FAST, JUMP, NO_BASELINE, INPUT_REDUNDANCY, \
+    SNAPSHOT_HEADER, pack_input
+from source.net.server import GameServer
+
+
+class BotClient:
+    """
+    Lightweight client for load testing: sends inputs and acknowledges snapshots like GameClient does, but doesn't decode them nor
+    predict, so a single process can simulate hundreds of clients (the server does the same work for both)
+    """
+
+    def __init__(self, server_address):
+        self.server_address = server_address
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+        self.player_id = None
+        self.ack_tick = NO_BASELINE
+        self.seq = 0
+        self.__recent = deque(maxlen=INPUT_REDUNDANCY)
+
+    def connect(self):
+        self.socket.sendto(bytes([HELLO]), self.server_address)
+
+    def disconnect(self):
+        self.socket.sendto(bytes([BYE]), self.server_address)
+        self.socket.close()
+
+    def send_input(self, bits):
+        if self.player_id is None:
+            self.connect()
+            return
+        self.seq += 1
+        self.__recent.append((self.seq, bits))
+        self.socket.sendto(pack_input(self.ack_tick, list(self.__recent)), self.server_address)
+
+    def poll(self):
+        while True:
+            try:
+                data = self.socket.recv(65536)
+            except (BlockingIOError, ConnectionResetError):
+                return
+            if data[0] == WELCOME:
+                self.player_id = 0
+            elif data[0] == SNAPSHOT:
+                tick = SNAPSHOT_HEADER.unpack_from(data, 0)[1]
+                if self.ack_tick == NO_BASELINE or tick > self.ack_tick:
+                    self.ack_tick = tick
+
+
+def run_server(grid_file_path, assets_path, tick_rate, duration, queue):
+    """Runs server in its own process, so its CPU time is measured apart from the clients; reports its address, then its stats"""
+    server = GameServer(grid_file_path, assets_path, tick_rate=tick_rate)
+    queue.put(server.address)
+    server.serve(duration)
+    queue.put(server.stats)
+    server.close()
+
+
+def run_load_test(n_clients, duration, grid_file_path, assets_path, tick_rate=60, n_full=4, seed=0):
+    """
+    Runs server and n_clients clients over loopback: n_full of them are full GameClients (predicting and decoding snapshots),
+    the rest are BotClients. All of them hold random inputs (walking, running, jumping) for random times.
+    :param duration: time the clients play, in seconds (the server runs a second longer)
+    :return: dict with the report
+    """
+    context = mp.get_context('spawn')
+    queue = context.Queue()
+    server = context.Process(target=run_server, args=(grid_file_path, assets_path, tick_rate, duration + 1.0, queue), daemon=True)
+    server.start()
+    address = queue.get()
+
+    collider = load_collider(grid_file_path, assets_path)
+    clients = [GameClient(address, collider) if i < n_full else BotClient(address) for i in range(n_clients)]
+    for client in clients:
+        client.connect()
+    rng = np.random.default_rng(seed)
+    choices = [0, RIGHT, LEFT, RIGHT | FAST, LEFT | FAST, RIGHT | JUMP, LEFT | FAST | JUMP, JUMP]
+    bits = [0] * n_clients
+    hold = [0] * n_clients
+
+    started = next_tick = time.perf_counter()
+    ticks = 0
+    while time.perf_counter() - started < duration:
+        for i, client in enumerate(clients):
+            client.poll()
+            if hold[i] == 0:
+                bits[i], hold[i] = choices[int(rng.integers(len(choices)))], int(rng.integers(10, 90))
+            hold[i] -= 1
+            client.send_input(bits[i])
+        ticks += 1
+        next_tick += 1.0 / tick_rate
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_tick = time.perf_counter()
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        client.poll()
+        client.disconnect()
+
+    stats = queue.get()
+    server.join()
+    connected = sum(client.player_id is not None for client in clients)
+    player_ticks = max(stats['ticks'] * stats['max_players'], 1)
+    return {'clients': n_clients,
+            'connected': connected,
+            'client_ticks': ticks,
+            'elapsed': elapsed,
+            'server_ticks': stats['ticks'],
+            'overruns': stats['overruns'],
+            'sent_per_player': stats['bytes_sent'] / elapsed / max(connected, 1),
+            'received_per_player': stats['bytes_received'] / elapsed / max(connected, 1),
+            'mean_snapshot': stats['bytes_sent'] / max(stats['snapshots'], 1),
+            'encodes_per_snapshot_round': stats['encodes'] / max(stats['snapshots'] / max(connected, 1), 1),
+            'cpu_per_tick': stats['cpu_time'] / max(stats['ticks'], 1),
+            'cpu_per_player_tick': stats['cpu_time'] / player_ticks,
+            'corrections': sum(client.corrections for client in clients[:n_full])}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", help="number of simulated clients", type=int, default=100)
+    parser.add_argument("--duration", help="time to play, in seconds", type=float, default=10.0)
+    parser.add_argument("--full", help="number of full (predicting) clients among them", type=int, default=4)
+    parser.add_argument("--tick_rate", help="number of ticks per second", type=int, default=60)
+    parser.add_argument("--world", help="path to the grid info file", type=str,
+                        default='source/worlds/world_instances/world_1/grid_info.p')
+    parser.add_argument("--assets", help="path to the folder with assets", type=str, default='source/worlds/assets')
+    args = parser.parse_args()
+
+    report = run_load_test(args.clients, args.duration, args.world, args.assets, args.tick_rate, args.full)
+    print("{} of {} clients connected, {} client ticks and {} server ticks in {:.1f} s ({} late server ticks)".format(
+        report['connected'], report['clients'], report['client_ticks'], report['server_ticks'], report['elapsed'], report['overruns']))
+    print("Bandwidth per player: {:.1f} kB/s down, {:.1f} kB/s up; mean snapshot {:.0f} B, {:.2f} encodes per snapshot round".format(
+        report['sent_per_player'] / 1000, report['received_per_player'] / 1000, report['mean_snapshot'],
+        report['encodes_per_snapshot_round']))
+    print("Server CPU: {:.3f} ms per tick, {:.1f} us per player per tick; {} prediction corrections".format(
+        report['cpu_per_tick'] * 1000, report['cpu_per_player_tick'] * 1e6, report['corrections']))
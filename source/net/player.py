@@ -0,0 +1,98 @@
+import pickle
+
+from source.net.protocol import LEFT, RIGHT, FAST, JUMP, POSITION_SCALE, SPEED_SCALE
+from source.physics.tile_collider import collider_from_assets
+from source.turtles import physics
+from source.worlds.assets import load_asset_flags
+from source.worlds.cell_types import cell_types
+from source.worlds.navigation import walkable_mask
+from source.worlds.reachability import find_start
+
+
+def load_collider(grid_file_path, assets_path):
+    """
+    Loads terrain of the world for simulation only: the objects matrix and physics flags of cell types, without any images
+    :return: TileCollider
+    """
+    grid_info = pickle.load(open(grid_file_path, "rb"))
+    flags = load_asset_flags(assets_path, [name for name in cell_types.keys() if name != 'EMPTY_CELL'])
+    type_ids = {name: i for i, name in enumerate(cell_types.keys())}
+    return collider_from_assets(grid_info['objects_matrix'], grid_info['cell_w'], grid_info['cell_h'], flags, type_ids)
+
+
+def find_spawn(collider, w=physics.HERO_BOX[0], h=physics.HERO_BOX[1]):
+    """Returns top-left corner (x, y) of a box standing in the middle of the starting cell (see find_start)"""
+    column, row = find_start(walkable_mask(collider))
+    return (column + 0.5) * collider.cell_w - w / 2, (row + 1) * collider.cell_h - h
+
+
+class NetPlayer:
+    """
+    Turtle of a networked game, simulated in world coordinates with the hero physics constants. Its state is quantized after every
+    step (the same way it's sent over the network), so the server and a predicting client, starting from the same state and
+    applying the same inputs, compute exactly the same movement.
+    """
+
+    def __init__(self, spawn, w=physics.HERO_BOX[0], h=physics.HERO_BOX[1]):
+        """
+        :param spawn: top-left corner (x, y) of the box, where the player starts and respawns after death
+        :params w, h: size of the collision box, in pixels
+        """
+        self.spawn = spawn
+        self.w = w
+        self.h = h
+        self.respawn()
+
+    def respawn(self):
+        self.x, self.y = self.spawn
+        self.vx = 0.0
+        self.vy = 0.0
+        self.on_ground = False
+        self.left = False
+        self.quantize()
+
+    def step(self, bits, collider, tick=physics.TICK):
+        """
+        Simulates a single tick
+        :param bits: input bits (see protocol)
+        :param collider: TileCollider of the world
+        :param tick: time step, in seconds
+        """
+        speed = physics.SPEED_FAST if bits & FAST else physics.SPEED_SLOW
+        target = -speed if bits & LEFT else speed if bits & RIGHT else 0
+        if self.vx < target:
+            self.vx = min(self.vx + physics.ACC * tick, target)
+        elif self.vx > target:
+            self.vx = max(self.vx - physics.ACC * tick, target)
+        if self.vx:
+            self.left = self.vx < 0
+        if bits & JUMP and self.on_ground:
+            self.vy = -physics.JUMP_SPEED
+
+        result = collider.move(self.x, self.y, self.w, self.h, self.vx * tick, self.vy * tick + physics.GRAVITY * tick ** 2 / 2)
+        if result.deadly or result.fell_out:
+            self.respawn()
+            return
+        self.x, self.y = result.x, result.y
+        if result.hit_x:
+            self.vx = 0.0
+        self.vy = 0.0 if result.hit_y < 0 else self.vy + physics.GRAVITY * tick
+        self.on_ground = result.on_ground
+        if self.on_ground and self.vy > 0:
+            self.vy = 0.0
+        self.quantize()
+
+    def quantize(self):
+        """Rounds state to the precision it's sent with"""
+        self.set_state(self.get_state())
+
+    def get_state(self):
+        """Returns state quantized to integers: (x, y, vx, vy, flags)"""
+        return (int(round(self.x * POSITION_SCALE)), int(round(self.y * POSITION_SCALE)), int(round(self.vx * SPEED_SCALE)),
+                int(round(self.vy * SPEED_SCALE)), self.on_ground | self.left << 1)
+
+    def set_state(self, state):
+        x, y, vx, vy, flags = state
+        self.x, self.y = x / POSITION_SCALE, y / POSITION_SCALE
+        self.vx, self.vy = vx / SPEED_SCALE, vy / SPEED_SCALE
+        self.on_ground, self.left = bool(flags & 1), bool(flags & 2)
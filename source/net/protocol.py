@@ -0,0 +1,127 @@
+import struct
+
+from source.game.controls import LEFT, RIGHT, FAST, JUMP  # input bits are actions of the controls
+
+# Datagram protocol of the multiplayer game. Every packet starts with its type byte. Player states are quantized to integers
+# (see NetPlayer.get_state) and snapshots are delta encoded against a snapshot the client acknowledged: only players and fields
+# that changed are sent, as zigzag varints of the difference, so a player standing still costs nothing and a moving one a few bytes.
+
+HELLO = 0  # client -> server: join
+WELCOME = 1  # server -> client: player id, tick rate
+INPUT = 2  # client -> server: acknowledged snapshot tick and the last few inputs
+SNAPSHOT = 3  # server -> client: delta encoded states of all players
+BYE = 4  # client -> server: leave
+
+POSITION_SCALE = 8  # positions are sent in 1/8 px
+SPEED_SCALE = 8  # speeds are sent in 1/8 px / s
+FIELDS = 5  # x, y, vx, vy, flags
+NO_BASELINE = 0xFFFFFFFF
+INPUT_REDUNDANCY = 8  # every input packet repeats this many recent inputs, so a lost packet doesn't lose input
+
+WELCOME_PACKET = struct.Struct('<BHH')  # type, player id, tick rate
+INPUT_HEADER = struct.Struct('<BIB')  # type, acknowledged snapshot tick, number of inputs
+INPUT_ENTRY = struct.Struct('<IB')  # input sequence number, input bits
+SNAPSHOT_HEADER = struct.Struct('<BIII')  # type, tick, baseline tick, the last input sequence number processed for this client
+
+MALFORMED = (struct.error, IndexError)  # raised when unpacking truncated packets; such packets are dropped
+
+
+def write_varint(out, value):
+    """Appends unsigned integer to bytearray, 7 bits per byte (LEB128)"""
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset):
+    """Reads unsigned integer written by write_varint; returns (value, offset after it)"""
+    value, shift = 0, 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def zigzag(value):
+    """Maps signed integer to unsigned one, small absolute values to small numbers"""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def encode_players(players, baseline=None):
+    """
+    Delta encodes states of players
+    :param players: dict {player id: quantized state (tuple of FIELDS ints)}
+    :param baseline: players dict the receiver already has, or None for a full snapshot
+    :return: bytes
+    """
+    baseline = baseline or {}
+    zero = (0,) * FIELDS
+    out = bytearray()
+    changed = [(player_id, state) for player_id, state in players.items() if baseline.get(player_id) != state]
+    write_varint(out, len(changed))
+    for player_id, state in changed:
+        base = baseline.get(player_id, zero)
+        mask = 0
+        for i in range(FIELDS):
+            if state[i] != base[i]:
+                mask |= 1 << i
+        write_varint(out, player_id)
+        out.append(mask)
+        for i in range(FIELDS):
+            if mask >> i & 1:
+                write_varint(out, zigzag(state[i] - base[i]))
+    removed = [player_id for player_id in baseline if player_id not in players]
+    write_varint(out, len(removed))
+    for player_id in removed:
+        write_varint(out, player_id)
+    return bytes(out)
+
+
+def decode_players(data, offset=0, baseline=None):
+    """
+    Decodes states of players encoded with encode_players
+    :param baseline: the same baseline the players were encoded against
+    :return: dict {player id: quantized state}
+    """
+    players = dict(baseline or {})
+    zero = (0,) * FIELDS
+    count, offset = read_varint(data, offset)
+    for _ in range(count):
+        player_id, offset = read_varint(data, offset)
+        mask = data[offset]
+        offset += 1
+        state = list(players.get(player_id, zero))
+        for i in range(FIELDS):
+            if mask >> i & 1:
+                delta, offset = read_varint(data, offset)
+                state[i] += unzigzag(delta)
+        players[player_id] = tuple(state)
+    count, offset = read_varint(data, offset)
+    for _ in range(count):
+        player_id, offset = read_varint(data, offset)
+        players.pop(player_id, None)
+    return players
+
+
+def pack_input(ack_tick, inputs):
+    """
+    :param ack_tick: tick of the latest snapshot received, or NO_BASELINE
+    :param inputs: list of (sequence number, bits), oldest first
+    """
+    return INPUT_HEADER.pack(INPUT, ack_tick, len(inputs)) + b''.join(INPUT_ENTRY.pack(seq, bits) for seq, bits in inputs)
+
+
+def unpack_input(data):
+    """Returns (acknowledged tick, list of (sequence number, bits)); raises struct.error if the packet is truncated"""
+    _, ack_tick, count = INPUT_HEADER.unpack_from(data, 0)
+    if len(data) < INPUT_HEADER.size + count * INPUT_ENTRY.size:
+        raise struct.error("input packet of {} bytes is too short for {} inputs".format(len(data), count))
+    return ack_tick, [INPUT_ENTRY.unpack_from(data, INPUT_HEADER.size + i * INPUT_ENTRY.size) for i in range(count)]
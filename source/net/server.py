@@ -0,0 +1,189 @@
+import argparse
+import socket
+import time
+from collections import OrderedDict
+
+from source.net.player import NetPlayer, load_collider, find_spawn
+from source.net.protocol import HELLO, WELCOME, INPUT, BYE, SNAPSHOT, NO_BASELINE, WELCOME_PACKET, SNAPSHOT_HEADER, \
+    MALFORMED, encode_players, unpack_input
+from source.turtles import physics
+
+
+class ClientInfo:
+    """Connection of a single client, as seen by the server"""
+
+    def __init__(self, player_id, address, now):
+        self.player_id = player_id
+        self.address = address
+        self.inputs = {}  # sequence number: bits, received but not applied yet
+        self.last_seq = 0  # sequence number of the last applied input
+        self.bits = 0  # the last applied input, repeated when the next one didn't arrive in time
+        self.ack_tick = NO_BASELINE  # tick of the latest snapshot the client received
+        self.last_seen = now
+
+
+class GameServer:
+    """
+    Authoritative game server. Steps all players at a fixed tick, applying inputs of their clients in order, and sends every client
+    snapshots of all players, delta encoded against the latest snapshot the client acknowledged (full ones until it acknowledges any).
+    Clients acknowledging the same snapshot get the same payload, which is encoded only once. Uses a single non-blocking UDP socket.
+    """
+
+    def __init__(self, grid_file_path, assets_path, address=('127.0.0.1', 0), tick_rate=60, snapshot_interval=2, timeout=5.0,
+                 history=64, max_queued=4):
+        """
+        :param grid_file_path: the pickle file, describing world
+        :param assets_path: path to the folder with assets (only physics flags of cell types are read)
+        :param address: (host, port) to listen on; port 0 picks a free one
+        :param tick_rate: number of simulation ticks per second
+        :param snapshot_interval: snapshots are sent every that many ticks
+        :param timeout: clients silent for that many seconds are dropped
+        :param history: number of kept snapshots clients can acknowledge
+        :param max_queued: inputs queued above that are skipped, so a burst of late inputs doesn't turn into a lasting delay
+        """
+        self.collider = load_collider(grid_file_path, assets_path)
+        self.spawn = find_spawn(self.collider)
+        self.tick_rate = tick_rate
+        self.tick_time = 1.0 / tick_rate
+        self.snapshot_interval = snapshot_interval
+        self.timeout = timeout
+        self.history_size = history
+        self.max_queued = max_queued
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(address)
+        self.socket.setblocking(False)
+        self.address = self.socket.getsockname()
+
+        self.players = {}  # player id: NetPlayer
+        self.clients = {}  # address: ClientInfo
+        self.tick = 0
+        self.__next_id = 0
+        self.__history = OrderedDict()  # tick: {player id: quantized state}
+        self.stats = {'ticks': 0, 'cpu_time': 0.0, 'overruns': 0, 'snapshots': 0, 'bytes_sent': 0, 'bytes_received': 0,
+                      'encodes': 0, 'max_players': 0, 'malformed': 0}
+
+    def serve(self, duration=None):
+        """
+        Runs the server loop
+        :param duration: time to run for, in seconds, or None to run forever
+        """
+        started = next_tick = time.perf_counter()
+        while duration is None or time.perf_counter() - started < duration:
+            cpu_started = time.process_time()
+            self.receive()
+            self.step()
+            self.drop_idle()
+            self.stats['cpu_time'] += time.process_time() - cpu_started
+
+            next_tick += self.tick_time
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:  # late; the next tick starts right away, but the lost time is not caught up
+                self.stats['overruns'] += 1
+                next_tick = time.perf_counter()
+
+    def receive(self):
+        """Handles all pending datagrams"""
+        while True:
+            try:
+                data, address = self.socket.recvfrom(2048)
+            except (BlockingIOError, ConnectionResetError):
+                return
+            self.stats['bytes_received'] += len(data)
+            try:
+                self.handle(data, address)
+            except MALFORMED:  # empty or truncated packets are dropped, a single bad datagram must not stop the server
+                self.stats['malformed'] += 1
+
+    def handle(self, data, address):
+        kind = data[0]
+        client = self.clients.get(address)
+        if kind == HELLO:
+            if client is None:
+                client = ClientInfo(self.__next_id, address, time.perf_counter())
+                self.__next_id += 1
+                self.clients[address] = client
+                self.players[client.player_id] = NetPlayer(self.spawn)
+                self.stats['max_players'] = max(self.stats['max_players'], len(self.players))
+            self.send(WELCOME_PACKET.pack(WELCOME, client.player_id, self.tick_rate), address)
+        elif client is None:
+            return
+        elif kind == INPUT:
+            ack_tick, inputs = unpack_input(data)
+            client.last_seen = time.perf_counter()
+            client.ack_tick = ack_tick
+            for seq, bits in inputs:
+                if seq > client.last_seq:
+                    client.inputs[seq] = bits
+        elif kind == BYE:
+            self.remove_client(client)
+
+    def remove_client(self, client):
+        del self.clients[client.address]
+        del self.players[client.player_id]
+
+    def drop_idle(self):
+        now = time.perf_counter()
+        for client in [client for client in self.clients.values() if now - client.last_seen > self.timeout]:
+            self.remove_client(client)
+
+    def step(self):
+        """Applies the next input of every client, steps all players and sends snapshots"""
+        for client in self.clients.values():
+            if len(client.inputs) > self.max_queued:
+                client.last_seq = sorted(client.inputs)[-self.max_queued] - 1
+                client.inputs = {seq: bits for seq, bits in client.inputs.items() if seq > client.last_seq}
+            if client.last_seq + 1 in client.inputs:
+                client.last_seq += 1
+                client.bits = client.inputs.pop(client.last_seq)
+            self.players[client.player_id].step(client.bits, self.collider, physics.TICK)
+        self.tick += 1
+        self.stats['ticks'] += 1
+        if self.tick % self.snapshot_interval == 0:
+            self.broadcast()
+
+    def broadcast(self):
+        states = {player_id: player.get_state() for player_id, player in self.players.items()}
+        self.__history[self.tick] = states
+        while len(self.__history) > self.history_size:
+            self.__history.popitem(last=False)
+
+        bodies = {}  # baseline tick: encoded players
+        for client in self.clients.values():
+            baseline = client.ack_tick if client.ack_tick in self.__history else NO_BASELINE
+            if baseline not in bodies:
+                bodies[baseline] = encode_players(states, self.__history.get(baseline))
+                self.stats['encodes'] += 1
+            self.send(SNAPSHOT_HEADER.pack(SNAPSHOT, self.tick, baseline, client.last_seq) + bodies[baseline], client.address)
+            self.stats['snapshots'] += 1
+
+    def send(self, packet, address):
+        try:
+            self.socket.sendto(packet, address)
+        except BlockingIOError:  # the socket buffer is full; the datagram is lost, like on the network
+            return
+        self.stats['bytes_sent'] += len(packet)
+
+    def close(self):
+        self.socket.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--world", help="path to the grid info file", type=str,
+                        default='source/worlds/world_instances/world_1/grid_info.p')
+    parser.add_argument("--assets", help="path to the folder with assets", type=str, default='source/worlds/assets')
+    parser.add_argument("--host", help="host to listen on", type=str, default='127.0.0.1')
+    parser.add_argument("--port", help="port to listen on", type=int, default=5555)
+    parser.add_argument("--tick_rate", help="number of ticks per second", type=int, default=60)
+    args = parser.parse_args()
+
+    server = GameServer(args.world, args.assets, (args.host, args.port), args.tick_rate)
+    print("Listening on {}:{}".format(*server.address))
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    server.close()
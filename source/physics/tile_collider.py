@@ -0,0 +1,148 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# result of a single move: resolved position, displacement actually made, whether movement was stopped on each axis
+# (-1, 0, 1 - direction of the hit), and contacts after the move
+MoveResult = namedtuple('MoveResult', ['x', 'y', 'dx', 'dy', 'hit_x', 'hit_y', 'on_ground', 'deadly', 'fell_out'])
+
+# tolerance of cell boundaries, so that boxes resting exactly on a cell edge don't leak into the neighbouring cell due to float errors
+EPS = 1e-6
+
+
+class TileCollider:
+    """
+    Resolves movement of axis aligned boxes against the tile grid of the world. Each query looks up cells of the objects matrix directly,
+    and movement is swept cell by cell on each axis separately, so that even fast movement can't tunnel through thin blocks.
+    Coordinates are world pixels, with the origin at the top-left corner of the grid.
+    """
+
+    def __init__(self, objects_matrix, cell_w, cell_h, solid_types, deadly_types):
+        """
+        :param objects_matrix: matrix of cell type indices, extracted from grid_info
+        :param cell_w, cell_h: size of a single cell, in pixels
+        :param solid_types: indices of cell types that stop movement
+        :param deadly_types: indices of cell types that are deadly in touch
+        """
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+        self.rows, self.cols = objects_matrix.shape
+
+        # per-type flags are turned into per-cell boolean grids once, so every query is a plain array lookup
+        n_types = max(int(objects_matrix.max()), max(list(solid_types) + list(deadly_types) + [0])) + 1
+        solid_lut = np.zeros(n_types, dtype=bool)
+        solid_lut[list(solid_types)] = True
+        deadly_lut = np.zeros(n_types, dtype=bool)
+        deadly_lut[list(deadly_types)] = True
+        self.solid = solid_lut[objects_matrix]
+        self.deadly = deadly_lut[objects_matrix]
+        self.__solid_lut, self.__deadly_lut = solid_lut, deadly_lut
+
+    def set_cell(self, row, col, type_id):
+        """Updates flags of a single cell whose type changed (for eg. an opened crate)"""
+        self.solid[row, col] = self.__solid_lut[type_id]
+        self.deadly[row, col] = self.__deadly_lut[type_id]
+
+    @staticmethod
+    def cell_range(start, size, cell):
+        """Returns indices of the first and the last cell covered by the interval [start, start + size)"""
+        return int(math.floor(start / cell + EPS)), int(math.ceil((start + size) / cell - EPS)) - 1
+
+    def any_cell(self, grid, col0, col1, row0, row1):
+        """
+        Checks whether any cell in the given (inclusive) range is set in the grid. Columns outside of the grid count as solid walls,
+        rows outside of it are empty (sky above and pits below).
+        """
+        if grid is self.solid and (col0 < 0 or col1 >= self.cols):
+            return True
+        row0, row1 = max(row0, 0), min(row1, self.rows - 1)
+        col0, col1 = max(col0, 0), min(col1, self.cols - 1)
+        if row0 > row1 or col0 > col1:
+            return False
+        return bool(grid[row0:row1 + 1, col0:col1 + 1].any())
+
+    def sweep_x(self, x, y, w, h, dx):
+        """
+        Moves box horizontally, stopping at the first solid column on its way
+        :return: (new x, hit direction)
+        """
+        row0, row1 = self.cell_range(y, h, self.cell_h)
+        col0, col1 = self.cell_range(x, w, self.cell_w)
+        if dx > 0:
+            target = self.cell_range(x + dx, w, self.cell_w)[1]
+            for col in range(col1 + 1, target + 1):
+                if self.any_cell(self.solid, col, col, row0, row1):
+                    return col * self.cell_w - w, 1
+        elif dx < 0:
+            target = self.cell_range(x + dx, w, self.cell_w)[0]
+            for col in range(col0 - 1, target - 1, -1):
+                if self.any_cell(self.solid, col, col, row0, row1):
+                    return (col + 1) * self.cell_w, -1
+        return x + dx, 0
+
+    def sweep_y(self, x, y, w, h, dy):
+        """
+        Moves box vertically, stopping at the first solid row on its way
+        :return: (new y, hit direction)
+        """
+        col0, col1 = self.cell_range(x, w, self.cell_w)
+        row0, row1 = self.cell_range(y, h, self.cell_h)
+        if dy > 0:
+            target = self.cell_range(y + dy, h, self.cell_h)[1]
+            for row in range(row1 + 1, target + 1):
+                if self.any_cell(self.solid, col0, col1, row, row):
+                    return row * self.cell_h - h, 1
+        elif dy < 0:
+            target = self.cell_range(y + dy, h, self.cell_h)[0]
+            for row in range(row0 - 1, target - 1, -1):
+                if self.any_cell(self.solid, col0, col1, row, row):
+                    return (row + 1) * self.cell_h, -1
+        return y + dy, 0
+
+    def is_on_ground(self, x, y, w, h):
+        """Checks whether the bottom edge of box rests on a solid cell"""
+        bottom = (y + h) / self.cell_h
+        row = int(round(bottom))
+        if abs(bottom - row) > EPS:
+            return False
+        col0, col1 = self.cell_range(x, w, self.cell_w)
+        return self.any_cell(self.solid, col0, col1, row, row)
+
+    def touches_deadly(self, x, y, w, h):
+        """Checks whether box overlaps, or stands on, a deadly cell"""
+        col0, col1 = self.cell_range(x, w, self.cell_w)
+        row0, row1 = self.cell_range(y, h + 1, self.cell_h)
+        return self.any_cell(self.deadly, col0, col1, row0, row1)
+
+    def move(self, x, y, w, h, dx, dy):
+        """
+        Moves box by (dx, dy), horizontally first, resolving collisions on each axis
+        :params x, y, w, h: box, in world pixels
+        :params dx, dy: requested displacement, in pixels
+        :return: MoveResult
+        """
+        new_x, hit_x = self.sweep_x(x, y, w, h, dx)
+        new_y, hit_y = self.sweep_y(new_x, y, w, h, dy)
+        return MoveResult(new_x, new_y, new_x - x, new_y - y, hit_x, hit_y,
+                          on_ground=self.is_on_ground(new_x, new_y, w, h),
+                          deadly=self.touches_deadly(new_x, new_y, w, h),
+                          fell_out=new_y >= self.rows * self.cell_h)
+
+
+def collider_from_assets(objects_matrix, cell_w, cell_h, assets, cell_type_ids):
+    """
+    Creates tile collider, using physical (and not transparent) cell types as solid ones
+    :param objects_matrix: matrix of cell type indices
+    :param cell_w, cell_h: size of a single cell, in pixels
+    :param assets: dict {cell_name: asset_info}, as returned by load_assets (only flags are used)
+    :param cell_type_ids: dict {cell_name: index}
+    :return: TileCollider
+    """
+    solid_types, deadly_types = [], []
+    for name, asset in assets.items():
+        if asset['physical'] and not asset['transparent']:
+            solid_types.append(cell_type_ids[name])
+        if asset['deadly']:
+            deadly_types.append(cell_type_ids[name])
+    return TileCollider(objects_matrix, cell_w, cell_h, solid_types, deadly_types)
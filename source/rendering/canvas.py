@@ -0,0 +1,62 @@
+import pygame
+
+from source.rendering.surfaces import prepare_surface
+
+
+class ScaledCanvas:
+    """
+    Internal canvas the game is drawn onto. With render scale lower than 1, the world is drawn at low resolution (with assets
+    pre-scaled to match) and the canvas is scaled up to the window once per frame, which keeps the pixel-art look and cuts fill rate.
+    """
+
+    def __init__(self, screen, scale=1.0):
+        """
+        :param screen: display surface
+        :param scale: internal resolution, as a fraction of the display one (for eg. 0.5 draws 600x375 for 1200x750 window)
+        """
+        self.screen = screen
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        """Changes internal resolution; with scale 1 the game is drawn directly onto the display surface"""
+        self.scale = scale
+        if scale == 1:
+            self.surface = self.screen
+        else:
+            w, h = self.screen.get_size()
+            self.surface = prepare_surface(pygame.Surface((int(round(w * scale)), int(round(h * scale)))))
+
+    def to_canvas(self, pos):
+        """Converts display (logical) coordinates into canvas ones"""
+        return int(round(pos[0] * self.scale)), int(round(pos[1] * self.scale))
+
+    def draw_sprites(self, sprites):
+        """
+        Draws sprites whose images are already pre-scaled to the canvas resolution, at their logical (display) positions
+        :param sprites: group or list of sprites
+        """
+        self.surface.blits(self.get_sprite_blits(sprites), doreturn=False)
+
+    def get_sprite_blits(self, sprites):
+        """Returns blits (surface, destination) of sprites, see draw_sprites"""
+        if self.scale == 1:
+            return [(sprite.image, sprite.rect.topleft) for sprite in sprites]
+        return [(sprite.image, self.to_canvas(sprite.rect.topleft)) for sprite in sprites]
+
+    def present(self):
+        """Scales canvas up to the display surface (nearest neighbour, no smoothing); call before flipping the display"""
+        if self.surface is not self.screen:
+            pygame.transform.scale(self.surface, self.screen.get_size(), self.screen)
+
+
+def scale_surface(surface, scale):
+    """
+    Pre-scales surface to the canvas resolution (nearest neighbour, to keep the pixel-art look)
+    :param surface: pygame surface
+    :param scale: render scale
+    :return: scaled surface (the same surface for scale 1)
+    """
+    if scale == 1:
+        return surface
+    w, h = surface.get_size()
+    return prepare_surface(pygame.transform.scale(surface, (max(1, int(round(w * scale))), max(1, int(round(h * scale))))))
@@ -0,0 +1,162 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pygame
+
+
+class FrameCapture:
+    """
+    Takes screenshots and records gameplay videos without stalling the game. The game thread only copies raw pixels of the frame
+    into one of a few preallocated buffers (a single memory copy, the surface is never converted nor transposed there); a worker
+    thread turns them into BGR images and encodes them with OpenCV, which releases the GIL while encoding. When all buffers are
+    waiting for the worker, frames are dropped (and counted) instead of blocking the game.
+    """
+
+    def __init__(self, surface, directory='captures', n_buffers=8, fps=60, codec='MJPG', screenshot_key=pygame.K_F12,
+                 record_key=pygame.K_F9):
+        """
+        :param surface: surface to capture, usually the display one; must have 32 bits per pixel (like the display format)
+        :param directory: folder for screenshots and videos
+        :param n_buffers: number of frame buffers; frames are dropped when the worker is this many frames behind
+        :param fps: frame rate of recorded videos
+        :param codec: FourCC of recorded videos (MJPG goes into .avi files with any OpenCV build)
+        :params screenshot_key, record_key: keys taking a screenshot and starting / stopping recording, see handle_events
+        """
+        if surface.get_bytesize() != 4:
+            raise ValueError("Only surfaces with 32 bits per pixel can be captured, this one has {}".format(surface.get_bitsize()))
+        self.surface = surface
+        self.directory = directory
+        self.fps = fps
+        self.codec = codec
+        self.screenshot_key = screenshot_key
+        self.record_key = record_key
+        w, h = surface.get_size()
+        self.__buffers = np.empty((n_buffers, h, w), dtype=np.uint32)  # raw pixels, rows first like in the surface memory
+        # byte of each of B, G, R channels in a (little endian) pixel, for making BGR images out of raw ones
+        self.__channels = [shift // 8 for shift in reversed(surface.get_shifts()[:3])]
+        self.__free = queue.Queue()
+        for i in range(n_buffers):
+            self.__free.put(i)
+        self.__filled = queue.Queue()  # (buffer index, screenshot path or None, video path or None); None stops the worker
+        self.__screenshot = False  # the next captured frame is saved as a screenshot
+        self.video_path = None  # path of the video being recorded, None when not recording
+
+        self.captured = 0
+        self.dropped = 0
+        self.capture_time = 0.0  # time spent capturing on the game thread, in seconds
+        self.encoded = 0
+        self.__worker = None  # started with the first screenshot or recording, so OpenCV is imported only then
+
+    def handle_events(self, events):
+        """Takes a screenshot or starts / stops recording on key presses"""
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                if event.key == self.screenshot_key:
+                    self.screenshot()
+                elif event.key == self.record_key:
+                    if self.video_path is None:
+                        self.start_recording()
+                    else:
+                        self.stop_recording()
+
+    def screenshot(self):
+        """Requests screenshot of the next captured frame"""
+        self.__screenshot = True
+
+    def start_recording(self, path=None):
+        """
+        Starts recording video of captured frames
+        :param path: path of the video, by default a new file in the captures folder
+        """
+        self.video_path = path or self.make_path('video', '.avi')
+        print("Recording video to {}".format(self.video_path))
+
+    def stop_recording(self):
+        if self.video_path is not None:
+            self.submit((None, None, self.video_path))  # closes the video once its frames are written
+            print("Video {} saved ({} frames dropped so far)".format(self.video_path, self.dropped))
+        self.video_path = None
+
+    def make_path(self, prefix, extension):
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, "{}_{}_{:03d}{}".format(prefix, time.strftime("%Y%m%d_%H%M%S"),
+                                                                  self.captured % 1000, extension))
+
+    def capture(self):
+        """
+        Captures the current frame, if a screenshot was requested or a video is being recorded; call once per frame, after drawing
+        :return: True if the frame was captured, False if it was not needed or had to be dropped
+        """
+        if not self.__screenshot and self.video_path is None:
+            return False
+        started = time.perf_counter()
+        try:
+            index = self.__free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        pixels = pygame.surfarray.pixels2d(self.surface)  # (w, h) view of the (h, w) surface memory, locks the surface
+        np.copyto(self.__buffers[index], pixels.T)
+        del pixels
+        screenshot_path = self.make_path('screenshot', '.png') if self.__screenshot else None
+        self.__screenshot = False
+        self.submit((index, screenshot_path, self.video_path))
+        self.captured += 1
+        self.capture_time += time.perf_counter() - started
+        return True
+
+    def submit(self, item):
+        """Passes item to the worker thread, starting it on the first call"""
+        if self.__worker is None:
+            self.__worker = threading.Thread(target=self.work, daemon=True)
+            self.__worker.start()
+        self.__filled.put(item)
+
+    def work(self):
+        """Worker thread: encodes captured frames, in the order they were captured"""
+        import cv2  # imported lazily, like in load_image: OpenCV is slow to import and the worker starts with the first capture
+
+        writer = None
+        writer_path = None
+        while True:
+            item = self.__filled.get()
+            if item is None:
+                break
+            index, screenshot_path, video_path = item
+            if index is None:  # end of the video
+                if writer is not None and writer_path == video_path:
+                    writer.release()
+                    writer = None
+                continue
+            raw = self.__buffers[index].view(np.uint8).reshape(self.__buffers.shape[1:] + (4,))
+            if self.__channels == [0, 1, 2]:  # BGRA bytes, the usual display format
+                image = cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR)
+            else:
+                image = np.ascontiguousarray(raw[:, :, self.__channels])
+            self.__free.put(index)  # the image is a copy already
+            if screenshot_path is not None:
+                cv2.imwrite(screenshot_path, image)
+            if video_path is not None:
+                if writer is None or writer_path != video_path:
+                    if writer is not None:
+                        writer.release()
+                    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*self.codec), self.fps, (image.shape[1], image.shape[0]))
+                    writer_path = video_path
+                writer.write(image)
+            self.encoded += 1
+        if writer is not None:
+            writer.release()
+
+    def close(self):
+        """Finishes recording, waits for the worker to encode all captured frames and reports"""
+        self.stop_recording()
+        if self.__worker is not None:
+            self.__filled.put(None)
+            self.__worker.join()
+            self.__worker = None
+        if self.captured:
+            print("Captured {} frames ({:.2f} ms per frame on the game thread), dropped {}".format(
+                self.captured, self.capture_time / self.captured * 1000, self.dropped))
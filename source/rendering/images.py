@@ -0,0 +1,56 @@
+import numpy as np
+import pygame
+
+from source.rendering.surfaces import prepare_surface
+
+
+def load_image(path, size=None):
+    """
+    Loads an image as a contiguous RGBA array in the layout expected by pygame buffers (rows, columns, channels), so it can be turned
+    into a surface without any further copies or rotations.
+    :param path: path to the image
+    :param size: optional (width, height) to resize the image to, in pixels
+    :return: numpy array of shape (h, w, 4), uint8
+    """
+    import cv2  # imported lazily: OpenCV is slow to import and the game doesn't need it when levels are compiled
+
+    img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise Exception("Could not load image {}!".format(path))
+    if size is not None:
+        img = cv2.resize(img, size)
+    # color conversion writes a new, contiguous array, so it is also the only copy made here
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGBA)
+    elif img.shape[2] == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGBA)
+    else:
+        img = cv2.cvtColor(img, cv2.COLOR_BGRA2RGBA)
+    return img
+
+
+def array_to_surface(image):
+    """
+    Creates a surface with per-pixel alpha from RGBA array. The surface is created over the array buffer and then converted to the display
+    format (which is the only copy), so that blits hit SDL fast paths.
+    :param image: numpy array of shape (h, w, 4), uint8
+    :return: pygame surface
+    """
+    image = np.ascontiguousarray(image)  # no-op for arrays coming from load_image
+    h, w = image.shape[:2]
+    surface = pygame.image.frombuffer(image, (w, h), 'RGBA')
+    if pygame.display.get_surface() is not None:
+        return prepare_surface(surface)
+    # without display the surface can't be converted, so it must not keep referencing the array buffer
+    return surface.copy()
+
+
+def make_alpha_surface(size):
+    """
+    Creates an empty, fully transparent surface with per-pixel alpha, in the display format when possible
+    :param size: (width, height), in pixels
+    :return: pygame surface
+    """
+    surface = prepare_surface(pygame.Surface(size, pygame.SRCALPHA))
+    surface.fill((0, 0, 0, 0))
+    return surface
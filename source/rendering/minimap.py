@@ -0,0 +1,191 @@
+import argparse
+import glob
+import math
+import os
+import pickle
+import time
+
+import numpy as np
+import pygame
+
+from source.worlds.cell_types import cell_types
+
+VIEWPORT_COLOR = (255, 255, 255)
+BORDER_COLOR = (0, 0, 0)
+EMPTY_COLOR = (70, 70, 90)  # empty cells of the minimap, darker than their white in cell types, so the viewport stands out
+MAX_SIZE = (400, 120)  # the largest minimap, in pixels; larger levels are downsampled to fit
+
+
+def make_color_table(cell_types=cell_types, rgb=True):
+    """
+    Makes lookup table of cell type colors, indexed by cell type index (the order of cell types)
+    :param cell_types: cell types dictionary; its colors are BGR, like everything drawn with OpenCV
+    :param rgb: if True, colors are converted to RGB (for pygame), otherwise they stay BGR (for OpenCV)
+    :return: uint8 array (number of cell types, 3)
+    """
+    table = np.array([info['color'] for info in cell_types.values()], dtype=np.uint8)
+    return table[:, ::-1].copy() if rgb else table
+
+
+def render_overview(objects_matrix, color_table, pixels_per_cell=1):
+    """
+    Renders level overview straight from the objects matrix, with a single table lookup: one block of pixels per cell
+    :param objects_matrix: matrix (rows, cols) of cell type indices
+    :param color_table: array (number of cell types, 3), see make_color_table
+    :param pixels_per_cell: size of a single cell in the overview, in pixels
+    :return: uint8 array (rows * pixels_per_cell, cols * pixels_per_cell, 3)
+    """
+    image = color_table[objects_matrix]
+    if pixels_per_cell != 1:
+        image = image.repeat(pixels_per_cell, axis=0).repeat(pixels_per_cell, axis=1)
+    return image
+
+
+def downsample(objects_matrix, factor_x, factor_y, empty_id):
+    """
+    Downsamples objects matrix by max-pooling: every block of factor_y x factor_x cells becomes the highest cell type index in it,
+    empty cells counting as the lowest one, so thin features (a platform, a column of spikes) don't vanish as with a stride
+    :param objects_matrix: matrix (rows, cols) of cell type indices
+    :params factor_x, factor_y: number of columns and rows of a block
+    :param empty_id: index of the empty cell type
+    :return: matrix (ceil(rows / factor_y), ceil(cols / factor_x)) of cell type indices
+    """
+    if factor_x == 1 and factor_y == 1:
+        return objects_matrix
+    rows, cols = objects_matrix.shape
+    out_rows, out_cols = -(-rows // factor_y), -(-cols // factor_x)
+    ranks = np.full((out_rows * factor_y, out_cols * factor_x), -1, np.int16)
+    ranks[:rows, :cols] = np.where(objects_matrix == empty_id, -1, objects_matrix)
+    pooled = ranks.reshape(out_rows, factor_y, out_cols, factor_x).max(axis=(1, 3))
+    return np.where(pooled < 0, empty_id, pooled).astype(objects_matrix.dtype)
+
+
+class Minimap:
+    """
+    Small overview of the whole level in the corner of the screen. The level part is rendered once from the objects matrix (and
+    again only after invalidate, for eg. when cells change); every frame just blits it and draws the rectangle of the visible area.
+    Levels too large for max_size are downsampled, so every minimap cell stands for a block of level cells.
+    """
+
+    def __init__(self, objects_matrix, cell_w, cell_h, pixels_per_cell=3, cell_types=cell_types, alpha=200, empty_color=EMPTY_COLOR,
+                 max_size=MAX_SIZE):
+        """
+        :param objects_matrix: matrix (rows, cols) of cell type indices
+        :param cell_w, cell_h: size of a single cell of the world, in pixels
+        :param pixels_per_cell: size of a single cell in the minimap, in pixels
+        :param cell_types: cell types dictionary (its order defines cell type indices)
+        :param alpha: opacity of the minimap, 0 - 255
+        :param empty_color: RGB color of empty cells, None keeps the one of cell types
+        :param max_size: (width, height) of the largest minimap, in pixels
+        """
+        self.objects_matrix = objects_matrix
+        self.pixels_per_cell = pixels_per_cell
+        self.alpha = alpha
+        self.color_table = make_color_table(cell_types)
+        self.empty_id = list(cell_types.keys()).index('EMPTY_CELL') if 'EMPTY_CELL' in cell_types else -1
+        if empty_color is not None and self.empty_id >= 0:
+            self.color_table[self.empty_id] = empty_color
+        # number of level columns and rows per minimap cell
+        rows, cols = objects_matrix.shape
+        self.factor_x = max(math.ceil(cols / max(max_size[0] // pixels_per_cell, 1)), 1)
+        self.factor_y = max(math.ceil(rows / max(max_size[1] // pixels_per_cell, 1)), 1)
+        self.__scale_x = pixels_per_cell / (cell_w * self.factor_x)  # world pixels to minimap pixels
+        self.__scale_y = pixels_per_cell / (cell_h * self.factor_y)
+        self.__surface = None
+
+    def get_size(self):
+        rows, cols = self.objects_matrix.shape
+        return -(-cols // self.factor_x) * self.pixels_per_cell, -(-rows // self.factor_y) * self.pixels_per_cell
+
+    def get_cells(self):
+        """Returns the (downsampled) objects matrix drawn on the minimap"""
+        return downsample(self.objects_matrix, self.factor_x, self.factor_y, self.empty_id)
+
+    def invalidate(self):
+        """Marks the level part as outdated; it's rendered again on the next draw"""
+        self.__surface = None
+
+    def update_cell(self, row, col, type_id):
+        """Repaints a single changed cell of the rendered level part (the objects matrix has it changed already)"""
+        if self.__surface is not None:
+            row, col = row // self.factor_y, col // self.factor_x
+            if self.factor_x != 1 or self.factor_y != 1:  # the block of the cell is pooled again
+                block = self.objects_matrix[row * self.factor_y:(row + 1) * self.factor_y, col * self.factor_x:(col + 1) * self.factor_x]
+                type_id = downsample(block, self.factor_x, self.factor_y, self.empty_id)[0, 0]
+            size = self.pixels_per_cell
+            self.__surface.fill([int(c) for c in self.color_table[type_id]], (col * size, row * size, size, size))
+
+    def get_surface(self):
+        """Returns surface with the level part, rendered on the first call after creation or invalidate"""
+        if self.__surface is None:
+            image = render_overview(self.get_cells(), self.color_table, self.pixels_per_cell)
+            surface = pygame.surfarray.make_surface(image.transpose(1, 0, 2))
+            pygame.draw.rect(surface, BORDER_COLOR, surface.get_rect(), 1)
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            surface.set_alpha(self.alpha)
+            self.__surface = surface
+        return self.__surface
+
+    def get_viewport(self, view, position):
+        """
+        Returns rectangle of the visible area on the minimap, clipped to it
+        :param view: visible area in world coordinates (xmin, ymin, xmax, ymax), see World.get_view
+        :param position: (x, y) of the top left corner of the minimap on the target surface
+        """
+        xmin, ymin, xmax, ymax = view
+        x, y = position
+        rect = pygame.Rect(x + int(xmin * self.__scale_x), y + int(ymin * self.__scale_y),
+                           max(int((xmax - xmin) * self.__scale_x), 1), max(int((ymax - ymin) * self.__scale_y), 1))
+        return rect.clip(pygame.Rect(position, self.get_size()))
+
+    def draw(self, target, view, position=None, margin=10):
+        """
+        Draws minimap with the visible area onto target
+        :param target: surface to draw onto, usually the display one (so the minimap doesn't depend on the render scale)
+        :param view: visible area in world coordinates (xmin, ymin, xmax, ymax), see World.get_view
+        :param position: (x, y) of the top left corner of the minimap, by default the top right corner of the target
+        :param margin: distance from the corner of the target, in pixels (without explicit position)
+        """
+        if position is None:
+            position = (target.get_width() - self.get_size()[0] - margin, margin)
+        target.blit(self.get_surface(), position)
+        pygame.draw.rect(target, VIEWPORT_COLOR, self.get_viewport(view, position), 1)
+
+
+def export_previews(grid_file_paths, output_path, pixels_per_cell=4, cell_types=cell_types):
+    """
+    Exports overviews of levels as PNG images, using only their grid info (no assets are loaded)
+    :param grid_file_paths: paths to grid info files
+    :param output_path: folder for the images; each is named after the folder of its level
+    :param pixels_per_cell: size of a single cell in the overview, in pixels
+    :param cell_types: cell types dictionary (its order defines cell type indices)
+    :return: list of paths of the written images
+    """
+    import cv2  # imported lazily, like in load_image: the game itself doesn't need OpenCV
+
+    os.makedirs(output_path, exist_ok=True)
+    color_table = make_color_table(cell_types, rgb=False)  # OpenCV writes BGR
+    written = []
+    for grid_file_path in grid_file_paths:
+        with open(grid_file_path, 'rb') as f:
+            grid_info = pickle.load(f)
+        image = render_overview(grid_info['objects_matrix'], color_table, pixels_per_cell)
+        name = os.path.basename(os.path.dirname(os.path.abspath(grid_file_path)))
+        path = os.path.join(output_path, name + '.png')
+        cv2.imwrite(path, image)
+        written.append(path)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("grid_files", help="paths (or glob patterns) of grid info files of the levels", nargs='+')
+    parser.add_argument("--out", help="folder for the previews", type=str, default='previews')
+    parser.add_argument("--pixels", help="size of a single cell in the preview, in pixels", type=int, default=4)
+    args = parser.parse_args()
+
+    paths = sorted(path for pattern in args.grid_files for path in glob.glob(pattern))
+    started = time.perf_counter()
+    written = export_previews(paths, args.out, args.pixels)
+    print("Exported {} previews to {} in {:.3f} s".format(len(written), args.out, time.perf_counter() - started))
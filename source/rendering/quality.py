@@ -0,0 +1,107 @@
+from collections import deque
+
+# quality levels, from the highest; values are passed to hooks registered with QualityGovernor.add_hook
+QUALITY_LEVELS = [
+    {'render_scale': 1, 'particle_budget': 5000, 'parallax_layers': None, 'entity_throttle': 4},
+    {'render_scale': 1, 'particle_budget': 2000, 'parallax_layers': 3, 'entity_throttle': 6},
+    {'render_scale': 0.75, 'particle_budget': 1000, 'parallax_layers': 2, 'entity_throttle': 8},
+    {'render_scale': 0.5, 'particle_budget': 500, 'parallax_layers': 1, 'entity_throttle': 12},
+]
+
+
+class QualityGovernor:
+    """
+    Holds the target frame rate on uneven hardware by stepping through quality levels. Watches the work time of recent frames
+    (without the time spent waiting for the next frame) and lowers quality when its high percentile gets close to the frame budget,
+    raises it when there is plenty of headroom for long. Hysteresis keeps it from oscillating: thresholds for going down and up are
+    far apart, measurements start over after every change, and an upgrade that had to be taken back soon is tried again only after
+    twice as long.
+    """
+
+    def __init__(self, target_fps=60, levels=QUALITY_LEVELS, window=60, percentile=0.9, downgrade_at=0.9, upgrade_at=0.5,
+                 upgrade_after=300, verbose=True):
+        """
+        :param target_fps: frame rate to hold
+        :param levels: list of quality levels (dicts {setting: value}), from the highest
+        :param window: number of frames the percentile is computed over
+        :param percentile: percentile of frame work times compared to the budget
+        :param downgrade_at: quality goes down when the percentile exceeds this fraction of the frame budget
+        :param upgrade_at: quality goes up when the percentile stays below this fraction of the frame budget...
+        :param upgrade_after: ...for this many frames
+        :param verbose: if True, decisions are printed as they are made
+        """
+        self.budget = 1.0 / target_fps
+        self.levels = levels
+        self.window = window
+        self.percentile = percentile
+        self.downgrade_at = downgrade_at
+        self.upgrade_at = upgrade_at
+        self.upgrade_after = upgrade_after
+        self.verbose = verbose
+        self.level = 0
+        self.frame = 0
+        self.log = []  # decisions: (frame, old level, new level, percentile frame time in ms)
+        self.__hooks = {}  # setting: function applying its value
+        self.__times = deque(maxlen=window)
+        self.__calm_frames = 0  # frames in a row with enough headroom to upgrade
+        self.__upgrade_delay = upgrade_after
+        self.__last_upgrade = None  # frame of the last upgrade
+
+    def add_hook(self, setting, apply):
+        """
+        Registers function applying a setting, and applies the value of the current level
+        :param setting: name of the setting, a key of quality levels
+        :param apply: function taking the new value
+        """
+        self.__hooks[setting] = apply
+        apply(self.levels[self.level][setting])
+
+    def get_settings(self):
+        return self.levels[self.level]
+
+    def record(self, frame_time):
+        """
+        Records work time of a frame, possibly changing the quality level
+        :param frame_time: time the frame took, without waiting, in seconds
+        :return: the new level if it changed, None otherwise
+        """
+        self.frame += 1
+        self.__times.append(frame_time)
+        if len(self.__times) < self.window:
+            return None
+        measured = sorted(self.__times)[int(self.percentile * (len(self.__times) - 1))]
+
+        if measured > self.downgrade_at * self.budget and self.level + 1 < len(self.levels):
+            if self.__last_upgrade is not None and self.frame - self.__last_upgrade <= 4 * self.window:
+                self.__upgrade_delay *= 2  # the upgrade didn't hold, the next one must wait longer
+            self.__last_upgrade = None
+            return self.set_level(self.level + 1, measured)
+
+        self.__calm_frames = self.__calm_frames + 1 if measured < self.upgrade_at * self.budget else 0
+        if self.__calm_frames >= self.__upgrade_delay and self.level > 0:
+            self.__last_upgrade = self.frame
+            return self.set_level(self.level - 1, measured)
+        return None
+
+    def set_level(self, level, measured=0.0):
+        """Switches to the quality level, applying only settings that differ from the current ones"""
+        old = self.levels[self.level]
+        new = self.levels[level]
+        for setting, apply in self.__hooks.items():
+            if new[setting] != old[setting]:
+                apply(new[setting])
+        self.log.append((self.frame, self.level, level, measured * 1000))
+        if self.verbose:
+            print("Quality level {} -> {} at frame {} ({:.0f}th percentile frame time {:.1f} ms, budget {:.1f} ms): {}".format(
+                self.level, level, self.frame, self.percentile * 100, measured * 1000, self.budget * 1000, new))
+        self.level = level
+        self.__times.clear()
+        self.__calm_frames = 0
+        return level
+
+    def save_log(self, path):
+        """Writes decisions to a CSV file"""
+        with open(path, 'w') as file:
+            file.write("frame,old_level,new_level,frame_time_ms\n")
+            for frame, old, new, measured in self.log:
+                file.write("{},{},{},{:.2f}\n".format(frame, old, new, measured))
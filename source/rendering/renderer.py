@@ -0,0 +1,61 @@
+# draw layers, from the bottom
+BACKGROUND = 0
+BLOCKS = 1
+ENTITIES = 2
+EFFECTS = 3
+SPRITES = 4
+OVERLAY = 5
+
+
+class Renderer:
+    """
+    Collects draw commands of a frame (surface and destination, on a layer) and submits them at once: commands are grouped by
+    layer (keeping the order of submission within a layer) and each layer goes to the target in a single fblits call. Drawing that
+    isn't a blit (for eg. particles written straight into pixels) is submitted as a callback, run after the blits of its layer.
+    Counts draws and blitted pixels of the last frame.
+    """
+
+    def __init__(self):
+        self.__layers = {}  # layer: list of (surface, destination)
+        self.__callbacks = {}  # layer: list of functions taking the target surface
+        self.draws = 0  # blits in the last flushed frame
+        self.pixels = 0  # pixels of blitted surfaces in the last flushed frame (before clipping)
+
+    def add(self, layer, blits):
+        """
+        Submits blits
+        :param layer: draw layer
+        :param blits: iterable of (surface, destination)
+        """
+        self.__layers.setdefault(layer, []).extend(blits)
+
+    def add_blit(self, layer, surface, destination):
+        self.__layers.setdefault(layer, []).append((surface, destination))
+
+    def add_callback(self, layer, draw):
+        """
+        Submits drawing that is not a blit
+        :param layer: draw layer
+        :param draw: function taking the target surface
+        """
+        self.__callbacks.setdefault(layer, []).append(draw)
+
+    def flush(self, target):
+        """Draws all submitted commands onto target, layer by layer, and clears them"""
+        draws = pixels = 0
+        fblits = getattr(target, 'fblits', None)
+        for layer in sorted(set(self.__layers) | set(self.__callbacks)):
+            blits = self.__layers.get(layer)
+            if blits:
+                if fblits is not None:
+                    fblits(blits)
+                else:
+                    target.blits(blits, doreturn=False)
+                draws += len(blits)
+                pixels += sum(surface.get_width() * surface.get_height() for surface, _ in blits)
+            for draw in self.__callbacks.get(layer, ()):
+                draw(target)
+        self.__layers.clear()
+        self.__callbacks.clear()
+        self.draws = draws
+        self.pixels = pixels
@@ -0,0 +1,74 @@
+import pygame
+
+
+def prepare_surface(surface):
+    """
+    Converts surface to the display pixel format, so that blitting it doesn't need any per-blit format conversion. Colorkeyed art is
+    additionally RLE accelerated. Without display (for eg. in headless mode) the surface is returned unchanged.
+    :param surface: pygame surface
+    :return: converted pygame surface
+    """
+    if pygame.display.get_surface() is None:
+        return surface
+    colorkey = surface.get_colorkey()
+    if colorkey is not None:
+        prepared = surface.convert()
+        prepared.set_colorkey(colorkey, pygame.RLEACCEL)
+        return prepared
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+
+def is_fast_format(surface):
+    """
+    Checks whether blitting the surface onto the display avoids slow paths (pixel format conversion or not accelerated colorkey)
+    :param surface: pygame surface
+    :return: True if the surface is in the display format
+    """
+    display = pygame.display.get_surface()
+    if display is None:
+        return True
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.get_bitsize() == 32 and surface.get_masks()[:3] == display.get_masks()[:3]
+    if surface.get_colorkey() is not None and not surface.get_flags() & (pygame.RLEACCELOK | pygame.RLEACCEL):
+        return False
+    return surface.get_bitsize() == display.get_bitsize() and surface.get_masks()[:3] == display.get_masks()[:3]
+
+
+class SurfaceFormatDiagnostic:
+    """
+    Reports surfaces drawn in a slow format. Every surface is checked only the first time it is drawn, so the diagnostic is cheap enough
+    to be left enabled during gameplay.
+    """
+
+    def __init__(self, verbose=True):
+        """
+        :param verbose: if True, slow surfaces are printed as soon as they are found
+        """
+        self.verbose = verbose
+        self.__checked = set()
+        self.slow_surfaces = {}  # label: number of distinct slow surfaces with this label
+
+    def check(self, surface, label):
+        """
+        Checks surface that is about to be drawn
+        :param surface: pygame surface
+        :param label: name of the owner of surface, used in reports
+        """
+        key = id(surface)
+        if key in self.__checked:
+            return
+        self.__checked.add(key)
+        if not is_fast_format(surface):
+            self.slow_surfaces[label] = self.slow_surfaces.get(label, 0) + 1
+            if self.verbose:
+                print("Slow surface format drawn by {}: {} bit, flags {:#x}, colorkey {}".format(label, surface.get_bitsize(),
+                                                                                              surface.get_flags(), surface.get_colorkey()))
+
+    def report(self):
+        """Prints summary of slow surfaces"""
+        if not self.slow_surfaces:
+            print("All {} drawn surfaces are in the display format".format(len(self.__checked)))
+        for label, count in self.slow_surfaces.items():
+            print("{} slow surface(s) drawn by {}".format(count, label))
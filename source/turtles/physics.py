@@ -0,0 +1,18 @@
+# Movement constants of the hero turtle. Kept apart from TurtleHero (and free of pygame), so that level tools (navigation,
+# reachability analysis) compute jumps with exactly the same physics as the game.
+
+TICK = 1 / 60.0  # time step of the simulation, in seconds
+JUMP_SPEED = 400  # initial vertical speed of a jump, in pixels / s
+GRAVITY = 800  # gravity acceleration, in pixels / s^2
+ACC = 600  # horizontal acceleration, in pixels / s^2
+SPEED_SLOW = 150  # walking speed, in pixels / s
+SPEED_FAST = 300  # running speed, in pixels / s
+SWIM_STROKE = 400  # initial vertical speed of a swimming stroke, in pixels / s (as strong as a jump, to get out of water)
+SWIM_GRAVITY = 400  # sinking acceleration in water, in pixels / s^2
+SWIM_SPEED_FACTOR = 0.5  # horizontal speed in water, as a fraction of the one on land
+HERO_BOX = (62, 30)  # size of the hero collision box, in pixels (see TurtleHero.find_hitbox)
+
+
+def jump_height(jump_speed=JUMP_SPEED, gravity=GRAVITY):
+    """Returns height of a jump, in pixels"""
+    return jump_speed ** 2 / (2 * gravity)
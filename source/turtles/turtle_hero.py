@@ -2,6 +2,10 @@ import pygame, random
 from enum import Enum
 import os
 import math
+
+from source.rendering.canvas import scale_surface
+from source.rendering.surfaces import prepare_surface
+from source.turtles import physics
 class JumpStates(Enum):
     IDLE = 0
     UP = 1
@@ -55,6 +59,50 @@ class Turtle(pygame.sprite.Sprite):
     def get_image(self, x, y, w, h):
         raise NotImplementedError
 
+    @staticmethod
+    def prepare_frames(sheet, w, h):
+        """
+        Cuts sprite sheet into frames (also horizontally flipped ones) converted to the display format once, at load,
+        so animations only pick ready surfaces instead of cutting and flipping them every frame.
+        :param sheet: sprite sheet surface (not converted, so that its colorkey is kept)
+        :param w, h: size of a single frame, in pixels
+        :return: dict {(column, row, flipped): surface}
+        """
+        if sheet.get_bitsize() == 8:
+            # a paletted colorkey hides only its palette index, converted surfaces every pixel of its color; frames are always made
+            # 32 bit, so they (and their masks and hitboxes) are the same with and without display
+            sheet = sheet.convert(32)
+        frames = {}
+        for row in range(sheet.get_height() // h):
+            for column in range(sheet.get_width() // w):
+                frame = sheet.subsurface((column * w, row * h, w, h)).copy()
+                frames[(column, row, False)] = prepare_surface(frame)
+                frames[(column, row, True)] = prepare_surface(pygame.transform.flip(frame, True, False))
+        return frames
+
+    @staticmethod
+    def prepare_masks(frames):
+        """
+        Makes collision masks of frames once, at load, so pixel-accurate collisions never build masks at runtime
+        :param frames: dict {key: surface}, see prepare_frames
+        :return: dict {key: pygame mask}
+        """
+        return {key: pygame.mask.from_surface(frame) for key, frame in frames.items()}
+
+    def find_hitbox(self, frames):
+        """
+        Finds collision box as a union of bounding boxes of opaque pixels of given frames (both normal and flipped), taken from
+        base_frames (see prepare_frames)
+        :param frames: list of (column, row) frames
+        :return: (x, y, w, h), relative to rect
+        """
+        rect = None
+        for column, row in frames:
+            for flipped in (False, True):
+                for bbox in pygame.mask.from_surface(self.base_frames[(column, row, flipped)]).get_bounding_rects():
+                    rect = bbox if rect is None else rect.union(bbox)
+        return (rect.x, rect.y, rect.width, rect.height)
+
     def move_right(self, pixels):
         self.rect.x += pixels
 
@@ -71,13 +119,22 @@ class Turtle(pygame.sprite.Sprite):
 class TurtleHero(Turtle):
     def __init__(self, type, size_coeff, name, position):
         print(__file__)
-        self.image_sheet = pygame.image.load('source/turtles/sv_turtle_sheet.png').convert_alpha()
+        sheet = pygame.image.load('source/turtles/sv_turtle_sheet.png')
+        self.image_sheet = sheet.convert_alpha() if pygame.display.get_surface() is not None else sheet  # headless without display
+        self.base_frames = self.prepare_frames(sheet, 64, 64)
+        self.base_masks = self.prepare_masks(self.base_frames)  # masks of full resolution frames, for collisions in logical pixels
+        self.frames = self.base_frames  # frames pre-scaled to the render scale
+        self.scaled_frames = {1: self.base_frames}  # render scale: frames
+        self.render_scale = 1
+        self.frame_key = None
         super().__init__(type, size_coeff, name, position)
-        self.ACC = 600
-        self.TICK = 1 / 60.0
-        self.SPEED_FAST = 300
-        self.SPPED_SLOW = 150
+        self.ACC = physics.ACC
+        self.TICK = physics.TICK
+        self.SPEED_FAST = physics.SPEED_FAST
+        self.SPPED_SLOW = physics.SPEED_SLOW
+        self.FALL_LIMIT = 100000  # distance of an open-ended fall, where only terrain collision can stop the turtle
         self.is_jumping = JumpStates.IDLE
+        self.swimming = False  # the turtle moves with water physics (see get_physics)
         self.dist_to_jump = 0
         self.initial_y = 0
         self.jump_counter = 0
@@ -87,24 +144,110 @@ class TurtleHero(Turtle):
         self.speed_target = 0
         ######animation##########
         self.init_sub = (7,0)# default icon column and row
-        self.image = self.get_image(self.WIDTH * self.init_sub[0], self.HEIGHT * self.init_sub[1], self.WIDTH, self.HEIGHT)
+        self.image = self.get_image_from_sprite_sheet(self.init_sub[0], self.init_sub[1])
         self.walk_r = [(6, 0), (7, 0), (8, 0)]  # icons of walk right column and row
         self.i_count = 0  # counter for walking speed
         self.hide_anim = (0, 3)  # icon of hide column and row
         self.die_anim = (6, 5)  # icon of die column and row
         self.right = 1  # turtle waling right flag
+        self.hitbox = self.find_hitbox(self.walk_r)  # collision box (x, y, w, h), relative to rect
+        # level tools and the network player use the size from physics, which must not drift from the sprite sheet
+        if tuple(self.hitbox[2:]) != physics.HERO_BOX:
+            raise ValueError("Hitbox size {} of the sprite sheet differs from physics.HERO_BOX {}, update the latter".format(
+                tuple(self.hitbox[2:]), physics.HERO_BOX))
 
     def get_image(self, x, y, w, h):
         return self.image_sheet.subsurface((x, y, w, h))
 
+    def set_render_scale(self, scale):
+        """
+        Pre-scales animation frames to the resolution of the canvas the turtle is drawn onto (see ScaledCanvas)
+        :param scale: render scale
+        """
+        self.render_scale = scale
+        if scale not in self.scaled_frames:  # made once per scale, the quality governor may switch scales back and forth
+            self.scaled_frames[scale] = {key: scale_surface(frame, scale) for key, frame in self.base_frames.items()}
+        self.frames = self.scaled_frames[scale]
+        self.image = self.frames[self.frame_key]
+
+    def get_state(self):
+        """
+        Returns mutable state of the turtle (position, physics and animation), as a flat tuple of numbers, see set_state
+        :return: tuple
+        """
+        column, row, flipped = self.frame_key
+        return (self.x, self.y, self.rect.x, self.rect.y, self.tmp_x_float, self.speed_act, self.speed_target, self.speed, self.moving,
+                self.is_jumping.value, self.dist_to_jump, self.initial_y, self.jump_counter, column, row, flipped, self.i_count, self.right,
+                self.swimming)
+
+    def set_state(self, state):
+        """
+        Restores state returned by get_state; animation frames are already prepared, so nothing is loaded
+        :param state: tuple, as returned by get_state
+        """
+        (self.x, self.y, self.rect.x, self.rect.y, self.tmp_x_float, self.speed_act, self.speed_target, self.speed, self.moving,
+         is_jumping, self.dist_to_jump, self.initial_y, self.jump_counter, column, row, flipped, self.i_count, self.right,
+         self.swimming) = state
+        self.is_jumping = JumpStates(is_jumping)
+        self.image = self.get_image_from_sprite_sheet(column, row, bool(flipped))
+
     def init_jump(self, initial_v, grav_acc):
         self.is_jumping = JumpStates.UP
         self.dist_to_jump = (initial_v) ** 2 / (2 * grav_acc)
-        print("init jump")
-        print(self.dist_to_jump)
-        self.initial_y = self.rect.y
+        self.initial_y = self.y
         self.jump_counter = self.jump_counter + 1
 
+    def init_stroke(self, initial_v, grav_acc):
+        """Starts a swimming stroke: a jump from the current position, even in the middle of another jump or stroke"""
+        self.land()
+        self.init_jump(initial_v, grav_acc)
+
+    def get_physics(self):
+        """Returns (jump speed, gravity acceleration) of the medium the turtle moves in"""
+        if self.swimming:
+            return physics.SWIM_STROKE, physics.SWIM_GRAVITY
+        return physics.JUMP_SPEED, physics.GRAVITY
+
+    def init_fall(self, grav_acc):
+        """Starts falling from the current position, for eg. after walking off the edge or bumping into a ceiling"""
+        self.is_jumping = JumpStates.DOWN
+        self.jump_counter = 1
+        self.dist_to_jump = self.FALL_LIMIT
+        self.initial_y = self.y - grav_acc * self.TICK ** 2 / 2 + self.FALL_LIMIT
+
+    def extend_fall(self):
+        """Turns the falling part of the jump into an open-ended fall, keeping its apex, so it can end only on terrain"""
+        apex = self.initial_y - self.dist_to_jump
+        self.dist_to_jump = self.FALL_LIMIT
+        self.initial_y = apex + self.FALL_LIMIT
+
+    def land(self):
+        """Ends jump or fall"""
+        self.is_jumping = JumpStates.IDLE
+        self.dist_to_jump = 0
+        self.initial_y = 0
+        self.jump_counter = 0
+
+    def apply_move_result(self, result, dx, dy, grav_acc):
+        """
+        Updates turtle physics after its movement was resolved against terrain
+        :param result: MoveResult, as returned by World.move_player
+        :params dx, dy: requested movement; parts of it blocked by terrain are taken back from the turtle position
+        :param grav_acc: gravity acceleration
+        """
+        self.x += result.dx - dx
+        self.y += result.dy - dy
+        if result.hit_x:
+            self.speed_act = 0.0
+        if self.is_jumping == JumpStates.UP and result.hit_y < 0:  # bumped into a ceiling
+            self.init_fall(grav_acc)
+        elif self.is_jumping == JumpStates.DOWN and result.on_ground:
+            self.land()
+        elif self.is_jumping == JumpStates.DOWN and self.dist_to_jump != self.FALL_LIMIT:
+            self.extend_fall()
+        elif self.is_jumping == JumpStates.IDLE and not result.on_ground:
+            self.init_fall(grav_acc)
+
     def changeSpeed(self, speed):
         self.speed = speed
 
@@ -166,25 +309,25 @@ class TurtleHero(Turtle):
                 # print("end")
         return self.y
 
-    def get_image_from_sprite_sheet(self, column, row):
-        return self.get_image(column * self.WIDTH, row * self.HEIGHT, self.WIDTH, self.HEIGHT)
+    def get_image_from_sprite_sheet(self, column, row, flipped=False):
+        self.frame_key = (column, row, flipped)
+        self.mask = self.base_masks[self.frame_key]
+        return self.frames[self.frame_key]
 
     def update_anim_stop_right(self):
         self.image = self.get_image_from_sprite_sheet(self.walk_r[1][0], self.walk_r[1][1])
 
     def update_anim_stop_left(self):
-        self.image = self.get_image_from_sprite_sheet(self.walk_r[1][0], self.walk_r[1][1])
-        self.image = pygame.transform.flip(self.image, True, False)
+        self.image = self.get_image_from_sprite_sheet(self.walk_r[1][0], self.walk_r[1][1], flipped=True)
 
     def update_anim_walk_right(self, iter):
-        count = self.i_count // iter
+        count = self.i_count // iter % len(self.walk_r)  # the counter may come from an animation of another speed
         self.image = self.get_image_from_sprite_sheet(self.walk_r[count][0], self.walk_r[count][1])
         self.i_count = (self.i_count + 1) % len(self.walk_r * iter)
 
     def update_anim_walk_left(self, iter):
-        count = self.i_count // iter
-        self.image = self.get_image_from_sprite_sheet(self.walk_r[count][0], self.walk_r[count][1])
-        self.image = pygame.transform.flip(self.image, True, False)
+        count = self.i_count // iter % len(self.walk_r)  # the counter may come from an animation of another speed
+        self.image = self.get_image_from_sprite_sheet(self.walk_r[count][0], self.walk_r[count][1], flipped=True)
         self.i_count = (self.i_count + 1) % len(self.walk_r * iter)
 
     def update_hide_anim(self):
@@ -1,4 +1,5 @@
 import pygame
+from source.game.controls import InputSystem, control_hero
 from source.turtles.turtle_hero import Turtle, TurtleHero, JumpStates
 
 SCREENWIDTH = 800
@@ -15,53 +16,17 @@ playerTurtle = TurtleHero("normal", 0.5, "Karol1", (200, 200))
 carryOn = True
 clock = pygame.time.Clock()
 
+controls = InputSystem()
+
 all_sprites_list = pygame.sprite.Group()
 all_sprites_list.add(playerTurtle)
 
 
 while carryOn:
-    for event in pygame.event.get():
-        keys2 = pygame.key.get_pressed()
-        if event.type == pygame.QUIT:
-            carryOn = False
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE and playerTurtle.is_jumping == JumpStates.IDLE:
-                playerTurtle.init_jump(400, 800)
-            if event.key == pygame.K_RIGHT and not keys2[pygame.K_RCTRL]:
-                print("init right !!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-                playerTurtle.init_move_right()
-            elif event.key == pygame.K_RIGHT and keys2[pygame.K_RCTRL]:
-                print("init fast right!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-                playerTurtle.init_move_fast_right()
-            elif event.key == pygame.K_LEFT and keys2[pygame.K_RCTRL]:
-                playerTurtle.init_move_fast_left()
-            elif event.key == pygame.K_LEFT and not keys2[pygame.K_RCTRL]:
-                playerTurtle.init_move_left()
-            elif event.key == pygame.K_RCTRL and keys2[pygame.K_RIGHT]:
-                playerTurtle.init_move_fast_right()
-            elif event.key == pygame.K_RCTRL and keys2[pygame.K_LEFT]:
-                playerTurtle.init_move_fast_left()
-            elif event.key == pygame.K_z:
-                playerTurtle.update_hide_anim()
-            elif event.key == pygame.K_x:
-                playerTurtle.update_die_anim()
-        elif event.type == pygame.KEYUP:
-            if event.key == pygame.K_RCTRL and keys2[pygame.K_RIGHT]:
-                playerTurtle.init_move_right()
-            elif event.key == pygame.K_RCTRL and keys2[pygame.K_LEFT]:
-                playerTurtle.init_move_left()
-
-    keys = pygame.key.get_pressed()
-    #if keys[pygame.K_LEFT]:
-    #    playerTurtle.moveLeft(5)
-    #if keys[pygame.K_RIGHT]:
-        #playerTurtle.moveRight(5)
-    if keys[pygame.K_UP]:
-        playerTurtle.move_up(5)
-    if keys[pygame.K_DOWN]:
-        playerTurtle.move_down(5)
-    if not keys[pygame.K_RIGHT] and not keys[pygame.KMOD_CTRL] and not keys[pygame.K_LEFT]:
-        playerTurtle.stop_move()
+    controls.update(pygame.event.get())
+    if controls.quit:
+        carryOn = False
+    controls.consume(control_hero(playerTurtle, controls.get_bits()))
 
     all_sprites_list.update()
 
@@ -0,0 +1,73 @@
+import os
+
+from source.rendering.images import load_image
+
+FEATURES = ('deadly', 'transparent', 'physical', 'maskable')
+
+
+def parse_features(asset_name):
+    """Returns dict {feature: bool} of features encoded in the file name of asset, see load_assets"""
+    return {feature: feature in asset_name for feature in FEATURES}
+
+
+def load_asset_flags(path, cell_names):
+    """
+    Reads only features of assets (without loading any images), for tools that need physics of cell types but not their look
+    :param path: path to root directory of assets
+    :param cell_names: names of cell types
+    :return: dict {cell_name: {feature: bool}}
+    """
+    filenames = sorted(os.listdir(path))
+    flags = {}
+    for cell_name in cell_names:
+        top_filenames = [name for name in filenames if name.startswith(cell_name.lower()) and 'top' in name]
+        if not top_filenames:
+            raise Exception("There are no assets associated to {}!".format(cell_name))
+        flags[cell_name] = parse_features(top_filenames[-1])  # the last one wins, like in load_assets
+    return flags
+
+
+def load_assets(path, cell_names, cell_w, cell_h):
+    """
+    Loads assets for cell types, based on names; assigning additional information to them. Each asset must be named according to rules:
+    NAME-MODE-FEATURE1-FEATURE2-FEATUREn.png. Also does all necessary preprocessing, like resizing etc.
+
+    NAME - specifies the name of type, like ground, deadly ground etc.
+    MODE - TOP / BOTTOM, specifies type of block (for example top block of grass and bottom block of dirt), all blocks must have at least their top version
+    FEATURE - available from list: DEADLY (specifies, wheter the block is deadly in touch), TRANSPARENT (specifies, whether the block should be transparent),
+            PHYSICAL - wheter the object should react with the turtle (for example water shouldn't, turtle should go through it),
+            MASKABLE - wheter a mask should be created
+
+    :param path: path to root directory of assets
+    :param cell_names: names of cell types
+    :param cell_w, cell_h: size of a single cell, images are resized to it
+    :return: dict {cell_name: assets}
+    """
+    assets = {}
+    filenames = sorted(os.listdir(path))  # sorted, so that assets are always resolved in the same order
+    for cell_name in cell_names:
+        asset_info = {}
+
+        # find all assets associated to the cell type
+        associated_filenames = [name for name in filenames if name.startswith(cell_name.lower())]
+        if not associated_filenames:  # all cell types must have the associated assets!
+            raise Exception("There are no assets associated to {}!".format(cell_name))
+
+        # assign images to assets
+        images = {}
+        for asset_name in associated_filenames:
+            # preprocess image (load, scale, bgr to rgba conversion) into a contiguous array, ready for making surfaces
+            img = load_image(os.path.join(path, asset_name), (cell_w, cell_h))
+
+            if 'top' in asset_name:
+                images['top_img'] = img
+
+                # assign another features
+                asset_info.update(parse_features(asset_name))
+
+            elif 'bottom' in asset_name:
+                images['bottom_img'] = img
+            asset_info['images'] = images
+        assets[cell_name] = asset_info
+
+    return assets
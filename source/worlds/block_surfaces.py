@@ -0,0 +1,137 @@
+import pygame
+
+from source.rendering.canvas import scale_surface
+from source.rendering.images import array_to_surface, make_alpha_surface
+from source.rendering.surfaces import prepare_surface
+
+
+def make_block_surface(block_cls, units_w, units_h, images):
+    """
+    Creates a surface for a block of given class and size, without creating the block sprite itself
+    :param block_cls: StaticBlock or one of its children
+    :params units_w, units_h: width and height of the block (in units)
+    :param images: a set of images associated with the block
+    :return: pygame surface
+    """
+    return array_to_surface(block_cls.get_image(units_w, units_h, images))
+
+
+class BlockSurfaceCache:
+    """
+    Cache of block surfaces, shared between all blocks of the same cell type, size and class. Tiled blocks are composed by
+    blitting cached tile surfaces, so the cost of building a level depends on the number of distinct shapes, not blocks.
+    """
+
+    def __init__(self, assets, cell_w, cell_h):
+        """
+        :param assets: dict {cell_name: asset_info}, as returned by World.load_assets
+        :param cell_w, cell_h: size of a single cell, in pixels
+        """
+        self.assets = assets
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+        self.__tiles = {}
+        self.__surfaces = {}
+        self.__masks = {}
+
+    def __len__(self):
+        return len(self.__surfaces)
+
+    def distinct_surfaces(self):
+        """Returns the number of distinct surface objects held by the cache (tiles excluded)"""
+        return len({id(surface) for surface in self.__surfaces.values()})
+
+    def prepare(self):
+        """
+        Converts all cached surfaces to the display format. Needed only when surfaces were made before the display was set.
+        """
+        self.__tiles = {key: prepare_surface(tile) for key, tile in self.__tiles.items()}
+        prepared = {}  # shared surfaces must stay shared after conversion
+        for key, surface in self.__surfaces.items():
+            if id(surface) not in prepared:
+                prepared[id(surface)] = prepare_surface(surface)
+            self.__surfaces[key] = prepared[id(surface)]
+
+    def get_tile(self, cell_name, image_name):
+        """
+        Returns a surface of a single tile (one cell) of given cell type
+        :param cell_name: name of cell type, for eg. GROUND
+        :param image_name: top_img or bottom_img
+        :return: pygame surface
+        """
+        key = (cell_name, image_name)
+        tile = self.__tiles.get(key)
+        if tile is None:
+            tile = array_to_surface(self.assets[cell_name]['images'][image_name])
+            self.__tiles[key] = tile
+        return tile
+
+    def get(self, cell_name, units_w, units_h, block_cls, scale=1):
+        """
+        Returns a surface for a block, creating it on the first request only
+        :param cell_name: name of cell type, for eg. GROUND
+        :params units_w, units_h: width and height of the block (in units)
+        :param block_cls: StaticBlock or one of its children
+        :param scale: render scale; surfaces for scales other than 1 are pre-scaled copies of the full resolution ones
+        :return: pygame surface, shared with other blocks of the same key - must not be drawn on
+        """
+        if scale != 1:
+            if not block_cls.tiled:
+                units_w, units_h = 1, 1  # image of not tiled blocks does not depend on their size
+            key = (cell_name, units_w, units_h, block_cls, scale)
+            surface = self.__surfaces.get(key)
+            if surface is None:
+                surface = scale_surface(self.get(cell_name, units_w, units_h, block_cls), scale)
+                self.__surfaces[key] = surface
+            return surface
+
+        key = (cell_name, units_w, units_h, block_cls)
+        surface = self.__surfaces.get(key)
+        if surface is None:
+            if block_cls.tiled:
+                surface = self.compose_tiled(cell_name, units_w, units_h)
+            else:
+                # image of not tiled blocks does not depend on their size, so all sizes share a single surface
+                base_key = (cell_name, 1, 1, block_cls)
+                surface = self.__surfaces.get(base_key)
+                if surface is None:
+                    surface = self.make_single(cell_name, block_cls)
+                    self.__surfaces[base_key] = surface
+            self.__surfaces[key] = surface
+        return surface
+
+    def get_mask(self, cell_name, units_w, units_h, block_cls):
+        """
+        Returns collision mask of a block surface (at full resolution), creating it on the first request only
+        :return: pygame mask, shared with other blocks of the same key
+        """
+        if not block_cls.tiled:
+            units_w, units_h = 1, 1
+        key = (cell_name, units_w, units_h, block_cls)
+        mask = self.__masks.get(key)
+        if mask is None:
+            mask = pygame.mask.from_surface(self.get(cell_name, units_w, units_h, block_cls))
+            self.__masks[key] = mask
+        return mask
+
+    def make_single(self, cell_name, block_cls):
+        """Creates a surface of a not tiled block, using the block class image preprocessing (for eg. mask cropping)"""
+        return make_block_surface(block_cls, 1, 1, self.assets[cell_name]['images'])
+
+    def compose_tiled(self, cell_name, units_w, units_h):
+        """
+        Composes a block surface out of a top tile row and (possibly repeated) bottom tile rows
+        """
+        surface = make_alpha_surface((units_w * self.cell_w, units_h * self.cell_h))
+        top_tile = self.get_tile(cell_name, 'top_img')
+        bottom_tile = self.get_tile(cell_name, 'bottom_img') if units_h > 1 else None
+
+        # tiles don't overlap, so taking max over the transparent background copies them exactly, alpha included
+        copy = pygame.BLEND_RGBA_MAX
+        tiles = []
+        for x in range(units_w):
+            tiles.append((top_tile, (x * self.cell_w, 0), None, copy))
+            for y in range(1, units_h):
+                tiles.append((bottom_tile, (x * self.cell_w, y * self.cell_h), None, copy))
+        surface.blits(tiles, doreturn=False)
+        return surface
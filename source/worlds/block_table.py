@@ -0,0 +1,105 @@
+import numpy as np
+
+# flags describing block features, packed into a single byte per block
+FLAG_DEADLY = 1
+FLAG_TRANSPARENT = 2
+FLAG_PHYSICAL = 4
+FLAG_MASKABLE = 8
+FLAG_BOTTOM = 16  # block is made of a top image and a repeated bottom image
+
+# a single row of the table; positions and sizes are in cell units, not pixels
+BLOCK_DTYPE = np.dtype([('x', np.int32),
+                        ('y', np.int32),
+                        ('w', np.int32),
+                        ('h', np.int32),
+                        ('type_id', np.int8),
+                        ('flags', np.uint8)])
+
+
+def asset_flags(asset):
+    """
+    Packs boolean features of an asset (as returned by World.load_assets) into block flags
+    :param asset: asset info dictionary
+    :return: flags as an int
+    """
+    flags = 0
+    if asset['deadly']:
+        flags |= FLAG_DEADLY
+    if asset['transparent']:
+        flags |= FLAG_TRANSPARENT
+    if asset['physical']:
+        flags |= FLAG_PHYSICAL
+    if asset['maskable']:
+        flags |= FLAG_MASKABLE
+    if 'bottom_img' in asset['images']:
+        flags |= FLAG_BOTTOM
+    return flags
+
+
+class BlockTable:
+    """
+    Compact, array-backed storage of rectangular world blocks. Each block is a single row of a NumPy structured array,
+    so big maps cost a few bytes per block instead of a full pygame Sprite with its own Rect and attribute dict.
+    """
+
+    def __init__(self, blocks, cell_w, cell_h):
+        """
+        :param blocks: structured array of BLOCK_DTYPE
+        :param cell_w, cell_h: size of a single cell, in pixels
+        """
+        self.blocks = blocks
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+
+        # pixel rectangles are derived once, so that per-frame culling and collision queries are plain array operations
+        self.px_x = blocks['x'].astype(np.int32) * cell_w
+        self.px_y = blocks['y'].astype(np.int32) * cell_h
+        self.px_w = blocks['w'].astype(np.int32) * cell_w
+        self.px_h = blocks['h'].astype(np.int32) * cell_h
+
+    @classmethod
+    def from_rows(cls, rows, cell_w, cell_h):
+        """
+        Builds a table from an iterable of (x, y, w, h, type_id, flags) tuples
+        :param rows: iterable of tuples, in cell units
+        :param cell_w, cell_h: size of a single cell, in pixels
+        :return: BlockTable
+        """
+        return cls(np.array(list(rows), dtype=BLOCK_DTYPE), cell_w, cell_h)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __getitem__(self, idx):
+        return self.blocks[idx]
+
+    def get_coordinates(self, idx, dx=0, dy=0):
+        """
+        Returns xmin, ymin, xmax, ymax pixel coordinates of the block, shifted by given offset.
+        :param idx: index of block
+        :param dx, dy: offset added to coordinates (for eg. camera offset)
+        :return: (xmin, ymin, xmax, ymax)
+        """
+        xmin = int(self.px_x[idx]) + dx
+        ymin = int(self.px_y[idx]) + dy
+        return (xmin, ymin, xmin + int(self.px_w[idx]), ymin + int(self.px_h[idx]))
+
+    def overlapping(self, xmin, ymin, xmax, ymax):
+        """
+        Finds blocks overlapping given pixel rectangle (in world coordinates)
+        :return: array of block indices
+        """
+        mask = (self.px_x < xmax) & (self.px_x + self.px_w > xmin) & (self.px_y < ymax) & (self.px_y + self.px_h > ymin)
+        return np.flatnonzero(mask)
+
+    def with_flags(self, flags):
+        """
+        Returns indices of blocks having all of given flags set
+        """
+        return np.flatnonzero((self.blocks['flags'] & flags) == flags)
+
+    def with_types(self, type_ids):
+        """
+        Returns indices of blocks of any of given type ids
+        """
+        return np.flatnonzero(np.isin(self.blocks['type_id'], list(type_ids)))
@@ -0,0 +1,12 @@
+from collections import OrderedDict
+
+cell_types = OrderedDict([
+    ("GROUND", {'color': (0, 0, 0), 'info': "black, for solid ground, where turtle can safely walk"}),
+    ("PLATFORM", {'color': (0, 255, 0), 'info': "green, for hanging platforms, where turtle can safely jump"}),
+    ("WATER", {'color': (255, 0, 0), 'info': "blue, for water, swimmable by turtle"}),
+    ("LOOT_CRATE", {'color': (19, 69, 139), 'info': "brown, for loot crates with snails and other edible things"}),
+    ("LAVA", {'color': (0, 0, 255), 'info': "red, for lava (where turtle dies)"}),
+    ("CHECKPOINT_GROUND", {'color': (0, 255, 255), 'info': "yellow, for places with checkpoints"}),
+    ("EMPTY_CELL", {'color': (255, 255, 255), 'info': "empty cell"}),
+    ("SPIKES", {'color': (0, 0, 128), 'info': "red, for spikes (where turtle dies)"})
+])
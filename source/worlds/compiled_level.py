@@ -0,0 +1,128 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+
+import numpy as np
+
+COMPILED_LEVEL_NAME = 'compiled_level.npz'
+WORLDS_PATH = os.path.dirname(os.path.abspath(__file__))  # default paths of the CLI are relative to it, not to the working directory
+
+
+def compiled_level_path(grid_file_path):
+    """Returns path of the compiled level, kept next to the grid info file"""
+    return os.path.join(os.path.dirname(grid_file_path), COMPILED_LEVEL_NAME)
+
+
+def source_fingerprint(grid_file_path, assets_path):
+    """
+    Computes fingerprint of level sources (grid info and all assets), used to detect outdated compiled levels.
+    Content is hashed instead of comparing modification times, which are not preserved by git checkouts.
+    """
+    digest = hashlib.sha1()
+    with open(grid_file_path, 'rb') as f:
+        digest.update(f.read())
+    for name in sorted(os.listdir(assets_path)):
+        digest.update(name.encode())
+        with open(os.path.join(assets_path, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def save_compiled_level(path, grid_info, assets, fingerprint, extra=None):
+    """
+    Saves level with already preprocessed assets into a single .npz file, which can be loaded with NumPy only
+    :param path: path of the output file
+    :param grid_info: dictionary with information about grid
+    :param assets: dict {cell_name: asset_info}, as returned by load_assets
+    :param fingerprint: fingerprint of level sources
+    :param extra: optional dict {name: array} with additional precomputed data
+    """
+    arrays = {'objects_matrix': grid_info['objects_matrix']}
+    meta = {'grid_info': {k: v for k, v in grid_info.items() if k != 'objects_matrix'},
+            'assets': {},
+            'fingerprint': fingerprint}
+    for cell_name, asset in assets.items():
+        meta['assets'][cell_name] = {k: v for k, v in asset.items() if k != 'images'}
+        meta['assets'][cell_name]['images'] = list(asset['images'].keys())
+        for image_name, image in asset['images'].items():
+            arrays['asset/{}/{}'.format(cell_name, image_name)] = image
+    for name, array in (extra or {}).items():
+        arrays['extra/{}'.format(name)] = array
+    arrays['meta'] = np.array(json.dumps(meta, default=int))  # numpy integers are stored as plain ints
+    np.savez_compressed(path, **arrays)
+
+
+def load_compiled_level(path, fingerprint=None):
+    """
+    Loads compiled level
+    :param path: path of the compiled level
+    :param fingerprint: if given, the level is loaded only when it was compiled from sources with this fingerprint
+    :return: (grid_info, assets, extra), or None if the level is outdated
+    """
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        if fingerprint is not None and meta['fingerprint'] != fingerprint:
+            return None
+
+        grid_info = dict(meta['grid_info'])
+        grid_info['objects_matrix'] = data['objects_matrix']
+        assets = {}
+        for cell_name, asset in meta['assets'].items():
+            assets[cell_name] = {k: v for k, v in asset.items() if k != 'images'}
+            assets[cell_name]['images'] = {name: data['asset/{}/{}'.format(cell_name, name)] for name in asset['images']}
+        extra = {key[len('extra/'):]: data[key] for key in data.files if key.startswith('extra/')}
+    return grid_info, assets, extra
+
+
+def load_level(grid_file_path, assets_path, cell_names):
+    """
+    Loads level, using its compiled version when it's up to date, so that no image processing (and no OpenCV) is needed.
+    Otherwise falls back to loading grid info and preprocessing assets.
+    :return: (grid_info, assets, extra)
+    """
+    path = compiled_level_path(grid_file_path)
+    if os.path.exists(path):
+        level = load_compiled_level(path, source_fingerprint(grid_file_path, assets_path))
+        if level is not None:
+            return level
+
+    from source.worlds.assets import load_assets
+
+    grid_info = pickle.load(open(grid_file_path, "rb"))
+    assets = load_assets(assets_path, cell_names, grid_info['cell_w'], grid_info['cell_h'])
+    return grid_info, assets, {}
+
+
+def compile_level(grid_file_path, assets_path, cell_names):
+    """
+    Compiles level: preprocesses its assets, precomputes its navigation graph and saves them together with grid info next to
+    the grid info file
+    :return: path of the compiled level
+    """
+    from source.physics.tile_collider import collider_from_assets
+    from source.worlds.assets import load_assets
+    from source.worlds.cell_types import cell_types
+    from source.worlds.navigation import NavigationGraph
+
+    grid_info = pickle.load(open(grid_file_path, "rb"))
+    assets = load_assets(assets_path, cell_names, grid_info['cell_w'], grid_info['cell_h'])
+    collider = collider_from_assets(grid_info['objects_matrix'], grid_info['cell_w'], grid_info['cell_h'], assets,
+                                    {name: i for i, name in enumerate(cell_types.keys())})
+    path = compiled_level_path(grid_file_path)
+    save_compiled_level(path, grid_info, assets, source_fingerprint(grid_file_path, assets_path),
+                        extra=NavigationGraph.build(collider).to_arrays())
+    return path
+
+
+if __name__ == "__main__":
+    from source.worlds.cell_types import cell_types
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("grid_file", help="path to grid_info.p of the world to compile")
+    parser.add_argument("--assets", help="path to the folder with assets", type=str, default=os.path.join(WORLDS_PATH, 'assets'))
+    args = parser.parse_args()
+
+    names = [name for name in cell_types.keys() if name != 'EMPTY_CELL']
+    print("Compiled level saved to {}".format(compile_level(args.grid_file, args.assets, names)))
@@ -0,0 +1,132 @@
+import numpy as np
+
+# states of dynamic objects
+INTACT = 0
+OPENED = 1  # broken open: no longer drawn nor solid, its cell is empty
+
+DYNAMIC_TYPES = ('LOOT_CRATE',)  # cell types that become dynamic objects instead of static blocks
+
+
+class DynamicObjects:
+    """
+    Mutable cells of the world (loot crates), kept out of the static block table and its baked caches. Every object is a single
+    cell with a state. Changing the state writes the cell into the objects matrix and the tile collider (both O(1)), drops cached
+    blits of the chunk of columns the cell is in, and reports the cell to hooks (for eg. the minimap and observations of agents
+    patch their own copies), so no interaction ever rebuilds the world.
+    """
+
+    def __init__(self, objects_matrix, collider, type_ids, empty_id, chunk_cols=16):
+        """
+        :param objects_matrix: matrix of cell type indices; cells of objects are changed in place
+        :param collider: TileCollider of the world
+        :param type_ids: indices of cell types that are dynamic objects
+        :param empty_id: index of the empty cell type (cells of opened objects)
+        :param chunk_cols: number of columns of a chunk (the unit of cached blits)
+        """
+        self.objects_matrix = objects_matrix
+        self.collider = collider
+        self.empty_id = empty_id
+        self.chunk_cols = chunk_cols
+        rows, cols = np.nonzero(np.isin(objects_matrix, list(type_ids)))
+        self.rows = rows.astype(np.int32)
+        self.cols = cols.astype(np.int32)
+        self.type_ids = objects_matrix[rows, cols].copy()
+        self.states = np.full(len(rows), INTACT, np.uint8)
+        self.__index = {(int(row), int(col)): i for i, (row, col) in enumerate(zip(rows, cols))}
+        self.__chunks = {}  # chunk: indices of its objects
+        for i, col in enumerate(cols):
+            self.__chunks.setdefault(int(col) // chunk_cols, []).append(i)
+        self.__chunk_blits = {}  # chunk: list of (type id, column, row) of drawn objects; a missing chunk is dirty
+        self.__hooks = []
+
+    def __len__(self):
+        return len(self.states)
+
+    def add_hook(self, apply):
+        """
+        Registers function called for every changed cell
+        :param apply: function taking (row, col, new cell type index)
+        """
+        self.__hooks.append(apply)
+
+    def find(self, row, col):
+        """Returns index of the object in the cell, or None"""
+        return self.__index.get((row, col))
+
+    def set_object_state(self, i, state):
+        """
+        Changes state of an object, updating its cell everywhere
+        :param i: index of the object
+        :param state: INTACT or OPENED
+        """
+        if self.states[i] == state:
+            return
+        self.states[i] = state
+        row, col = int(self.rows[i]), int(self.cols[i])
+        cell = int(self.type_ids[i]) if state == INTACT else self.empty_id
+        self.objects_matrix[row, col] = cell
+        self.collider.set_cell(row, col, cell)
+        self.__chunk_blits.pop(col // self.chunk_cols, None)
+        for apply in self.__hooks:
+            apply(row, col, cell)
+
+    def open(self, row, col):
+        """
+        Opens object in the cell, if there is an intact one
+        :return: True if an object was opened
+        """
+        i = self.__index.get((row, col))
+        if i is None or self.states[i] != INTACT:
+            return False
+        self.set_object_state(i, OPENED)
+        return True
+
+    def overlapping(self, xmin, ymin, xmax, ymax, cell_w, cell_h):
+        """
+        Finds intact objects whose cells overlap given pixel rectangle (in world coordinates); only cells under the rectangle are
+        looked up, so it costs the same for any number of objects
+        :params cell_w, cell_h: size of a single cell, in pixels
+        :return: list of object indices
+        """
+        found = []
+        for row in range(int(ymin // cell_h), int(-(-ymax // cell_h))):
+            for col in range(int(xmin // cell_w), int(-(-xmax // cell_w))):
+                i = self.__index.get((row, col))
+                if i is not None and self.states[i] == INTACT:
+                    found.append(i)
+        return found
+
+    def get_state(self):
+        """Returns states of all objects, a byte per object"""
+        return self.states.tobytes()
+
+    def set_state(self, state):
+        """Restores states returned by get_state; only objects whose state differs are touched"""
+        states = np.frombuffer(state, np.uint8)
+        for i in np.flatnonzero(states != self.states):
+            self.set_object_state(int(i), int(states[i]))
+
+    def get_blits(self, surfaces, view, offset, cell_w, cell_h, scale=1):
+        """
+        Returns blits of intact objects in chunks overlapping view
+        :param surfaces: dict {type id: surface of a single cell, at the render scale}
+        :param view: visible area in world coordinates (xmin, ymin, xmax, ymax)
+        :param offset: camera offset, in canvas pixels
+        :params cell_w, cell_h: size of a single cell, in pixels
+        :param scale: render scale
+        :return: list of (surface, destination)
+        """
+        ox, oy = offset
+        first, last = int(view[0] // (cell_w * self.chunk_cols)), int(view[2] // (cell_w * self.chunk_cols))
+        blits = []
+        for chunk in range(first, last + 1):
+            if chunk not in self.__chunks:
+                continue
+            drawn = self.__chunk_blits.get(chunk)
+            if drawn is None:
+                drawn = [(int(self.type_ids[i]), int(self.cols[i]), int(self.rows[i])) for i in self.__chunks[chunk]
+                         if self.states[i] == INTACT]
+                self.__chunk_blits[chunk] = drawn
+            blits.extend((surfaces[type_id], (int(round(col * cell_w * scale)) + ox, int(round(row * cell_h * scale)) + oy))
+                         for type_id, col, row in drawn)
+        return blits
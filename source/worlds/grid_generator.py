@@ -2,21 +2,14 @@ import argparse
 import os
 import pathlib
 import pickle
-from collections import OrderedDict
 
 import cv2
 import numpy as np
 
-cell_types = OrderedDict([
-    ("GROUND", {'color': (0, 0, 0), 'info': "black, for solid ground, where turtle can safely walk"}),
-    ("PLATFORM", {'color': (0, 255, 0), 'info': "green, for hanging platforms, where turtle can safely jump"}),
-    ("WATER", {'color': (255, 0, 0), 'info': "blue, for water, swimmable by turtle"}),
-    ("LOOT_CRATE", {'color': (19, 69, 139), 'info': "brown, for loot crates with snails and other edible things"}),
-    ("LAVA", {'color': (0, 0, 255), 'info': "red, for lava (where turtle dies)"}),
-    ("CHECKPOINT_GROUND", {'color': (0, 255, 255), 'info': "yellow, for places with checkpoints"}),
-    ("EMPTY_CELL", {'color': (255, 255, 255), 'info': "empty cell"}),
-    ("SPIKES", {'color': (0, 0, 128), 'info': "red, for spikes (where turtle dies)"})
-])
+from source.worlds.cell_types import cell_types
+
+# world instances are kept next to this module, wherever it's run from (python -m source.worlds.grid_generator, from the repo root)
+WORLDS_PATH = os.path.dirname(os.path.abspath(__file__))
 
 
 class GridGenerator:
@@ -33,7 +26,7 @@ class GridGenerator:
         self.cell_w = cell_w
         self.cell_h = cell_h
 
-        self.world_root = 'world_instances'
+        self.world_root = os.path.join(WORLDS_PATH, 'world_instances')
 
         self.cell_types = cell_types
 
@@ -128,7 +121,7 @@ class GridGenerator:
         :param grid_image_name: name of the image with grid
         :return: grid image, grid info
         """
-        world_path = os.path.join('world_instances', world_name)
+        world_path = os.path.join(self.world_root, world_name)
         grid = cv2.imread(os.path.join(world_path, grid_image_name))
         grid_info = pickle.load(open(os.path.join(world_path, 'grid_info.p'), 'rb'))
         return grid, grid_info
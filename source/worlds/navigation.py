@@ -0,0 +1,245 @@
+import heapq
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from source.turtles import physics
+
+# kinds of navigation links
+WALK = 0
+JUMP = 1
+FALL = 2
+
+PARAMS_KEY = 'nav_params'
+
+
+def default_params():
+    """Returns physics parameters navigation is computed for, taken from the hero movement constants"""
+    return np.array([physics.JUMP_SPEED, physics.GRAVITY, physics.SPEED_SLOW, physics.SPEED_FAST, physics.TICK] + list(physics.HERO_BOX),
+                    dtype=np.float32)
+
+
+def walkable_mask(collider):
+    """
+    Finds cells that can be stood in: free (not solid and not deadly) cells right above solid, not deadly ones
+    :param collider: TileCollider of the world
+    :return: boolean matrix of the grid shape
+    """
+    solid, deadly = collider.solid, collider.deadly
+    walkable = np.zeros_like(solid)
+    walkable[:-1] = ~solid[:-1] & ~deadly[:-1] & solid[1:] & ~deadly[1:]
+    return walkable
+
+
+def find_walkable_cells(collider):
+    """
+    Finds walkable cells, see walkable_mask
+    :param collider: TileCollider of the world
+    :return: (N, 2) array of (column, row) of walkable cells
+    """
+    rows, cols = np.nonzero(walkable_mask(collider))
+    return np.stack([cols, rows], axis=1).astype(np.int32)
+
+
+def simulate_arc(collider, x, y, w, h, vx, vy, gravity, tick, max_time=3.0):
+    """
+    Simulates flight of a box (a jump or a fall) tick by tick, resolving it against terrain the same way the game does
+    :params x, y, w, h: initial box, in world pixels
+    :params vx, vy: initial velocity, in pixels / s (horizontal one is kept, unless the box hits a wall)
+    :return: (x, y, time) of landing, or None if the box died, fell out of the world or didn't land in max_time
+    """
+    t = 0.0
+    while t < max_time:
+        result = collider.move(x, y, w, h, vx * tick, vy * tick + gravity * tick ** 2 / 2)
+        t += tick
+        if result.deadly or result.fell_out:
+            return None
+        x, y = result.x, result.y
+        if result.hit_x:
+            vx = 0.0
+        vy = 0.0 if result.hit_y < 0 else vy + gravity * tick
+        if result.on_ground and vy >= 0:
+            return x, y, t
+    return None
+
+
+class NavigationGraph:
+    """
+    Navigation graph over the tile grid. Nodes are walkable cells; links connect neighbouring walkable cells (walking) and cells
+    reachable by jumps and falls, found by simulating the hero physics once, when the graph is built. Paths are found with A*
+    and cached, so repeated queries (for eg. by enemies chasing the hero) are dictionary lookups.
+    """
+
+    def __init__(self, nodes, edges, costs, cell_w, cell_h, params=None, cache_size=1024):
+        """
+        :param nodes: (N, 2) array of (column, row) of walkable cells
+        :param edges: (E, 3) array of (source node, target node, link kind)
+        :param costs: (E,) array of link costs (time needed to traverse them, in seconds)
+        :param cell_w, cell_h: size of a single cell, in pixels
+        :param params: physics parameters the graph was built for, see default_params
+        :param cache_size: number of cached paths
+        """
+        self.nodes = nodes
+        self.edges = edges
+        self.costs = costs
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+        self.params = default_params() if params is None else params
+        self.node_index = {(int(column), int(row)): i for i, (column, row) in enumerate(nodes)}
+        self.adjacency = [[] for _ in range(len(nodes))]  # node: list of (target node, cost, kind)
+        for (source, target, kind), cost in zip(edges.tolist(), costs.tolist()):
+            self.adjacency[source].append((target, cost, kind))
+        # the lowest cost of a link per column it crosses, a lower bound of the cost of any path per column (links start and land
+        # anywhere in their cells, with the box sticking out of them, so a link may cross columns faster than the running hero)
+        columns = np.abs(nodes[edges[:, 1], 0].astype(np.int64) - nodes[edges[:, 0], 0]) if len(edges) else np.zeros(0, np.int64)
+        crossing = columns > 0
+        self.cost_per_column = float((costs[crossing].astype(np.float64) / columns[crossing]).min()) if crossing.any() else 0.0
+        self.cache_size = cache_size
+        self.__cache = OrderedDict()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @classmethod
+    def build(cls, collider, params=None):
+        """
+        Builds navigation graph: finds walkable cells and simulates walking, falls off their edges and jumps (standing and running)
+        from them
+        :param collider: TileCollider of the world
+        :param params: physics parameters, see default_params
+        :return: NavigationGraph
+        """
+        params = default_params() if params is None else params
+        jump_speed, gravity, speed_slow, speed_fast, tick, w, h = (float(p) for p in params)
+        cell_w, cell_h = collider.cell_w, collider.cell_h
+        nodes = find_walkable_cells(collider)
+        node_index = {(int(column), int(row)): i for i, (column, row) in enumerate(nodes)}
+        best = {}  # (source, target): (cost, kind)
+
+        def add_link(source, target, cost, kind):
+            if source != target and ((source, target) not in best or cost < best[(source, target)][0]):
+                best[(source, target)] = (cost, kind)
+
+        def landing_node(x, y):
+            row = int(round((y + h) / cell_h)) - 1
+            center = int((x + w / 2) // cell_w)
+            for column in (center, int(x // cell_w), int((x + w - 1) // cell_w)):
+                if (column, row) in node_index:
+                    return node_index[(column, row)]
+            return None
+
+        walk_cost = cell_w / speed_fast
+        for i, (column, row) in enumerate(nodes.tolist()):
+            y = (row + 1) * cell_h - h
+            for direction in (-1, 1):
+                neighbour = (column + direction, row)
+                if neighbour in node_index:
+                    add_link(i, node_index[neighbour], walk_cost, WALK)
+                elif 0 <= neighbour[0] < collider.cols and not collider.solid[row, neighbour[0]]:
+                    # walking off the edge, with the box already past it
+                    x = (column + 1) * cell_w if direction > 0 else column * cell_w - w
+                    for speed in (0, speed_slow, speed_fast):
+                        landing = simulate_arc(collider, x, y, w, h, direction * speed, 0.0, gravity, tick)
+                        if landing is not None and landing_node(landing[0], landing[1]) is not None:
+                            add_link(i, landing_node(landing[0], landing[1]), walk_cost / 2 + landing[2], FALL)
+
+            # standing and running jumps, from the center of the cell and from its edges; at the edge of a cliff, the box can stick out
+            # of it almost entirely and still stand
+            left, right = column * cell_w, (column + 1) * cell_w - w
+            if column > 0 and not collider.solid[row, column - 1]:
+                left = column * cell_w - w + 1
+            if column + 1 < collider.cols and not collider.solid[row, column + 1]:
+                right = (column + 1) * cell_w - 1
+            for x in (left, column * cell_w + (cell_w - w) / 2, right):
+                for speed in (-speed_fast, -speed_slow, 0, speed_slow, speed_fast):
+                    landing = simulate_arc(collider, x, y, w, h, speed, -jump_speed, gravity, tick)
+                    if landing is not None and landing_node(landing[0], landing[1]) is not None:
+                        add_link(i, landing_node(landing[0], landing[1]), landing[2], JUMP)
+
+        keys = sorted(best)
+        edges = np.array([(source, target, best[(source, target)][1]) for source, target in keys], dtype=np.int32).reshape(-1, 3)
+        costs = np.array([best[key][0] for key in keys], dtype=np.float32)
+        return cls(nodes, edges, costs, cell_w, cell_h, params)
+
+    @classmethod
+    def from_arrays(cls, arrays, cell_w, cell_h, params=None):
+        """
+        Restores graph saved with to_arrays (for eg. from the extra data of a compiled level)
+        :param arrays: dict {name: array}
+        :param cell_w, cell_h: size of a single cell, in pixels
+        :param params: physics parameters the graph is needed for; a graph built for other ones is outdated
+        :return: NavigationGraph, or None if the arrays don't contain an up to date graph
+        """
+        params = default_params() if params is None else params
+        if PARAMS_KEY not in arrays or not np.allclose(arrays[PARAMS_KEY], params):
+            return None
+        return cls(arrays['nav_nodes'], arrays['nav_edges'], arrays['nav_costs'], cell_w, cell_h, params)
+
+    def to_arrays(self):
+        """Returns graph as a dict of arrays, to be saved in the compiled level"""
+        return {'nav_nodes': self.nodes, 'nav_edges': self.edges, 'nav_costs': self.costs, PARAMS_KEY: self.params}
+
+    def node_at(self, x, y):
+        """
+        Finds node a box stands in
+        :params x, y: bottom-center point of the box, in world pixels
+        :return: node index, or None if the point is not in a walkable cell
+        """
+        return self.node_index.get((int(x // self.cell_w), int(math.ceil(y / self.cell_h)) - 1))
+
+    def node_position(self, node):
+        """Returns bottom-center point of node cell, in world pixels"""
+        column, row = self.nodes[node]
+        return (int(column) + 0.5) * self.cell_w, (int(row) + 1) * self.cell_h
+
+    def find_path(self, source, target):
+        """
+        Finds the fastest path between nodes; paths are cached
+        :params source, target: node indices
+        :return: list of node indices (from source to target, both included), or None if target is unreachable
+        """
+        key = (source, target)
+        if key in self.__cache:
+            self.__cache.move_to_end(key)
+            return self.__cache[key]
+        path = self.a_star(source, target)
+        self.__cache[key] = path
+        if len(self.__cache) > self.cache_size:
+            self.__cache.popitem(last=False)
+        return path
+
+    def a_star(self, source, target):
+        """
+        A* search. The heuristic is the number of columns to the target times the lowest cost of a link per column it crosses
+        (see cost_per_column), which never overestimates: every path crosses at least that many columns, none of them cheaper.
+        """
+        target_column = int(self.nodes[target][0])
+        cost_per_column = self.cost_per_column
+        nodes = self.nodes
+
+        def heuristic(node):
+            return abs(int(nodes[node][0]) - target_column) * cost_per_column
+
+        costs = {source: 0.0}
+        previous = {source: None}
+        queue = [(heuristic(source), source)]
+        while queue:
+            _, node = heapq.heappop(queue)
+            if node == target:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = previous[node]
+                return path[::-1]
+            for neighbour, cost, _ in self.adjacency[node]:
+                new_cost = costs[node] + cost
+                if new_cost < costs.get(neighbour, math.inf):
+                    costs[neighbour] = new_cost
+                    previous[neighbour] = node
+                    heapq.heappush(queue, (new_cost + heuristic(neighbour), neighbour))
+        return None
+
+    def clear_cache(self):
+        """Forgets cached paths (for eg. after the level changed)"""
+        self.__cache.clear()
@@ -0,0 +1,174 @@
+import math
+import random
+
+import pygame
+
+from source.rendering.canvas import scale_surface
+from source.rendering.surfaces import prepare_surface
+
+
+def fill_gradient(surface, color, gradient, rect=None, vertical=True, forward=True):
+    """
+    Fill a surface with a gradient pattern
+    Parameters:
+    color -> starting color
+    gradient -> final color
+    rect -> area to fill; default is surface's rect
+    vertical -> True=vertical; False=horizontal
+    forward -> True=forward; False=reverse
+
+    Pygame recipe: http://www.pygame.org/wiki/GradientCode
+    """
+    if rect is None: rect = surface.get_rect()
+    x1, x2 = rect.left, rect.right
+    y1, y2 = rect.top, rect.bottom
+    if vertical:
+        h = y2 - y1
+    else:
+        h = x2 - x1
+    if forward:
+        a, b = color, gradient
+    else:
+        b, a = color, gradient
+    rate = (
+        float(b[0] - a[0]) / h,
+        float(b[1] - a[1]) / h,
+        float(b[2] - a[2]) / h
+    )
+    fn_line = pygame.draw.line
+    if vertical:
+        for line in range(y1, y2):
+            color = (
+                min(max(a[0] + (rate[0] * (line - y1)), 0), 255),
+                min(max(a[1] + (rate[1] * (line - y1)), 0), 255),
+                min(max(a[2] + (rate[2] * (line - y1)), 0), 255)
+            )
+            fn_line(surface, color, (x1, line), (x2, line))
+    else:
+        for col in range(x1, x2):
+            color = (
+                min(max(a[0] + (rate[0] * (col - x1)), 0), 255),
+                min(max(a[1] + (rate[1] * (col - x1)), 0), 255),
+                min(max(a[2] + (rate[2] * (col - x1)), 0), 255)
+            )
+            fn_line(surface, color, (col, y1), (col, y2))
+
+
+class ParallaxLayer:
+    """
+    A single background layer, pre-rendered once into a wrap-around surface and scrolled at a fraction of the camera offset.
+    """
+
+    def __init__(self, surface, factor, y=0):
+        """
+        :param surface: pre-rendered layer; its left and right edges must match, and it must be at least as wide as the screen
+        :param factor: fraction of the camera offset the layer moves by (0 - static, 1 - moves with the world)
+        :param y: vertical position of the layer on screen, in pixels
+        """
+        self.surface = surface
+        self.factor = factor
+        self.y = y
+        self.width = surface.get_width()
+
+    def draw(self, screen, offset_x, offset_y):
+        """
+        Draws layer with (at most) two blits: the wrapped tile and its continuation
+        :param screen: screen surface
+        :param offset_x, offset_y: camera offset, relative to the initial one
+        """
+        screen.blits(self.get_blits(offset_x, offset_y), doreturn=False)
+
+    def get_blits(self, offset_x, offset_y):
+        """Returns blits (surface, destination) of the layer, see draw"""
+        shift = int(offset_x * self.factor) % self.width
+        y = self.y + int(offset_y * self.factor)
+        if shift:
+            return [(self.surface, (-shift, y)), (self.surface, (self.width - shift, y))]
+        return [(self.surface, (-shift, y))]
+
+
+class ParallaxBackground:
+    """
+    Background made of parallax layers (gradient sky, distant hills, clouds), drawn back to front.
+    """
+
+    def __init__(self, screen_w, screen_h, sky_color=(0, 191, 255), horizon_color=(240, 248, 255), seed=0, scale=1):
+        """
+        :param screen_w, screen_h: size of the screen, in pixels
+        :param sky_color, horizon_color: colors of the sky gradient (top and bottom)
+        :param seed: seed used to place hills and clouds
+        :param scale: render scale; layers are rendered at the screen resolution and pre-scaled, so they look the same at every scale
+        """
+        self.screen_w = screen_w
+        self.screen_h = screen_h
+        rng = random.Random(seed)
+        self.layers = [self.make_sky(sky_color, horizon_color),
+                       self.make_hills(rng, (150, 190, 200), 0.55, 0.1),
+                       self.make_hills(rng, (105, 160, 150), 0.7, 0.25),
+                       self.make_clouds(rng, 0.4)]
+        if scale != 1:
+            self.layers = [ParallaxLayer(scale_surface(layer.surface, scale), layer.factor, int(round(layer.y * scale)))
+                           for layer in self.layers]
+
+    def draw(self, screen, offset_x, offset_y, max_layers=None):
+        """
+        Draws background layers
+        :param screen: screen surface
+        :param offset_x, offset_y: camera offset, relative to the initial one
+        :param max_layers: draw only this many layers, starting from the sky (for eg. to save time on slow machines)
+        """
+        screen.blits(self.get_blits(offset_x, offset_y, max_layers), doreturn=False)
+
+    def get_blits(self, offset_x, offset_y, max_layers=None):
+        """Returns blits (surface, destination) of background layers, back to front, see draw"""
+        return [blit for layer in self.layers[:max_layers] for blit in layer.get_blits(offset_x, offset_y)]
+
+    def make_sky(self, sky_color, horizon_color):
+        """Renders gradient sky once; it is static, so it is always drawn with a single blit"""
+        surface = pygame.Surface((self.screen_w, self.screen_h))
+        fill_gradient(surface, sky_color, horizon_color)
+        return ParallaxLayer(prepare_surface(surface), 0)
+
+    def make_hills(self, rng, color, height_coeff, factor):
+        """
+        Renders a range of hills as a sum of sines. Frequencies are whole multiples of the layer width, so the edges match.
+        :param rng: random generator
+        :param color: color of hills
+        :param height_coeff: height of the highest hill, as a fraction of screen height
+        :param factor: parallax factor of the layer
+        """
+        w = self.screen_w * 2
+        h = int(self.screen_h * height_coeff)
+        waves = [(rng.randint(1, 4) * k, rng.uniform(0, 2 * math.pi), rng.uniform(0.5, 1) / k) for k in (1, 2, 3)]
+        norm = sum(amplitude for _, _, amplitude in waves)
+
+        points = [(0, h)]
+        for x in range(0, w + 1, 4):
+            wave = sum(amplitude * math.sin(2 * math.pi * freq * x / w + phase) for freq, phase, amplitude in waves) / norm
+            points.append((x, h * 0.3 + (wave + 1) / 2 * h * 0.5))
+        points.append((w, h))
+
+        surface = pygame.Surface((w, h), pygame.SRCALPHA)
+        pygame.draw.polygon(surface, color, points)
+        return ParallaxLayer(prepare_surface(surface), factor, self.screen_h - h)
+
+    def make_clouds(self, rng, factor, count=8):
+        """
+        Renders clouds made of ellipses; clouds crossing the right edge are drawn again at the left one, so they wrap around.
+        :param rng: random generator
+        :param factor: parallax factor of the layer
+        :param count: number of clouds
+        """
+        w = self.screen_w * 2
+        h = self.screen_h // 3
+        surface = pygame.Surface((w, h), pygame.SRCALPHA)
+        for _ in range(count):
+            cx = rng.randrange(w)
+            cy = rng.randrange(20, h - 40)
+            for _ in range(rng.randint(3, 5)):
+                ew, eh = rng.randint(60, 120), rng.randint(30, 50)
+                ex = cx + rng.randint(-50, 50)
+                ey = cy + rng.randint(-10, 10)
+                for wrap in (-w, 0, w):
+                    pygame.draw.ellipse(surface, (255, 255, 255, 200), (ex + wrap, ey, ew, eh))
+        return ParallaxLayer(prepare_surface(surface), factor)
@@ -0,0 +1,199 @@
+import argparse
+import os
+import pathlib
+import pickle
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from source.worlds.cell_types import cell_types
+
+WORLDS_PATH = os.path.dirname(os.path.abspath(__file__))  # default paths of the CLI are relative to it, not to the working directory
+
+
+class ProceduralGenerator:
+    """
+    Seeded generator of levels of any length. The level is made of chunks of a fixed number of columns; every chunk is generated
+    from its own random stream (derived from the seed and the chunk index) and starts and ends with flat ground at the base level,
+    so chunks can be generated independently, in any order, and always join. Only requested chunks are generated (and a few recent
+    ones are cached), so endless levels never have to be materialized as a whole.
+
+    Levels are designed for the hero physics: steps up are at most one row high, pits at most two cells wide, and floating platforms
+    form stairs of one row steps.
+    """
+
+    def __init__(self, seed=0, rows=16, cell_w=128, cell_h=64, chunk_cols=64, cache_size=16, cell_types=cell_types):
+        """
+        :param seed: seed of the level; the same seed always gives the same level
+        :param rows: number of rows of the level
+        :param cell_w, cell_h: size of a single cell, in pixels
+        :param chunk_cols: number of columns of a single chunk
+        :param cache_size: number of cached chunks
+        :param cell_types: cell types dictionary (its order defines cell type indices)
+        """
+        self.seed = seed
+        self.rows = rows
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+        self.chunk_cols = chunk_cols
+        self.cache_size = cache_size
+        self.ids = {name: i for i, name in enumerate(cell_types.keys())}
+        self.base = rows - 3  # top row of the lowest ground
+        self.min_top = max(self.base - 5, 5)  # top row of the highest ground; leaves room for stairs above it
+        self.__cache = OrderedDict()
+
+    def chunk(self, index):
+        """
+        Returns chunk of the objects matrix (generated on demand and cached)
+        :param index: index of the chunk
+        :return: matrix (rows, chunk_cols) of cell type indices
+        """
+        if index in self.__cache:
+            self.__cache.move_to_end(index)
+            return self.__cache[index]
+        chunk = self.generate_chunk(index)
+        self.__cache[index] = chunk
+        if len(self.__cache) > self.cache_size:
+            self.__cache.popitem(last=False)
+        return chunk
+
+    def window(self, col0, col1):
+        """
+        Returns part of the objects matrix, generating only chunks it covers
+        :params col0, col1: range of columns [col0, col1)
+        :return: matrix (rows, col1 - col0)
+        """
+        first, last = col0 // self.chunk_cols, (col1 - 1) // self.chunk_cols
+        parts = [self.chunk(index) for index in range(first, last + 1)]
+        start = col0 - first * self.chunk_cols
+        return np.concatenate(parts, axis=1)[:, start:start + col1 - col0]
+
+    def iter_chunks(self, start=0):
+        """Yields (index, chunk) of consecutive chunks, endlessly"""
+        index = start
+        while True:
+            yield index, self.chunk(index)
+            index += 1
+
+    def make_grid_info(self, cols):
+        """
+        Generates level of given width as grid info, in the format of GridGenerator
+        :param cols: number of columns
+        :return: grid info dictionary
+        """
+        return {'rows': self.rows,
+                'cols': cols,
+                'cell_w': self.cell_w,
+                'cell_h': self.cell_h,
+                'img_w': cols * self.cell_w,
+                'img_h': self.rows * self.cell_h,
+                'legend_h': 0,
+                'objects_matrix': self.window(0, cols)}
+
+    def generate_chunk(self, index):
+        """
+        Generates a single chunk: a checkpoint run of ground, then runs of ground at varying heights separated by pits of lava or
+        water (some with stepping stones), decorated with spikes, crates and stairs of platforms, and a closing run at the base level
+        :param index: index of the chunk
+        :return: matrix (rows, chunk_cols) of cell type indices
+        """
+        rng = np.random.default_rng([self.seed, index])
+        ids = self.ids
+        chunk = np.full((self.rows, self.chunk_cols), ids['EMPTY_CELL'], np.int8)
+        body_end = self.chunk_cols - 3  # the last three columns are the closing run
+
+        column = self.fill_ground(chunk, 0, 4, self.base)
+        chunk[self.base, 0] = ids['CHECKPOINT_GROUND']
+        top = self.base
+        while column < body_end:
+            next_top = int(np.clip(top + rng.choice([-1, 0, 0, 1, 2]), self.min_top, self.base))
+            gap = rng.random()
+            if gap < 0.3:
+                column = self.fill_pit(chunk, column, min(int(rng.integers(1, 3)), body_end - column), max(top, next_top),
+                                       rng.choice(['LAVA', 'WATER']))
+            elif gap < 0.45 and body_end - column >= 5:
+                width = int(rng.integers(3, 6))
+                start = column
+                column = self.fill_pit(chunk, column, width, max(top, next_top), rng.choice(['LAVA', 'WATER']))
+                chunk[top, start + 1:column - 1] = ids['PLATFORM']  # stepping stones, flush with the ground behind
+            top = next_top
+            if column >= body_end:
+                break
+            length = min(int(rng.integers(3, 11)), body_end - column)
+            spikes = self.decorate_run(chunk, rng, column, length, top)
+            column = self.fill_ground(chunk, column, length, top)
+            if spikes is not None:
+                chunk[top, spikes] = ids['SPIKES']
+        self.fill_ground(chunk, body_end, self.chunk_cols - body_end, self.base)
+        return chunk
+
+    def fill_ground(self, chunk, column, length, top):
+        """Fills columns with ground, from the top row down; returns the first column after them"""
+        chunk[top:, column:column + length] = self.ids['GROUND']
+        return column + length
+
+    def fill_pit(self, chunk, column, width, surface, liquid):
+        """
+        Fills columns with lava (down to the bottom) or water (with ground at the bottom row)
+        :param surface: top row of the liquid
+        :return: the first column after the pit
+        """
+        chunk[surface:, column:column + width] = self.ids[liquid]
+        if liquid == 'WATER':
+            chunk[-1, column:column + width] = self.ids['GROUND']
+        return column + width
+
+    def decorate_run(self, chunk, rng, column, length, top):
+        """
+        Decorates run of ground (before it's filled) with one of: spikes, stairs of platforms with a crate on the top, a crate
+        :params column, length: columns of the run
+        :param top: top row of the run ground
+        :return: column of spikes, replacing the top ground cell (to be placed after the ground is filled), or None
+        """
+        ids = self.ids
+        roll = rng.random()
+        if roll < 0.3 and length >= 5:
+            return int(rng.integers(column + 2, column + length - 2))  # spikes are sunk into the ground, so they are filled later
+        elif roll < 0.55 and length >= 6 and top - 4 >= 0:
+            steps = int(rng.integers(2, 4)) if length >= 8 else 2  # every step is two columns wide
+            for step in range(1, steps + 1):
+                x = column + 1 + (step - 1) * 2
+                chunk[top - step, x:x + 2] = ids['PLATFORM']
+            chunk[top - steps - 1, x + 1] = ids['LOOT_CRATE']  # on the far end, so the crate doesn't block climbing
+        elif roll < 0.75 and length >= 4:
+            chunk[top - 1, int(rng.integers(column + 1, column + length - 1))] = ids['LOOT_CRATE']
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("world_name", help="name of the world")
+    parser.add_argument("--cols", help="number of columns of the level", type=int, default=400)
+    parser.add_argument("--rows", help="number of rows of the level", type=int, default=16)
+    parser.add_argument("--seed", help="seed of the level", type=int, default=0)
+    parser.add_argument("--w", help="width of a single cell", type=int, default=128)
+    parser.add_argument("--h", help="height of a single cell", type=int, default=64)
+    parser.add_argument("--check", help="flag | analyze reachability of the generated level", action="store_true")
+    parser.add_argument("--assets", help="path to the folder with assets (use only with --check)", type=str,
+                        default=os.path.join(WORLDS_PATH, 'assets'))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generator = ProceduralGenerator(args.seed, args.rows, args.w, args.h)
+    grid_info = generator.make_grid_info(args.cols)
+    print("Generated {}x{} level in {:.3f} s".format(args.rows, args.cols, time.perf_counter() - started))
+
+    world_path = os.path.join(WORLDS_PATH, 'world_instances', args.world_name)
+    pathlib.Path(world_path).mkdir(parents=True, exist_ok=True)
+    pickle.dump(grid_info, open(os.path.join(world_path, 'grid_info.p'), 'wb'))
+
+    if args.check:
+        from source.worlds.assets import load_asset_flags
+        from source.worlds.reachability import analyze_level
+
+        flags = load_asset_flags(args.assets, [name for name in cell_types.keys() if name != 'EMPTY_CELL'])
+        report = analyze_level(grid_info['objects_matrix'], args.w, args.h, flags)
+        print("{} of {} walkable cells reachable, {} unreachable checkpoints, {} unreachable crates ({:.3f} s)".format(
+            report['reachable'], report['walkable'], len(report['unreachable_checkpoints']), len(report['unreachable_loot']),
+            report['time']))
@@ -0,0 +1,151 @@
+import argparse
+import glob
+import math
+import os
+import pickle
+import time
+
+import numpy as np
+
+from source.physics.tile_collider import collider_from_assets
+from source.turtles import physics
+from source.worlds.assets import load_asset_flags
+from source.worlds.cell_types import cell_types
+from source.worlds.navigation import walkable_mask
+
+WORLDS_PATH = os.path.dirname(os.path.abspath(__file__))  # default paths of the CLI are relative to it, not to the working directory
+
+
+def jump_envelope(cell_w, cell_h, rows, jump_speed=physics.JUMP_SPEED, gravity=physics.GRAVITY, speed=physics.SPEED_FAST,
+                  box_w=physics.HERO_BOX[0]):
+    """
+    Computes jump envelope: offsets (columns, rows) of all cells the hero can land in with a single jump (or a walk or fall) from
+    a walkable cell. Landing time for each height follows from the jump physics, and the horizontal reach is the running speed
+    times that time; the box may start almost entirely sticking out of the edge of its cell and land overlapping the target one
+    by a single pixel. Terrain in between is not taken into account, so the envelope is optimistic.
+    :param cell_w, cell_h: size of a single cell, in pixels
+    :param rows: number of rows of the grid (the deepest possible fall)
+    :return: (K, 2) array of (column offset, row offset), row offsets grow downwards
+    """
+    offsets = []
+    min_row = -int(math.floor(physics.jump_height(jump_speed, gravity) / cell_h))
+    for row in range(min_row, rows):
+        drop = row * cell_h  # height difference of the landing surface, positive downwards
+        landing_time = (jump_speed + math.sqrt(jump_speed ** 2 + 2 * gravity * drop)) / gravity
+        reach = speed * landing_time
+        # horizontal gap between the furthest standing position and the nearest landing one, for column offset c: (c - 1) * w - box + 2
+        max_column = int(math.floor((reach + box_w - 2) / cell_w)) + 1
+        offsets.extend((column, row) for column in range(-max_column, max_column + 1))
+    return np.array(offsets, dtype=np.int32)
+
+
+def reachable_cells(walkable, envelope, start):
+    """
+    Breadth first search over walkable cells, expanding the whole frontier by the whole jump envelope at once with NumPy
+    :param walkable: boolean matrix of walkable cells
+    :param envelope: (K, 2) array of (column offset, row offset), see jump_envelope
+    :param start: (column, row) of the starting cell
+    :return: (boolean matrix of reachable cells, number of BFS steps)
+    """
+    rows, cols = walkable.shape
+    reached = np.zeros_like(walkable)
+    reached[start[1], start[0]] = True
+    frontier = np.array([start], dtype=np.int32)
+    steps = 0
+    while len(frontier):
+        targets = (frontier[:, None, :] + envelope[None, :, :]).reshape(-1, 2)
+        inside = (targets[:, 0] >= 0) & (targets[:, 0] < cols) & (targets[:, 1] >= 0) & (targets[:, 1] < rows)
+        targets = targets[inside]
+        new = walkable[targets[:, 1], targets[:, 0]] & ~reached[targets[:, 1], targets[:, 0]]
+        targets = np.unique(targets[new], axis=0)
+        reached[targets[:, 1], targets[:, 0]] = True
+        frontier = targets
+        steps += 1
+    return reached, steps
+
+
+def find_start(walkable):
+    """Returns the default starting cell: the lowest walkable cell of the leftmost column that has any (column, row)"""
+    rows, cols = np.nonzero(walkable)
+    if len(cols) == 0:
+        return None
+    column = cols.min()
+    return int(column), int(rows[cols == column].max())
+
+
+def analyze_level(objects_matrix, cell_w, cell_h, asset_flags, start=None):
+    """
+    Finds cells reachable by the hero and reports checkpoints and loot that can't be reached. A checkpoint counts as reached when
+    the hero can stand on it, a loot crate when the hero can stand on it or next to it.
+    :param objects_matrix: matrix of cell type indices
+    :param cell_w, cell_h: size of a single cell, in pixels
+    :param asset_flags: dict {cell_name: {feature: bool}}, see load_asset_flags
+    :param start: (column, row) of the starting cell; by default see find_start
+    :return: dict with the report
+    """
+    started = time.perf_counter()
+    type_ids = {name: i for i, name in enumerate(cell_types.keys())}
+    collider = collider_from_assets(objects_matrix, cell_w, cell_h, asset_flags, type_ids)
+    walkable = walkable_mask(collider)
+    start = find_start(walkable) if start is None else start
+    if start is None:
+        reached, steps = np.zeros_like(walkable), 0
+    else:
+        reached, steps = reachable_cells(walkable, jump_envelope(cell_w, cell_h, walkable.shape[0]), start)
+
+    # a cell is "touched" if the hero can stand in it, or right next to it (horizontally)
+    touched = reached.copy()
+    touched[:, 1:] |= reached[:, :-1]
+    touched[:, :-1] |= reached[:, 1:]
+    on_top = np.zeros_like(reached)
+    on_top[1:] = reached[:-1]
+
+    def unreachable(name, mask):
+        rows, cols = np.nonzero((objects_matrix == type_ids[name]) & ~mask)
+        return [(int(column), int(row)) for row, column in zip(rows, cols)]
+
+    return {'start': start,
+            'walkable': int(walkable.sum()),
+            'reachable': int(reached.sum()),
+            'steps': steps,
+            'unreachable_checkpoints': unreachable('CHECKPOINT_GROUND', on_top),
+            'unreachable_loot': unreachable('LOOT_CRATE', on_top | touched),
+            'time': time.perf_counter() - started}
+
+
+def analyze_catalog(instances_path, assets_path):
+    """
+    Analyzes all worlds in the catalog
+    :param instances_path: directory with world instances (each in its own directory, with grid_info.p)
+    :param assets_path: path to the folder with assets
+    :return: list of (world name, report)
+    """
+    names = [name for name in cell_types.keys() if name != 'EMPTY_CELL']
+    flags = load_asset_flags(assets_path, names)
+    reports = []
+    for grid_file_path in sorted(glob.glob(os.path.join(instances_path, '*', 'grid_info.p'))):
+        grid_info = pickle.load(open(grid_file_path, "rb"))
+        report = analyze_level(grid_info['objects_matrix'], grid_info['cell_w'], grid_info['cell_h'], flags)
+        reports.append((os.path.basename(os.path.dirname(grid_file_path)), report))
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--instances", help="path to the folder with world instances", type=str,
+                        default=os.path.join(WORLDS_PATH, 'world_instances'))
+    parser.add_argument("--assets", help="path to the folder with assets", type=str, default=os.path.join(WORLDS_PATH, 'assets'))
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    reports = analyze_catalog(args.instances, args.assets)
+    failed = 0
+    for name, report in reports:
+        print("{}: {} of {} walkable cells reachable from {} ({} BFS steps, {:.2f} ms)".format(
+            name, report['reachable'], report['walkable'], report['start'], report['steps'], report['time'] * 1000))
+        for column, row in report['unreachable_checkpoints']:
+            print("  unreachable CHECKPOINT_GROUND at column {}, row {}".format(column, row))
+        for column, row in report['unreachable_loot']:
+            print("  unreachable LOOT_CRATE at column {}, row {}".format(column, row))
+        failed += bool(report['unreachable_checkpoints'] or report['unreachable_loot'])
+    print("Analyzed {} levels in {:.3f} s, {} with unreachable objects".format(len(reports), time.perf_counter() - started, failed))
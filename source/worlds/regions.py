@@ -0,0 +1,92 @@
+import numpy as np
+
+VOLUME_TYPES = ('WATER', 'LAVA')  # cell types forming volumes the hero can be in (or die in)
+NO_REGION = 0
+
+
+def label_regions(objects_matrix, type_ids):
+    """
+    Labels connected volumes of cells of the same type (4-connected), with NumPy only: a vectorized union-find, where every cell
+    starts as its own root, roots of joined neighbours are hooked onto the smaller one and paths are compressed by pointer jumping
+    (parents = parents[parents]) until no joined neighbours have different roots. Every round at least halves the number of
+    roots of a volume, so the cost is a few passes over the joined cells, whatever the shape of volumes.
+    :param objects_matrix: matrix of cell type indices
+    :param type_ids: indices of cell types to label
+    :return: (matrix of labels, NO_REGION outside of volumes and 1..n inside, array of cell type index of every label)
+    """
+    rows, cols = objects_matrix.shape
+    inside = np.isin(objects_matrix, list(type_ids))
+    index = np.arange(rows * cols).reshape(rows, cols)
+    # neighbours joined only when both are inside and of the same type, as pairs of flat indices
+    join_down = inside[:-1] & inside[1:] & (objects_matrix[:-1] == objects_matrix[1:])
+    join_right = inside[:, :-1] & inside[:, 1:] & (objects_matrix[:, :-1] == objects_matrix[:, 1:])
+    first = np.concatenate([index[:-1][join_down], index[:, :-1][join_right]])
+    second = np.concatenate([index[1:][join_down], index[:, 1:][join_right]])
+    parents = np.arange(rows * cols)
+    while True:
+        while True:  # pointer jumping, until every cell points at its root
+            grandparents = parents[parents]
+            if np.array_equal(grandparents, parents):
+                break
+            parents = grandparents
+        root_first, root_second = parents[first], parents[second]
+        differ = root_first != root_second
+        if not differ.any():
+            break
+        # hooks the larger root of every differing pair onto the smaller one (the smallest one, if a root has several)
+        np.minimum.at(parents, np.maximum(root_first, root_second)[differ], np.minimum(root_first, root_second)[differ])
+    roots, compact = np.unique(parents[inside.ravel()], return_inverse=True)
+    labels = np.full((rows, cols), NO_REGION, np.int32)
+    labels[inside] = compact.ravel() + 1
+    region_types = np.zeros(len(roots) + 1, np.int8)
+    region_types[labels[inside]] = objects_matrix[inside]
+    return labels, region_types
+
+
+class RegionMap:
+    """
+    Precomputed map of environmental volumes (connected pools of water, lava and so on). Every cell knows its region and the
+    row of the surface above it, so asking which region contains a point, and how deep below the surface it is, are a couple of
+    array lookups regardless of the size of the level.
+    """
+
+    def __init__(self, objects_matrix, cell_w, cell_h, type_ids):
+        """
+        :param objects_matrix: matrix of cell type indices
+        :param cell_w, cell_h: size of a single cell, in pixels
+        :param type_ids: indices of cell types forming volumes
+        """
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+        self.rows, self.cols = objects_matrix.shape
+        self.labels, self.region_types = label_regions(objects_matrix, type_ids)
+        self.n_regions = len(self.region_types) - 1
+
+        # row of the top cell of the vertical run of the region each cell belongs to (its surface)
+        self.surface_rows = np.zeros_like(self.labels)
+        for row in range(1, self.rows):
+            continued = (self.labels[row] != NO_REGION) & (self.labels[row] == self.labels[row - 1])
+            self.surface_rows[row] = np.where(continued, self.surface_rows[row - 1], row)
+
+    def cell_at(self, x, y):
+        """Returns (row, col) of the cell containing the point (in world pixels), or None outside of the grid"""
+        row, col = int(y // self.cell_h), int(x // self.cell_w)
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return row, col
+        return None
+
+    def region_at(self, x, y):
+        """Returns label of the region containing the point (in world pixels), NO_REGION if there is none"""
+        cell = self.cell_at(x, y)
+        return NO_REGION if cell is None else int(self.labels[cell])
+
+    def region_type(self, region):
+        """Returns cell type index of the region"""
+        return int(self.region_types[region])
+
+    def depth_at(self, x, y):
+        """Returns depth of the point below the surface of its region, in pixels, or None if the point is in no region"""
+        cell = self.cell_at(x, y)
+        if cell is None or self.labels[cell] == NO_REGION:
+            return None
+        return y - self.surface_rows[cell] * self.cell_h
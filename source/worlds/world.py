@@ -1,25 +1,35 @@
-import os
-import pickle
+import time
 
-import cv2
 import numpy as np
 import pygame
 
-from source.worlds.grid_generator import cell_types
+from source.physics.tile_collider import collider_from_assets
+from source.rendering.minimap import Minimap
+from source.worlds.assets import load_assets
+from source.worlds.block_surfaces import BlockSurfaceCache, make_block_surface
+from source.worlds.block_table import BlockTable, FLAG_BOTTOM, FLAG_DEADLY, FLAG_MASKABLE, asset_flags
+from source.worlds.cell_types import cell_types
+from source.worlds.compiled_level import load_level
+from source.worlds.dynamic_objects import DynamicObjects, DYNAMIC_TYPES
+from source.worlds.navigation import NavigationGraph
+from source.worlds.regions import RegionMap, VOLUME_TYPES, NO_REGION
+from source.worlds.parallax import ParallaxBackground
 
 
 class StaticBlock(pygame.sprite.Sprite):
     """
     A class for defining a block of "obstacle", like for example block of grass
     """
+    tiled = False  # whether the block image is composed of repeated tiles
 
-    def __init__(self, x, y, units_w, units_h, images, is_deadly):
+    def __init__(self, x, y, units_w, units_h, images, is_deadly, surface=None):
         """
         A base class for static obstacles, like blocks of solid ground, but also for water, lava, spikes etc.
         :params x, y: coordinates of the origin of block, in pixels
         :params units_w, units_h: width and height of the block (in units)
         :param images: a set of images associated with the block. Might contain several images (it's dependent on class children)
         :param is_deadly: specifies, whether touching the block is deadly for the hero
+        :param surface: an already prepared (possibly shared) block surface; if not given, it is made from images
         """
         # Call the parent class (Sprite) constructor
         super().__init__()
@@ -28,10 +38,7 @@ class StaticBlock(pygame.sprite.Sprite):
         self.is_deadly = is_deadly
 
         # gets image appropriate for the block and uses it as a block surface
-        block_image = self.get_image(units_w, units_h, images)
-        self.image = pygame.surfarray.make_surface(block_image[:, :, :3])  # use only rgb channels
-        black = (0, 0, 0)
-        self.image.set_colorkey(black)  # adds transparent background by keying black paddings
+        self.image = surface if surface is not None else make_block_surface(type(self), units_w, units_h, images)
 
         self.rect = self.image.get_rect()
         self.set_position(x, y)
@@ -44,7 +51,7 @@ class StaticBlock(pygame.sprite.Sprite):
         xmin = self.rect.x
         ymin = self.rect.y
         xmax = xmin + self.rect.width
-        ymax = xmin + self.rect.height
+        ymax = ymin + self.rect.height
         return (xmin, ymin, xmax, ymax)
 
     def set_position(self, x, y):
@@ -56,10 +63,10 @@ class StaticBlock(pygame.sprite.Sprite):
         self.rect.x = x
         self.rect.y = y
 
-    def get_image(self, units_w, units_h, images):
+    @staticmethod
+    def get_image(units_w, units_h, images):
         """Creates an image appropriate for the block"""
-        # idk why, but normal images are rotated 90deg in pygame, so we need to reverse this process
-        return np.rot90(images['top_img'], 1)
+        return images['top_img']
 
     def move_block(self, dx, dy):
         """
@@ -76,23 +83,24 @@ class MaskableBlock(StaticBlock):
     A class defining maskable blocks. They size is adjusted, based on their masks.
     """
 
-    def __init__(self, x, y, units_w, units_h, images, is_deadly):
-        super().__init__(x, y, units_w, units_h, images, is_deadly)
+    def __init__(self, x, y, units_w, units_h, images, is_deadly, surface=None):
+        super().__init__(x, y, units_w, units_h, images, is_deadly, surface)
 
-    def get_image(self, units_w, units_h, images):
+    @staticmethod
+    def get_image(units_w, units_h, images):
         """
         Finds mask for maskable blocks (it should be stored in the 4th, alpha dimension of image) and based on it it computes the actual size of sprite.
         """
-        # idk why, but normal images are rotated 90deg in pygame, so we need to reverse this process
-        image = np.rot90(images['top_img'], 1)
+        image = images['top_img']
 
         # find mask bounding box and cut RGB image with it
-        mask_points = cv2.findNonZero(image[:, :, -1])
-        bbox = cv2.boundingRect(mask_points)  # bounding box in the form: x, y, w, h
-        xmin = bbox[0]
-        ymin = bbox[1]
-        xmax = bbox[2] + xmin
-        ymax = bbox[3] + ymin
+        mask = image[:, :, -1] > 0
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        if len(rows) == 0:  # fully transparent, the bounding box is empty
+            return image[:0, :0, :]
+        ymin, ymax = rows[0], rows[-1] + 1
+        xmin, xmax = cols[0], cols[-1] + 1
         image = image[ymin:ymax, xmin:xmax, :]
         return image
 
@@ -102,11 +110,13 @@ class BottomBlock(StaticBlock):
     A class for defining static objects that are moving the bottom of the screen, therefore usually contains two types of images: a top one and a (possibly repeated) bottom one,
     connected with the end of the screen
     """
+    tiled = True
 
-    def __init__(self, x, y, units_w, units_h, images, is_deadly):
-        super().__init__(x, y, units_w, units_h, images, is_deadly)
+    def __init__(self, x, y, units_w, units_h, images, is_deadly, surface=None):
+        super().__init__(x, y, units_w, units_h, images, is_deadly, surface)
 
-    def get_image(self, units_w, units_h, images):
+    @staticmethod
+    def get_image(units_w, units_h, images):
         top_img = images['top_img']
         result_img = np.concatenate([top_img] * units_w, axis=1)  # repeat image units_w times
 
@@ -122,8 +132,6 @@ class BottomBlock(StaticBlock):
             # final top and bottom concat
             result_img = np.concatenate([result_img, bottom_img], axis=0)
 
-        # oddly, pygame images are rotated counterclockwise of 90 degrees
-        result_img = np.rot90(result_img, 1)
         return result_img
 
 
@@ -132,12 +140,17 @@ class World:
     Class responsible for drawing world and populating it with static sprites.
     """
 
-    def __init__(self, grid_file_path, assets_path, screen_w, screen_h, cell_types=cell_types):
+    def __init__(self, grid_file_path, assets_path, screen_w, screen_h, cell_types=cell_types, render_scale=1, headless=False):
         """
         Initializes world.
         :param grid_file_path: the pickle file, describing world (its size and objects matrix)
         :param assets_path: path to the folder with assets
+        :param render_scale: resolution of the canvas the world is drawn onto, as a fraction of the screen one (see ScaledCanvas)
+        :param headless: if True, the world is never drawn, so no block surfaces nor background layers are made for it
         """
+        self.load_times = {}  # duration of loading phases, in seconds (reported by telemetry)
+        self.__lap_started = time.perf_counter()
+        self.headless = headless
         self.lightskyblue = (240, 248, 255)
         self.skyblue = (0, 191, 255)
         self.__screen_w = screen_w
@@ -146,159 +159,326 @@ class World:
         self.cell_types = {i: k for i, k in enumerate(cell_types.keys())}
         self.cell_type_ids = {v: k for k, v in self.cell_types.items()}
 
-        grid_info = pickle.load(open(grid_file_path, "rb"))
+        # compiled level (if up to date) already contains preprocessed assets, so no image processing is needed
+        grid_info, self.assets, self.level_data = load_level(grid_file_path, assets_path,
+                                                             [key for key in self.cell_type_ids.keys() if key != 'EMPTY_CELL'])
 
         self.__world_h = grid_info['img_h']
         self.__world_w = grid_info['img_w']
         self.__cell_h = grid_info['cell_h']
         self.__cell_w = grid_info['cell_w']
         self.__obj_matrix = grid_info['objects_matrix']
+        self.__lap('level')
+
+        # terrain collisions are resolved directly on the objects matrix
+        self.collider = self.make_collider()
+        self.__navigation = None
+        self.__lap('collider')
+
+        # loot crates are mutable, so they are dynamic objects rather than static blocks (navigation still sees them as intact)
+        self.dynamic = DynamicObjects(self.__obj_matrix, self.collider, [self.cell_type_ids[name] for name in DYNAMIC_TYPES],
+                                      self.cell_type_ids['EMPTY_CELL'])
+
+        # connected volumes of water and lava, for constant time environment queries
+        self.regions = RegionMap(self.__obj_matrix, self.__cell_w, self.__cell_h,
+                                 [self.cell_type_ids[name] for name in VOLUME_TYPES if name in self.cell_type_ids])
+        self.__lap('regions')
+
+        # camera offset, in pixels (may be fractional); world coordinates + offset = screen coordinates
+        self.__offset_x = 0
+        self.__offset_y = self.find_screen_offset(self.__screen_h)
+        self.__initial_offset = (self.__offset_x, self.__offset_y)
+
+        # compact block table is the canonical representation of the world; sprites are only made on demand
+        self.__blocks = self.make_block_table(self.find_connected_components())
+        self.__surface_cache = BlockSurfaceCache(self.assets, self.__cell_w, self.__cell_h)
+        self.__block_masks = self.make_block_masks(self.__blocks)
+        self.__dynamic_masks = self.make_dynamic_masks()
+        self.__sprites = None
+        self.__lap('blocks')
+
+        # pre-scales block surfaces and pre-renders background layers (which are only scrolled afterwards)
+        self.__backgrounds = {}  # render scale: ParallaxBackground
+        self.background_layers = None  # number of drawn background layers, None for all (may be lowered by the quality governor)
+        self.set_render_scale(render_scale)
+        self.__lap('backgrounds')
+
+        # optional SurfaceFormatDiagnostic, checking every drawn surface
+        self.diagnostic = None
+
+    def __lap(self, phase):
+        """Records duration of a loading phase, since the end of the previous one"""
+        now = time.perf_counter()
+        self.load_times[phase] = now - self.__lap_started
+        self.__lap_started = now
+
+    def prepare_surfaces(self):
+        """
+        Render-preparation stage: converts all world surfaces to the display format. Surfaces are converted on creation already,
+        so this is needed only when the world was created before the display was set.
+        """
+        self.__surface_cache.prepare()
+        if self.headless:
+            return
+        self.__block_surfaces = self.make_block_surfaces(self.__blocks, self.render_scale)
+        self.__dynamic_surfaces = self.make_dynamic_surfaces(self.render_scale)
+        if self.__sprites is not None:
+            for sprite, surface in zip(self.__sprites, self.make_block_surfaces(self.__blocks)):
+                sprite.image = surface
+
+    def set_render_scale(self, render_scale):
+        """
+        Sets resolution of the canvas the world is drawn onto. Surfaces for each scale are made once and cached.
+        :param render_scale: fraction of the screen resolution
+        """
+        self.render_scale = render_scale
+        if self.headless:
+            self.__block_surfaces, self.__dynamic_surfaces, self.background = None, None, None
+            return
+        self.__block_surfaces = self.make_block_surfaces(self.__blocks, render_scale)
+        self.__dynamic_surfaces = self.make_dynamic_surfaces(render_scale)
+        # block positions on canvas are rounded once, so neighbouring blocks never jitter against each other
+        self.__draw_x = np.round(self.__blocks.px_x * render_scale).astype(np.int32)
+        self.__draw_y = np.round(self.__blocks.px_y * render_scale).astype(np.int32)
+        if render_scale not in self.__backgrounds:
+            self.__backgrounds[render_scale] = ParallaxBackground(self.__screen_w, self.__screen_h, self.skyblue, self.lightskyblue,
+                                                                  scale=render_scale)
+        self.background = self.__backgrounds[render_scale]
 
-        connected_objects = self.find_connected_components()
+    def move_world(self, dx, dy):
+        """Moves world by dx and dy pixels"""
+        self.__offset_x += dx
+        self.__offset_y += dy
+        if self.__sprites is not None:
+            ox, oy = self.get_screen_offset()
+            for i, sprite in enumerate(self.__sprites):
+                sprite.set_position(int(self.__blocks.px_x[i]) + ox, int(self.__blocks.px_y[i]) + oy)
+
+    def get_state(self):
+        """Returns mutable state of the world (camera offset), see set_state"""
+        return self.__offset_x, self.__offset_y
+
+    def set_state(self, state):
+        """Restores state returned by get_state, moving the world (and its sprites, if there are any) back"""
+        offset_x, offset_y = state
+        self.move_world(offset_x - self.__offset_x, offset_y - self.__offset_y)
+        self.__offset_x, self.__offset_y = offset_x, offset_y  # exact, without float errors of the move
+
+    def stands_on(self, box, cell_name):
+        """
+        Checks whether box rests on a cell of given type
+        :param box: (x, y, w, h), in world coordinates
+        :param cell_name: name of cell type, for eg. 'CHECKPOINT_GROUND'
+        """
+        x, y, w, h = box
+        row = int(round((y + h) / self.__cell_h))
+        if abs((y + h) / self.__cell_h - row) > 1e-6 or not 0 <= row < self.__obj_matrix.shape[0]:
+            return False
+        col0, col1 = self.collider.cell_range(x, w, self.__cell_w)
+        cells = self.__obj_matrix[row, max(col0, 0):col1 + 1]
+        return bool((cells == self.cell_type_ids[cell_name]).any())
+
+    def open_above(self, box):
+        """
+        Opens dynamic objects in the row right above box (hit by the head of the hero)
+        :param box: (x, y, w, h), in world coordinates
+        :return: list of (row, col) of opened objects
+        """
+        x, y, w, h = box
+        row = int(round(y / self.__cell_h)) - 1
+        col0, col1 = self.collider.cell_range(x, w, self.__cell_w)
+        return [(row, col) for col in range(col0, col1 + 1) if self.dynamic.open(row, col)]
 
-        self.assets = self.load_assets(assets_path,
-                                       [key for key in self.cell_type_ids.keys() if key is not 'EMPTY_CELL'])
+    def environment_at(self, x, y):
+        """
+        Returns volume (water, lava, see RegionMap) containing the point and how deep below its surface the point is
+        :params x, y: point, in world coordinates
+        :return: (cell type name, depth in pixels), or (None, None) outside of volumes
+        """
+        region = self.regions.region_at(x, y)
+        if region == NO_REGION:
+            return None, None
+        return self.cell_types[self.regions.region_type(region)], self.regions.depth_at(x, y)
 
-        self.__sprites = self.make_sprites(connected_objects)
+    def get_screen_offset(self):
+        """Returns camera offset rounded to whole pixels, as used for drawing"""
+        return int(round(self.__offset_x)), int(round(self.__offset_y))
 
-    def move_world(self, dx, dy):
-        """Moves world by dx and dy pixels"""
-        for sprite in self.__sprites:
-            sprite.move_block(dx, dy)
+    def make_collider(self):
+        """Creates tile collider, using physical (and not transparent) cell types as solid ones"""
+        return collider_from_assets(self.__obj_matrix, self.__cell_w, self.__cell_h, self.assets, self.cell_type_ids)
+
+    def get_navigation(self):
+        """
+        Returns navigation graph of the world. It is loaded from the compiled level when it's there and was built for the current
+        hero physics, otherwise it's built on the first call.
+        """
+        if self.__navigation is None:
+            self.__navigation = NavigationGraph.from_arrays(self.level_data, self.__cell_w, self.__cell_h)
+            if self.__navigation is None:
+                self.__navigation = NavigationGraph.build(self.collider)
+        return self.__navigation
+
+    def get_player_box(self, player):
+        """
+        Returns collision box of player in world coordinates
+        :param player: turtle sprite; its hitbox (x, y, w, h) is relative to its rect
+        :return: (x, y, w, h)
+        """
+        hx, hy, hw, hh = player.hitbox
+        return player.rect.x + hx - self.__offset_x, player.rect.y + hy - self.__offset_y, hw, hh
+
+    def move_player(self, player, dx, dy):
+        """
+        Moves player through the world by dx and dy pixels, resolving collisions with terrain. Player stays in the same place on screen,
+        so it's the world that is moved (in the opposite direction) instead.
+        :param player: turtle sprite
+        :params dx, dy: requested movement, in pixels
+        :return: MoveResult
+        """
+        x, y, w, h = self.get_player_box(player)
+        result = self.collider.move(x, y, w, h, dx, dy)
+        self.move_world(-result.dx, -result.dy)
+        return result
+
+    def get_offset(self):
+        """Returns current camera offset (x, y), in pixels"""
+        return self.__offset_x, self.__offset_y
+
+    def get_view(self):
+        """Returns area visible on screen, in world coordinates: (xmin, ymin, xmax, ymax)"""
+        return -self.__offset_x, -self.__offset_y, self.__screen_w - self.__offset_x, self.__screen_h - self.__offset_y
 
     def find_screen_offset(self, screen_h):
         """Finds world-screen difference and returns corresponding offset"""
         dy = screen_h - self.__world_h
         return dy
 
+    def get_objects_matrix(self):
+        """Returns the objects matrix of the world (cell type indices)"""
+        return self.__obj_matrix
+
+    def make_minimap(self, pixels_per_cell=3):
+        """Creates minimap of the world, see Minimap"""
+        minimap = Minimap(self.__obj_matrix, self.__cell_w, self.__cell_h, pixels_per_cell)
+        self.dynamic.add_hook(minimap.update_cell)
+        return minimap
+
+    def get_blocks(self):
+        """Returns the block table of world obstacles"""
+        return self.__blocks
+
     def get_sprites(self):
-        """Returns a list of sprites of world obstacles"""
+        """
+        Returns a group of sprites of world obstacles. Sprites are created on the first call only and kept in sync with camera movement
+        afterwards, they exist only for compatibility with sprite based code.
+        """
+        if self.__sprites is None:
+            self.__sprites = self.make_sprites(self.__blocks)
         return self.__sprites
 
-    def __fill_gradient(self, surface, color, gradient, rect=None, vertical=True, forward=True):
-        """
-        Fill a surface with a gradient pattern
-        Parameters:
-        color -> starting color
-        gradient -> final color
-        rect -> area to fill; default is surface's rect
-        vertical -> True=vertical; False=horizontal
-        forward -> True=forward; False=reverse
-
-        Pygame recipe: http://www.pygame.org/wiki/GradientCode
-        """
-        if rect is None: rect = surface.get_rect()
-        x1, x2 = rect.left, rect.right
-        y1, y2 = rect.top, rect.bottom
-        if vertical:
-            h = y2 - y1
-        else:
-            h = x2 - x1
-        if forward:
-            a, b = color, gradient
-        else:
-            b, a = color, gradient
-        rate = (
-            float(b[0] - a[0]) / h,
-            float(b[1] - a[1]) / h,
-            float(b[2] - a[2]) / h
-        )
-        fn_line = pygame.draw.line
-        if vertical:
-            for line in range(y1, y2):
-                color = (
-                    min(max(a[0] + (rate[0] * (line - y1)), 0), 255),
-                    min(max(a[1] + (rate[1] * (line - y1)), 0), 255),
-                    min(max(a[2] + (rate[2] * (line - y1)), 0), 255)
-                )
-                fn_line(surface, color, (x1, line), (x2, line))
-        else:
-            for col in range(x1, x2):
-                color = (
-                    min(max(a[0] + (rate[0] * (col - x1)), 0), 255),
-                    min(max(a[1] + (rate[1] * (col - x1)), 0), 255),
-                    min(max(a[2] + (rate[2] * (col - x1)), 0), 255)
-                )
-                fn_line(surface, color, (col, y1), (col, y2))
-
     def update(self, screen):
-        """Calls update() and draw() methods on sprites. A function made only for convenience. Also fills background with gradient.
+        """Draws blocks visible on screen. A function made only for convenience. Also draws parallax background.
         :param screen: screen surface
         """
-        self.__fill_gradient(screen, self.skyblue, self.lightskyblue)
-        self.__sprites.update()
-        self.__sprites.draw(screen)
+        screen.blits(self.get_background_blits(), doreturn=False)
+        screen.blits(self.get_block_blits(), doreturn=False)
+
+    def get_background_blits(self):
+        """Returns blits (surface, destination) of the parallax background, at the canvas resolution"""
+        scale = self.render_scale
+        return self.background.get_blits((self.__offset_x - self.__initial_offset[0]) * scale,
+                                         (self.__offset_y - self.__initial_offset[1]) * scale, self.background_layers)
+
+    def get_block_blits(self):
+        """Returns blits (surface, destination) of blocks visible on screen, at the canvas resolution"""
+        blocks = self.__blocks
+        scale = self.render_scale
+        ox, oy = self.get_screen_offset()
+        visible = blocks.overlapping(-ox, -oy, self.__screen_w - ox, self.__screen_h - oy)
+        if self.diagnostic is not None:
+            for i in visible:
+                self.diagnostic.check(self.__block_surfaces[i], self.block_class(blocks[i]['flags']).__name__)
+        if scale != 1:
+            ox, oy = int(round(self.__offset_x * scale)), int(round(self.__offset_y * scale))
+        draw_x, draw_y = self.__draw_x, self.__draw_y
+        blits = [(self.__block_surfaces[i], (int(draw_x[i]) + ox, int(draw_y[i]) + oy)) for i in visible]
+        blits.extend(self.dynamic.get_blits(self.__dynamic_surfaces, self.get_view(), (ox, oy), self.__cell_w, self.__cell_h, scale))
+        return blits
 
     def load_assets(self, path, cell_names):
         """
-        Loads assets for cell types, based on names; assigning additional information to them. Each asset must be named according to rules:
-        NAME-MODE-FEATURE1-FEATURE2-FEATUREn.png. Also does all necessary preprocessing, like resizing etc.
-
-        NAME - specifies the name of type, like ground, deadly ground etc.
-        MODE - TOP / BOTTOM, specifies type of block (for example top block of grass and bottom block of dirt), all blocks must have at least their top version
-        FEATURE - available from list: DEADLY (specifies, wheter the block is deadly in touch), TRANSPARENT (specifies, whether the block should be transparent),
-                PHYSICAL - wheter the object should react with the turtle (for example water shouldn't, turtle should go through it),
-                MASKABLE - wheter a mask should be created
-
+        Loads assets for cell types, see source.worlds.assets.load_assets for naming rules
         :param path: path to root directory of assets
-        :param cell_types: dictionary with types
+        :param cell_names: names of cell types
         :return: dict {cell_name: assets}
         """
-        assets = {}
-        filenames = os.listdir(path)
-        for cell_name in cell_names:
-            asset_info = {}
-
-            # find all assets associated to the cell type
-            associated_filenames = [name for name in filenames if name.startswith(cell_name.lower())]
-            if not associated_filenames:  # all cell types must have the associated assets!
-                raise Exception("There are no assets associated to {}!".format(cell_name))
-
-            # assign images to assets
-            images = {}
-            for asset_name in associated_filenames:
-                # preprocess image (load, scale, bgr to rgb color conversion)
-                img = cv2.imread(os.path.join(path, asset_name), cv2.IMREAD_UNCHANGED)
-                img = cv2.resize(img, (self.__cell_w, self.__cell_h))
-                img = cv2.cvtColor(img, cv2.COLOR_BGRA2RGBA)
-
-                if 'top' in asset_name:
-                    images['top_img'] = img
-
-                    # assign another features
-                    asset_info['deadly'] = True if 'deadly' in asset_name else False
-                    asset_info['transparent'] = True if 'transparent' in asset_name else False
-                    asset_info['physical'] = True if 'physical' in asset_name else False
-                    asset_info['maskable'] = True if 'maskable' in asset_name else False
-
-                elif 'bottom' in asset_name:
-                    images['bottom_img'] = img
-                asset_info['images'] = images
-            assets[cell_name] = asset_info
-
-        return assets
-
-    def make_sprites(self, connected_objects):
-        """Creates pygame sprites from list of connected components, transforming them from unitary units into pixels"""
-        # compute screen offset
-        dy = self.find_screen_offset(self.__screen_h)
-
+        return load_assets(path, cell_names, self.__cell_w, self.__cell_h)
+
+    @staticmethod
+    def block_class(flags):
+        """Returns class of block sprite, appropriate for given block flags"""
+        if flags & FLAG_BOTTOM:  # if bottom-expandable asset
+            return BottomBlock
+        elif flags & FLAG_MASKABLE:
+            return MaskableBlock
+        return StaticBlock
+
+    def make_block_table(self, connected_objects):
+        """
+        Creates a block table from list of connected components, attaching asset flags to them
+        :param connected_objects: list of (x, y, width, height, type_id) tuples, in units
+        :return: BlockTable
+        """
+        type_flags = {type_id: asset_flags(self.assets[name]) for type_id, name in self.cell_types.items() if name in self.assets}
+        rows = [(x, y, w, h, type_id, type_flags[type_id]) for x, y, w, h, type_id in connected_objects]
+        return BlockTable.from_rows(rows, self.__cell_w, self.__cell_h)
+
+    def make_block_surfaces(self, blocks, scale=1):
+        """Assigns (shared) surfaces to all blocks in the table, transforming them from unitary units into pixels (at given render scale)"""
+        surfaces = []
+        for block in blocks.blocks:
+            block_cls = self.block_class(block['flags'])
+            surfaces.append(self.__surface_cache.get(self.cell_types[block['type_id']], int(block['w']), int(block['h']), block_cls, scale))
+        return surfaces
+
+    def make_dynamic_surfaces(self, scale=1):
+        """Returns (shared) surfaces of single cells of dynamic object types, at given render scale: dict {type id: surface}"""
+        surfaces = {}
+        for name in DYNAMIC_TYPES:
+            block_cls = self.block_class(asset_flags(self.assets[name]))
+            surfaces[self.cell_type_ids[name]] = self.__surface_cache.get(name, 1, 1, block_cls, scale)
+        return surfaces
+
+    def make_dynamic_masks(self):
+        """Returns (shared) collision masks of single cells of dynamic object types, at full resolution: dict {type id: mask}"""
+        masks = {}
+        for name in DYNAMIC_TYPES:
+            block_cls = self.block_class(asset_flags(self.assets[name]))
+            masks[self.cell_type_ids[name]] = self.__surface_cache.get_mask(name, 1, 1, block_cls)
+        return masks
+
+    def make_block_masks(self, blocks):
+        """Assigns (shared) collision masks of full resolution block surfaces to all blocks in the table"""
+        masks = []
+        for block in blocks.blocks:
+            block_cls = self.block_class(block['flags'])
+            masks.append(self.__surface_cache.get_mask(self.cell_types[block['type_id']], int(block['w']), int(block['h']), block_cls))
+        return masks
+
+    def make_sprites(self, blocks):
+        """Creates pygame sprites from the block table, placing them at the current camera offset"""
         all_sprites = pygame.sprite.Group()
-        for i, obj in enumerate(connected_objects):
-            asset = self.assets[obj['type']]
-            x = obj['x'] * self.__cell_w
-            y = obj['y'] * self.__cell_h
-
-            # if bottom-expandable asset
-            if 'bottom_img' in asset['images'].keys():
-                sprite = BottomBlock(x, y + dy, obj['width'], obj['height'], asset['images'], asset['deadly'])
-                all_sprites.add(sprite)
-            elif asset['maskable'] == True:
-                sprite = MaskableBlock(x, y + dy, obj['width'], obj['height'], asset['images'], asset['deadly'])
-                all_sprites.add(sprite)
-            else:
-                sprite = StaticBlock(x, y + dy, obj['width'], obj['height'], asset['images'], asset['deadly'])
-                all_sprites.add(sprite)
+        surfaces = self.make_block_surfaces(blocks)  # sprites are drawn at full resolution
+        for i, block in enumerate(blocks.blocks):
+            asset = self.assets[self.cell_types[block['type_id']]]
+            block_cls = self.block_class(block['flags'])
+            ox, oy = self.get_screen_offset()
+            x = int(blocks.px_x[i]) + ox
+            y = int(blocks.px_y[i]) + oy
+            sprite = block_cls(x, y, int(block['w']), int(block['h']), asset['images'], bool(block['flags'] & FLAG_DEADLY),
+                               surface=surfaces[i])
+            all_sprites.add(sprite)
         return all_sprites
 
     def find_vertically_connected(self, matrix, background_idx):
@@ -306,7 +486,7 @@ class World:
         Finds connected objects (for eg. parts of ground that belong to the same group), clusters them and returns them as a list of objects. Works vertically
         :param matrix: matrix of objects, extracted from grid_info
         :param background_idx: index of background cells in matrix - will be omitted during computations
-        :return: list of lists, where each sublist contains information about objects in column, when there were some
+        :return: list of lists, where each sublist contains (x, y, height, type_id) tuples of objects in column, when there were some
         """
         # 1st pass - simple, vertical finding of connected components
         vertical_objects = []
@@ -315,7 +495,7 @@ class World:
             col = matrix[:, c]
 
             # if all cells contain only backgrounds, there is no object to append to the list
-            if all(item == background_idx for item in col):
+            if np.all(col == background_idx):
                 continue
 
             # slow and fast runner iteration
@@ -334,8 +514,7 @@ class World:
                             break
                         runner_fast += 1
 
-                    column_objects.append({'type': self.cell_types[current_type], 'y': runner_slow, 'x': c,
-                                           'height': runner_fast - runner_slow})
+                    column_objects.append((c, runner_slow, runner_fast - runner_slow, int(current_type)))
                     runner_slow = runner_fast
 
             vertical_objects.append(column_objects)
@@ -344,65 +523,74 @@ class World:
     def find_horizontally_connected(self, objects_in_columns):
         """
         Tries to find objects connected horizontally
-        :param objects_in_columns: list of lists, containing information about objects in columns
-        :return: list of objects, describing their positions and sizes (in units from matrix, not pixels)
+        :param objects_in_columns: list of lists, containing (x, y, height, type_id) tuples of objects in columns
+        :return: list of (x, y, width, height, type_id) tuples, describing positions and sizes of objects (in units from matrix, not pixels)
         """
         connected_objects = []
-        temporary_objects = []  # objects that may not be yet fully connected
+        active_objects = {}  # objects that may not be yet fully connected, keyed by (y, height, type_id); values are [x, width]
 
         for objects in objects_in_columns:  # iterate over columns
-            x = objects[0]['x']  # not every column must contain objects, so we need to extract its x position
-
-            # for all objects in the single column
-            for obj in objects:
-                # there should be at most one, however I use list comprehension for readability (also for convenient None check later)
-                matching_objects = [temp_obj for temp_obj in temporary_objects if temp_obj['y'] == obj['y']
-                                    and temp_obj['height'] == obj['height']
-                                    and temp_obj['type'] == obj['type']]
-
-                if matching_objects:  # if adjacent object was found
-                    updated_object = matching_objects[0]
-                    updated_object['width'] += 1
-                    temporary_objects[temporary_objects.index(matching_objects[0])] = updated_object
-                else:  # no adjacent object was found - so the object in column should start a new connected object
-                    new_object = obj
-                    new_object['width'] = 1
-                    new_object['x'] = x
-                    temporary_objects.append(new_object)
-
-            # cleaning the temporary list, if it's not empty
-            if temporary_objects:
-                inactive_objects = [obj for obj in temporary_objects if
-                                    obj['x'] + obj['width'] < x + 1]  # these objects are already finished
-                connected_objects.extend(inactive_objects)
-
-                temporary_objects = [obj for obj in temporary_objects if
-                                     obj not in inactive_objects]  # these objects are still active
-
-        # move last object from temporary list to list of connected objects
-        connected_objects.extend(temporary_objects)
+            x = objects[0][0]  # not every column must contain objects, so we need to extract its x position
+
+            # objects not continued in this column are already finished
+            for key, (start_x, width) in list(active_objects.items()):
+                if start_x + width < x:
+                    connected_objects.append((start_x, key[0], width, key[1], key[2]))
+                    del active_objects[key]
+
+            # for all objects in the single column either extend adjacent object or start a new one
+            for _, y, height, type_id in objects:
+                key = (y, height, type_id)
+                if key in active_objects:
+                    active_objects[key][1] += 1
+                else:
+                    active_objects[key] = [x, 1]
+
+        # move remaining objects to list of connected objects
+        for (y, height, type_id), (start_x, width) in active_objects.items():
+            connected_objects.append((start_x, y, width, height, type_id))
         return connected_objects
 
     def find_connected_components(self):
         """
-        Finds connected components of rectangular shape
+        Finds connected components of rectangular shape, among static cells (dynamic objects are left out as if they were empty)
         :return: list of connected objects
         """
-        vertically_connected = self.find_vertically_connected(self.__obj_matrix, self.cell_type_ids['EMPTY_CELL'])
+        empty = self.cell_type_ids['EMPTY_CELL']
+        dynamic_ids = [self.cell_type_ids[name] for name in DYNAMIC_TYPES]
+        static_matrix = np.where(np.isin(self.__obj_matrix, dynamic_ids), empty, self.__obj_matrix)
+        vertically_connected = self.find_vertically_connected(static_matrix, empty)
         connected_list = self.find_horizontally_connected(vertically_connected)
         return connected_list
 
     def find_collisions(self, player):
         """
-        Finds collisions between player sprite and world sprites
+        Finds collisions between player sprite and world blocks and intact dynamic objects: blocks whose rects overlap the player rect
+        and objects in cells under it (broad phase) are checked pixel by pixel with precomputed masks of the player frame and of the
+        block or object surface (narrow phase)
+        :param player: turtle sprite with mask of its current frame
+        :return: (list of indices of colliding blocks, list of indices of colliding dynamic objects)
         """
         # todo this is probably temporary and will be moved somewhere else (probably into separate class designed for game logic
-        colliding_obstacles = pygame.sprite.spritecollide(player, self.__sprites, False)
-        if colliding_obstacles:
-            for obj in colliding_obstacles:
-                print("Player colliding with {}, which has coords (xmin, ymin, xmax, ymax):{} and is {} deadly".format(obj.__class__.__name__,
-                                                                                                                       obj.get_coordinates(),
-                                                                                                                       '' if obj.is_deadly else 'NOT'))
+        ox, oy = self.get_screen_offset()
+        rect = player.rect
+        colliding_obstacles = []
+        for i in self.__blocks.overlapping(rect.left - ox, rect.top - oy, rect.right - ox, rect.bottom - oy):
+            offset = (int(self.__blocks.px_x[i]) + ox - rect.x, int(self.__blocks.px_y[i]) + oy - rect.y)
+            if player.mask.overlap(self.__block_masks[i], offset) is not None:
+                colliding_obstacles.append(i)
+        colliding_objects = []
+        dynamic = self.dynamic
+        for i in dynamic.overlapping(rect.left - ox, rect.top - oy, rect.right - ox, rect.bottom - oy, self.__cell_w, self.__cell_h):
+            offset = (int(dynamic.cols[i]) * self.__cell_w + ox - rect.x, int(dynamic.rows[i]) * self.__cell_h + oy - rect.y)
+            if player.mask.overlap(self.__dynamic_masks[int(dynamic.type_ids[i])], offset) is not None:
+                colliding_objects.append(i)
+        for i in colliding_obstacles:
+            flags = self.__blocks[i]['flags']
+            print("Player colliding with {}, which has coords (xmin, ymin, xmax, ymax):{} and is {} deadly".format(self.block_class(flags).__name__,
+                                                                                                                   self.__blocks.get_coordinates(i, ox, oy),
+                                                                                                                   '' if flags & FLAG_DEADLY else 'NOT'))
+        return colliding_obstacles, colliding_objects
 
 
 # >>>>>>>>>>>>>>>>> only for testing!!!
@@ -410,12 +598,12 @@ if __name__ == '__main__':
     SCREENWIDTH = 1200
     SCREENHEIGHT = 750
 
-    world = World('world_instances/world_1/grid_info.p', 'assets', SCREENWIDTH, SCREENHEIGHT)
-    sprites = world.get_sprites()
-
     size = (SCREENWIDTH, SCREENHEIGHT)
     screen = pygame.display.set_mode(size)
 
+    # display must be set before the world is created, so that surfaces can be converted to its format
+    world = World('world_instances/world_1/grid_info.p', 'assets', SCREENWIDTH, SCREENHEIGHT)
+
     carryOn = True
     clock = pygame.time.Clock()
 
@@ -425,8 +613,7 @@ if __name__ == '__main__':
                 carryOn = False
         screen.fill((0, 0, 0))
         world.move_world(-1, 0)
-        sprites.update()
-        sprites.draw(screen)
+        world.update(screen)
         pygame.display.flip()
         clock.tick(60)
 
@@ -0,0 +1,61 @@
+import heapq
+import math
+import os
+
+import pytest
+
+from source.physics.tile_collider import collider_from_assets
+from source.worlds.assets import load_asset_flags
+from source.worlds.cell_types import cell_types
+from source.worlds.navigation import NavigationGraph
+from source.worlds.procedural import ProceduralGenerator, WORLDS_PATH
+
+
+def dijkstra(graph, source):
+    """Returns costs of the fastest paths from source to all reachable nodes"""
+    costs = {source: 0.0}
+    queue = [(0.0, source)]
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if cost > costs[node]:
+            continue
+        for neighbour, link_cost, _ in graph.adjacency[node]:
+            new_cost = cost + link_cost
+            if new_cost < costs.get(neighbour, math.inf):
+                costs[neighbour] = new_cost
+                heapq.heappush(queue, (new_cost, neighbour))
+    return costs
+
+
+def path_cost(graph, path):
+    return sum(min(cost for target, cost, _ in graph.adjacency[node] if target == following) for node, following in zip(path, path[1:]))
+
+
+@pytest.fixture(scope='module')
+def graph():
+    generator = ProceduralGenerator(3)
+    grid_info = generator.make_grid_info(200)
+    names = [name for name in cell_types.keys() if name != 'EMPTY_CELL']
+    flags = load_asset_flags(os.path.join(WORLDS_PATH, 'assets'), names)
+    collider = collider_from_assets(grid_info['objects_matrix'], grid_info['cell_w'], grid_info['cell_h'], flags,
+                                    {name: i for i, name in enumerate(cell_types.keys())})
+    return NavigationGraph.build(collider)
+
+
+def test_heuristic_never_overestimates_links(graph):
+    nodes = graph.nodes
+    for (source, target, _), cost in zip(graph.edges.tolist(), graph.costs.tolist()):
+        bound = abs(int(nodes[source][0]) - int(nodes[target][0])) * graph.cost_per_column
+        assert bound <= cost + 1e-9
+
+
+def test_a_star_finds_the_fastest_paths(graph):
+    for source in range(0, len(graph), max(len(graph) // 12, 1)):
+        costs = dijkstra(graph, source)
+        for target in range(len(graph)):
+            path = graph.a_star(source, target)
+            if target not in costs:
+                assert path is None
+            else:
+                assert path[0] == source and path[-1] == target
+                assert path_cost(graph, path) == pytest.approx(costs[target], abs=1e-6)